@@ -0,0 +1,23 @@
+"""Add prompt_budget column to generation_logs
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision = "004"
+down_revision = "003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("generation_logs", sa.Column("prompt_budget", JSONB(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("generation_logs", "prompt_budget")
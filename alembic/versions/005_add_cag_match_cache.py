@@ -0,0 +1,35 @@
+"""Add cag_match_cache table
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import JSONB
+
+revision = "005"
+down_revision = "004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "cag_match_cache",
+        sa.Column("key", sa.String(64), primary_key=True),
+        sa.Column("topic_key", sa.Text(), nullable=False),
+        sa.Column("year_level", sa.String(50), nullable=True),
+        sa.Column("strand", sa.String(50), nullable=True),
+        sa.Column("curriculum_hash", sa.String(16), nullable=False),
+        sa.Column("model", sa.String(100), nullable=False),
+        sa.Column("matches", JSONB(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_cag_match_cache_curriculum_hash", "cag_match_cache", ["curriculum_hash"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_cag_match_cache_curriculum_hash", table_name="cag_match_cache")
+    op.drop_table("cag_match_cache")
@@ -0,0 +1,40 @@
+"""Add subjects table and subject codes for multi-subject curricula
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-19
+"""
+
+import sqlalchemy as sa
+from alembic import op
+
+revision = "006"
+down_revision = "005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "subjects",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("code", sa.String(20), unique=True, nullable=False),
+        sa.Column("title", sa.String(100), nullable=False),
+        sa.Column("learning_area", sa.String(100), nullable=False),
+    )
+    op.add_column(
+        "year_levels",
+        sa.Column("subject_code", sa.String(20), sa.ForeignKey("subjects.code"), nullable=True),
+    )
+    op.add_column(
+        "content_descriptors",
+        sa.Column("subject_code", sa.String(20), sa.ForeignKey("subjects.code"), nullable=True),
+    )
+    op.create_index("ix_content_descriptors_subject_code", "content_descriptors", ["subject_code"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_content_descriptors_subject_code", table_name="content_descriptors")
+    op.drop_column("content_descriptors", "subject_code")
+    op.drop_column("year_levels", "subject_code")
+    op.drop_table("subjects")
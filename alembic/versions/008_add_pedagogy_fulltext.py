@@ -0,0 +1,58 @@
+"""Add a tsvector column and GIN index to the pedagogy knowledge base
+
+The ai.pedagogy_vectors table is normally created by agno's PgVector when the
+knowledge base is first seeded, which runs after migrations. It is created
+here in the same layout (if missing) so that the full-text column can be
+added up front; PgVector then finds the table and leaves it alone.
+
+Revision ID: 008
+Revises: 007
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = "008"
+down_revision = "007"
+branch_labels = None
+depends_on = None
+
+EMBEDDING_DIMENSIONS = 1536  # text-embedding-3-small
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    op.execute("CREATE SCHEMA IF NOT EXISTS ai")
+    op.execute(f"""
+        CREATE TABLE IF NOT EXISTS ai.pedagogy_vectors (
+            id VARCHAR PRIMARY KEY,
+            name VARCHAR,
+            meta_data JSONB DEFAULT '{{}}'::jsonb,
+            filters JSONB DEFAULT '{{}}'::jsonb,
+            content TEXT,
+            embedding VECTOR({EMBEDDING_DIMENSIONS}),
+            usage JSONB,
+            created_at TIMESTAMPTZ DEFAULT now(),
+            updated_at TIMESTAMPTZ,
+            content_hash VARCHAR,
+            content_id VARCHAR,
+            user_id VARCHAR
+        )
+    """)
+    for column in ("id", "name", "content_hash", "content_id", "user_id"):
+        op.execute(
+            f"CREATE INDEX IF NOT EXISTS idx_pedagogy_vectors_{column} ON ai.pedagogy_vectors ({column})"
+        )
+    op.execute("""
+        ALTER TABLE ai.pedagogy_vectors
+        ADD COLUMN IF NOT EXISTS content_tsv TSVECTOR
+        GENERATED ALWAYS AS (to_tsvector('english', coalesce(content, ''))) STORED
+    """)
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_pedagogy_vectors_content_tsv ON ai.pedagogy_vectors USING GIN (content_tsv)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ai.ix_pedagogy_vectors_content_tsv")
+    op.execute("ALTER TABLE ai.pedagogy_vectors DROP COLUMN IF EXISTS content_tsv")
@@ -0,0 +1,45 @@
+"""Add indexed metadata columns to the pedagogy knowledge base
+
+The columns are generated from the chunk's meta_data (written by the seeder,
+see backend.knowledge.chunk_metadata), so agno's PgVector inserts need no
+changes and retrieval can pre-filter on btree indexes.
+
+Revision ID: 009
+Revises: 008
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+revision = "009"
+down_revision = "008"
+branch_labels = None
+depends_on = None
+
+COLUMNS = {
+    "doc_type": "TEXT GENERATED ALWAYS AS (meta_data->>'doc_type') STORED",
+    "descriptor_code": "TEXT GENERATED ALWAYS AS (meta_data->>'descriptor_code') STORED",
+    "year_ordinal": "SMALLINT GENERATED ALWAYS AS ((meta_data->>'year')::smallint) STORED",
+    "strand": "TEXT GENERATED ALWAYS AS (meta_data->>'strand') STORED",
+    "teaching_focus": "TEXT GENERATED ALWAYS AS (meta_data->>'teaching_focus') STORED",
+}
+
+INDEXES = {
+    "ix_pedagogy_vectors_descriptor_code": "(descriptor_code)",
+    "ix_pedagogy_vectors_doc_type_year": "(doc_type, year_ordinal, strand)",
+    "ix_pedagogy_vectors_teaching_focus": "(teaching_focus)",
+}
+
+
+def upgrade() -> None:
+    for column, definition in COLUMNS.items():
+        op.execute(f"ALTER TABLE ai.pedagogy_vectors ADD COLUMN IF NOT EXISTS {column} {definition}")
+    for name, columns in INDEXES.items():
+        op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON ai.pedagogy_vectors {columns}")
+
+
+def downgrade() -> None:
+    for name in INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS ai.{name}")
+    for column in COLUMNS:
+        op.execute(f"ALTER TABLE ai.pedagogy_vectors DROP COLUMN IF EXISTS {column}")
@@ -6,6 +6,7 @@ import time
 import uuid
 from typing import AsyncIterator
 
+from agno.run.workflow import StepProgressEvent
 from fastapi import APIRouter, Depends, Form, HTTPException, Query
 from sqlalchemy.orm import Session
 from sse_starlette.sse import EventSourceResponse
@@ -27,6 +28,15 @@ from backend.db.models import (
     YearLevel,
 )
 from backend.db.session import SessionLocal, get_db
+from backend.services.cag_cache import cache_report
+from backend.services.descriptor_embeddings import embedding_report
+from backend.services.hedging import hedge_report
+from backend.services.input_analysis import fastpath_report
+from backend.services.llm_pool import pool_stats
+from backend.services.metrics import metrics
+from backend.services.rag_cache import rag_cache_report
+from backend.services.rate_governor import governor, is_rate_limit_error
+from backend.workflow.agents import prompt_cache_report
 from backend.workflow.lesson_workflow import create_lesson_workflow
 
 router = APIRouter(prefix="/api")
@@ -66,9 +76,11 @@ async def _run_generation(params: dict) -> AsyncIterator[str]:
     yield _sse({"type": "generation_started", "generation_id": generation_id})
 
     # Shared state dict - steps modify this via run_context.session_state
-    shared_state = {"params": params}
+    shared_state = {"params": params, "generation_id": generation_id}
     workflow = create_lesson_workflow(shared_state)
 
+    # Queue depth for the model router's load level
+    metrics.incr("generations.in_flight")
     try:
         response_iter = workflow.arun(
             input=params.get("topic", ""),
@@ -87,6 +99,7 @@ async def _run_generation(params: dict) -> AsyncIterator[str]:
         debug_rag = None
         debug_template = None
         debug_resolved_prompt = None
+        debug_prompt_budget = None
         debug_token_usage = {}  # Collect token data from step event payloads
 
         async for event in response_iter:
@@ -139,6 +152,12 @@ async def _run_generation(params: dict) -> AsyncIterator[str]:
             elif "router" in event_type.lower():
                 step_start = time.time()
 
+            elif isinstance(event, StepProgressEvent):
+                # Matches streamed by the CAG step before it completes
+                partial = (event.data or {}).get("cag_partial_matches")
+                if partial and "cag" not in seen_step_data:
+                    yield _sse({"type": "cag_matches", "matches": partial[:5], "partial": True})
+
             elif content:
                 content_str = str(content)
                 stripped = content_str.strip()
@@ -165,11 +184,13 @@ async def _run_generation(params: dict) -> AsyncIterator[str]:
                             seen_step_data.add("parsed_input")
                             if data.get("_token_usage"):
                                 debug_token_usage["input_analyzer"] = data["_token_usage"]
+                            _record_spans(step_timings, "input_analyzer", data)
                             step_timings["input_analyzer"] = int((time.time() - step_start) * 1000)
                             yield _sse({"type": "step_started", "step": "input_analyzer", "index": 1})
                             yield _sse({"type": "step_completed", "step": "input_analyzer", "index": 1,
                                         "duration_ms": step_timings["input_analyzer"],
-                                        "summary": {"topic": data.get("topic", ""), "intent": data.get("intent", "")}})
+                                        "summary": {"topic": data.get("topic", ""), "intent": data.get("intent", ""),
+                                                    "fast_path": bool(data.get("_fast_path"))}})
                             step_start = time.time()
 
                         # Step 2 output: CAG matches
@@ -177,6 +198,7 @@ async def _run_generation(params: dict) -> AsyncIterator[str]:
                             seen_step_data.add("cag")
                             if data.get("_token_usage"):
                                 debug_token_usage["curriculum_matcher"] = data["_token_usage"]
+                            _record_spans(step_timings, "curriculum_matcher", data)
                             debug_cag_matches = data["matches"][:5]
                             step_timings["curriculum_matcher"] = int((time.time() - step_start) * 1000)
                             yield _sse({"type": "step_started", "step": "curriculum_matcher", "index": 2})
@@ -215,6 +237,7 @@ async def _run_generation(params: dict) -> AsyncIterator[str]:
                             seen_step_data.add("template")
                             debug_template = data.get("name", "")
                             debug_resolved_prompt = data.get("resolved_prompt", "")
+                            debug_prompt_budget = data.get("token_budget")
                             step_timings["template_resolver"] = int((time.time() - step_start) * 1000)
                             yield _sse({"type": "step_started", "step": "template_resolver", "index": 5})
                             yield _sse({"type": "step_completed", "step": "template_resolver", "index": 5,
@@ -235,7 +258,9 @@ async def _run_generation(params: dict) -> AsyncIterator[str]:
 
                         # Generator token usage (emitted as separate StepOutput after content)
                         elif "_generator_token_usage" in data:
-                            debug_token_usage["resource_generator"] = data["_generator_token_usage"]
+                            if data["_generator_token_usage"]:
+                                debug_token_usage["resource_generator"] = data["_generator_token_usage"]
+                            _record_spans(step_timings, "resource_generator", data)
 
                     # Fallback: suppress step-output patterns even if JSON parsing failed
                     # (handles Agno objects whose str() contains step data)
@@ -291,6 +316,7 @@ async def _run_generation(params: dict) -> AsyncIterator[str]:
                 log.rag_results = debug_rag
                 log.selected_template = debug_template
                 log.resolved_prompt = debug_resolved_prompt
+                log.prompt_budget = debug_prompt_budget
                 log.status = "completed"
                 db.commit()
         finally:
@@ -313,11 +339,22 @@ async def _run_generation(params: dict) -> AsyncIterator[str]:
         finally:
             db.close()
 
-        yield _sse({
+        error_event = {
             "type": "error",
             "message": str(e),
             "generation_id": generation_id,
-        })
+        }
+        if is_rate_limit_error(e):
+            error_event["code"] = "rate_limited"
+        yield _sse(error_event)
+    finally:
+        metrics.incr("generations.in_flight", -1)
+
+
+def _record_spans(step_timings: dict, step_name: str, data: dict) -> None:
+    """Record sub-step spans (e.g. governor wait) reported in a step's output."""
+    for span, ms in (data.get("_timings") or {}).items():
+        step_timings[f"{step_name}.{span.removesuffix('_ms')}"] = ms
 
 
 def _get_step_summary(step_name: str, state: dict) -> dict:
@@ -392,10 +429,34 @@ def get_debug(generation_id: str, db: Session = Depends(get_db)):
         "generated_resource": log.generated_resource,
         "step_timings": log.step_timings,
         "token_usage": log.token_usage,
+        "prompt_budget": log.prompt_budget,
         "created_at": str(log.created_at) if log.created_at else None,
     }
 
 
+# ---------------------------------------------------------------------------
+# Metrics endpoint
+# ---------------------------------------------------------------------------
+
+
+@router.get("/metrics")
+def get_metrics():
+    """Return process-wide performance counters and latency percentiles."""
+    return {
+        **metrics.snapshot(),
+        "llm_pool": pool_stats(),
+        "hedging": hedge_report(["input_analyzer", "curriculum_matcher"]),
+        "rate_governor": governor.usage(),
+        "input_fastpath": fastpath_report(),
+        "cag_embedding": embedding_report(),
+        "cag_cache": cache_report(),
+        "rag_cache": rag_cache_report(),
+        "prompt_cache": prompt_cache_report(
+            ["input_analyzer", "curriculum_matcher", "curriculum_matcher_stage1", "resource_generator"]
+        ),
+    }
+
+
 # ---------------------------------------------------------------------------
 # Generation history endpoints
 # ---------------------------------------------------------------------------
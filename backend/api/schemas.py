@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -11,6 +11,9 @@ class GenerateRequest(BaseModel):
     teaching_focus: str = Field(default="explicit_instruction", description="Teaching focus slug")
     resource_type: str = Field(default="worked_example_study", description="Resource type slug")
     additional_context: str = Field(default="", description="Extra teacher notes")
+    rag_mode: Optional[Literal["vector", "keyword", "hybrid"]] = Field(
+        default=None, description="Pedagogy retrieval mode (default: RAG_SEARCH_MODE)"
+    )
 
 
 class ParsedInput(BaseModel):
@@ -7,6 +7,124 @@ class Settings(BaseSettings):
     OPENAI_MODEL_FAST: str = "gpt-4o-mini"
     OPENAI_MODEL_GENERATION: str = "gpt-4o"
 
+    # Shared keep-alive connection pool for all LLM calls
+    LLM_POOL_SIZE: int = 20
+    LLM_KEEPALIVE_EXPIRY_S: float = 60.0
+    LLM_TIMEOUT_S: float = 120.0
+
+    # Hedged requests for the fast-model steps (input analysis, CAG matching)
+    LLM_HEDGING_ENABLED: bool = False
+    LLM_HEDGE_PERCENTILE: float = 95.0
+    LLM_HEDGE_MIN_SAMPLES: int = 20
+    LLM_HEDGE_MIN_DELAY_MS: float = 300.0
+    LLM_HEDGE_BUDGET_RATIO: float = 0.05
+    LLM_HEDGE_BURST: float = 5.0
+
+    # Token/request-per-minute governor (0 = unlimited)
+    OPENAI_FAST_TPM: int = 200_000
+    OPENAI_FAST_RPM: int = 500
+    OPENAI_GENERATION_TPM: int = 30_000
+    OPENAI_GENERATION_RPM: int = 500
+    LLM_EXPECTED_OUTPUT_TOKENS_FAST: int = 400
+    LLM_EXPECTED_OUTPUT_TOKENS_GENERATION: int = 2000
+    LLM_GOVERNOR_BATCH_SHARE: float = 0.5
+    LLM_GOVERNOR_DB_COORDINATION: bool = False
+    LLM_GOVERNOR_MAX_RETRIES: int = 3
+    LLM_GOVERNOR_RETRY_BASE_S: float = 1.0
+
+    # Per-step model routing (see backend.services.model_router)
+    MODEL_ROUTING_TABLE: list[dict] = []
+    MODEL_ROUTING_QUEUE_THRESHOLD: int = 8
+    MODEL_ROUTING_LATENCY_THRESHOLD_MS: float = 45_000.0
+
+    # Resolved prompt token budget (0 = unlimited); per-template overrides by name
+    PROMPT_TOKEN_BUDGET: int = 6000
+    PROMPT_TOKEN_BUDGETS: dict[str, int] = {}
+
+    # Deterministic input analysis for structured form requests
+    INPUT_FASTPATH_ENABLED: bool = True
+    INPUT_FASTPATH_MAX_TOPIC_WORDS: int = 10
+    INPUT_FASTPATH_MIN_OVERLAP: float = 0.6
+    INPUT_FASTPATH_SHADOW_RATE: float = 0.0  # share of hits also sent to the LLM to measure agreement
+
+    # How often the curriculum hash (versioning indexes and caches) is re-read
+    CURRICULUM_HASH_TTL_S: float = 60.0
+
+    # Two-stage matching once the curriculum outgrows one CAG prompt
+    CAG_HIERARCHICAL_THRESHOLD: int = 1000  # descriptors
+    CAG_STAGE1_GROUPS: int = 40  # group summaries shown in stage 1
+    CAG_STAGE1_PICKS: int = 3  # groups whose descriptors go to stage 2
+
+    # Grouped catalogue with short local ids in the CAG prompt; rendered
+    # catalogue blocks are kept in an in-process LRU
+    CAG_COMPACT_PROMPT: bool = True
+    CAG_CATALOGUE_CACHE_SIZE: int = 256
+
+    # BM25 shortlist of CAG candidates (0 = send every descriptor)
+    CAG_SHORTLIST_K: int = 40
+    CAG_SHORTLIST_YEAR_BOOST: float = 0.5  # fraction of the best lexical score
+    CAG_SHORTLIST_STRAND_BOOST: float = 0.3
+    CAG_SHORTLIST_ADJACENT_YEAR_BOOST: float = 0.15  # the year levels either side of the requested one
+
+    # CAG matching mode: "llm" (LLM over the shortlist) or "hybrid" (embedding
+    # top-k, skipping the LLM when the best match is clear)
+    CAG_MATCH_MODE: str = "llm"
+    EMBEDDING_MODEL: str = "text-embedding-3-small"
+    EMBEDDING_DIMENSIONS: int = 1536
+    CAG_EMBEDDING_TOP_K: int = 20
+    CAG_EMBEDDING_YEAR_BOOST: float = 0.03
+    CAG_EMBEDDING_STRAND_BOOST: float = 0.02
+    CAG_BYPASS_MIN_SCORE: float = 0.55
+    CAG_BYPASS_MARGIN: float = 0.06
+    CAG_EMBEDDINGS_CACHE_DIR: str = ".cache/cag"
+
+    # Memoised CAG results (in-process LRU over the cag_match_cache table)
+    CAG_CACHE_ENABLED: bool = True
+    CAG_CACHE_SIZE: int = 1024
+
+    # RAG caches: query embeddings (in-process LRU over rag_query_embeddings)
+    # and search results (in-process, short TTL, per knowledge-base version)
+    RAG_EMBEDDING_CACHE_ENABLED: bool = True
+    RAG_EMBEDDING_CACHE_SIZE: int = 2048
+    RAG_RESULT_CACHE_TTL_S: float = 300.0
+    RAG_RESULT_CACHE_SIZE: int = 256
+
+    # Pedagogy retrieval: "vector", "keyword" or "hybrid" (RRF of both in one query)
+    RAG_SEARCH_MODE: str = "hybrid"
+    RAG_HYBRID_POOL: int = 40  # candidates per list before fusion
+    # "pgvector", or "numpy": search a memory-mapped snapshot exported by the seeder
+    RAG_VECTOR_BACKEND: str = "pgvector"
+    RAG_NUMPY_SNAPSHOT_DIR: str = "data/vectors"
+    # Pre-filter chunks to the matched descriptors, neighbouring years and teaching focus
+    RAG_SCOPE_ENABLED: bool = True
+    RAG_SCOPE_YEAR_RADIUS: int = 1
+    # One query per matched descriptor plus the teaching path, searched concurrently and fused
+    RAG_MULTI_QUERY: bool = False
+
+    # Knowledge base seeding: only new and changed chunks are embedded
+    KB_SEED_BATCH_SIZE: int = 256  # texts per embeddings API call
+    KB_SEED_CONCURRENCY: int = 4  # embedding calls in flight
+    # Pedagogy guides are split at headings into chunks of at most this many tokens
+    KB_CHUNK_MAX_TOKENS: int = 200
+    KB_CHUNK_OVERLAP_TOKENS: int = 30
+    # Portable snapshot (scripts.kb_snapshot); imported at startup into an empty table
+    KB_SNAPSHOT_PATH: str = "data/knowledge_base.snapshot"
+
+    # ANN index on ai.pedagogy_vectors, built by the seeding step
+    VECTOR_INDEX_TYPE: str = "hnsw"  # "hnsw", "ivfflat" or "none"
+    VECTOR_HNSW_M: int = 16
+    VECTOR_HNSW_EF_CONSTRUCTION: int = 64
+    VECTOR_IVFFLAT_LISTS: int = 0  # 0: derived from the row count
+    VECTOR_INDEX_BUILD_MEMORY: str = "256MB"
+    # What the index holds: "vector" (float32), "halfvec" (float16) or "bit" (binary quantised)
+    VECTOR_STORAGE: str = "vector"
+    VECTOR_RESCORE_CANDIDATES: int = 40  # halfvec/bit: candidates reranked at full precision
+    # Query-time knobs, overridable per search
+    VECTOR_HNSW_EF_SEARCH: int = 40
+    VECTOR_IVFFLAT_PROBES: int = 10
+    # pgvector >= 0.8: keep scanning the index until a filtered search has enough rows
+    VECTOR_ITERATIVE_SCAN: str = "strict_order"  # "strict_order", "relaxed_order" or "off"
+
     model_config = {"env_file": ".env", "extra": "ignore"}
 
 
@@ -1,6 +1,6 @@
 import uuid
 
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Text, func
+from sqlalchemy import JSON, BigInteger, Column, DateTime, ForeignKey, Integer, LargeBinary, String, Text, func
 from sqlalchemy.dialects.postgresql import JSONB, UUID
 from sqlalchemy.orm import DeclarativeBase, relationship
 
@@ -9,6 +9,15 @@ class Base(DeclarativeBase):
     pass
 
 
+class Subject(Base):
+    __tablename__ = "subjects"
+
+    id = Column(Integer, primary_key=True)
+    code = Column(String(20), unique=True, nullable=False)
+    title = Column(String(100), nullable=False)
+    learning_area = Column(String(100), nullable=False)
+
+
 class YearLevel(Base):
     __tablename__ = "year_levels"
 
@@ -18,6 +27,7 @@ class YearLevel(Base):
     sort_order = Column(Integer, nullable=False)
     level_description = Column(Text)
     band = Column(String(20), nullable=False)
+    subject_code = Column(String(20), ForeignKey("subjects.code"), nullable=True)
 
     content_descriptors = relationship("ContentDescriptor", back_populates="year_level")
     achievement_standards = relationship("AchievementStandard", back_populates="year_level")
@@ -41,6 +51,7 @@ class ContentDescriptor(Base):
     text = Column(Text, nullable=False)
     year_level_code = Column(String(20), ForeignKey("year_levels.code"), nullable=False)
     strand_title = Column(String(50), ForeignKey("strands.title"), nullable=False)
+    subject_code = Column(String(20), ForeignKey("subjects.code"), nullable=True, index=True)
 
     year_level = relationship("YearLevel", back_populates="content_descriptors")
     strand = relationship("Strand", back_populates="content_descriptors")
@@ -120,5 +131,38 @@ class GenerationLog(Base):
     generated_resource = Column(Text)
     step_timings = Column(JSONB)
     token_usage = Column(JSONB)
+    prompt_budget = Column(JSONB)
     status = Column(String(20), default="pending")
     created_at = Column(DateTime, server_default=func.now())
+
+
+class LlmRateWindow(Base):
+    __tablename__ = "llm_rate_windows"
+
+    model = Column(String(100), primary_key=True)
+    window_start = Column(DateTime(timezone=True), primary_key=True)
+    requests = Column(Integer, nullable=False, default=0)
+    tokens = Column(BigInteger, nullable=False, default=0)
+
+
+class CagMatchCache(Base):
+    __tablename__ = "cag_match_cache"
+
+    key = Column(String(64), primary_key=True)
+    topic_key = Column(Text, nullable=False)
+    year_level = Column(String(50))
+    strand = Column(String(50))
+    curriculum_hash = Column(String(16), nullable=False)
+    model = Column(String(100), nullable=False)
+    matches = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class RagQueryEmbedding(Base):
+    __tablename__ = "rag_query_embeddings"
+
+    key = Column(String(64), primary_key=True)
+    model = Column(String(100), nullable=False)
+    dimensions = Column(Integer, nullable=False)
+    embedding = Column(LargeBinary, nullable=False)  # float32 bytes
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,53 @@
+"""Structured metadata stored with each knowledge base chunk.
+
+Seeding writes these keys into a chunk's ``meta_data``. Migration 009 turns
+them into indexed generated columns on ``ai.pedagogy_vectors``, which the
+retrieval scope filters on (see ``pedagogy_search.Scope``):
+
+- ``doc_type``: ``elaboration`` (one chunk per content descriptor) or
+  ``pedagogy`` (the markdown teaching guides)
+- ``descriptor_code``, ``year`` (0 for Foundation) and ``strand``:
+  elaboration chunks only
+- ``teaching_focus``: the focus a pedagogy guide is written for; unset for
+  general guides (differentiation, the proficiencies), which every focus
+  can retrieve
+- ``heading_path``: for pedagogy chunks, the headings of the section the
+  chunk was cut from (see ``markdown_chunker``); stored, not filtered on
+"""
+
+from backend.services.curriculum_graph import decode_code, year_ordinal
+
+ELABORATION = "elaboration"
+PEDAGOGY = "pedagogy"
+
+# Pedagogy guide (file stem) -> the teaching focus it is written for; guides
+# not listed are general and pass every focus filter
+PEDAGOGY_FOCUS = {
+    "explicit_instruction": "explicit_instruction",
+    "inquiry_based_learning": "deep_learning_inquiry",
+    "assessment_strategies": "assessment_feedback",
+}
+
+# Focuses that draw on every guide, so retrieval does not filter guides for them
+ALL_GUIDES_FOCUSES = frozenset({"planning"})
+
+
+def elaboration_metadata(code: str, year_level: str | None, strand: str | None) -> dict:
+    decoded = decode_code(code)
+    return {
+        "doc_type": ELABORATION,
+        "descriptor_code": code,
+        "year": decoded.year if decoded else year_ordinal(year_level),
+        "strand": strand.strip().lower() if strand else None,
+    }
+
+
+def focus_filter(teaching_focus: str | None) -> str | None:
+    """The teaching focus to filter pedagogy guides on, or ``None`` for every guide."""
+    if not teaching_focus or teaching_focus in ALL_GUIDES_FOCUSES:
+        return None
+    return teaching_focus
+
+
+def pedagogy_metadata(name: str) -> dict:
+    return {"doc_type": PEDAGOGY, "teaching_focus": PEDAGOGY_FOCUS.get(name)}
@@ -0,0 +1,163 @@
+"""Portable snapshots of ``ai.pedagogy_vectors``.
+
+A snapshot is one compressed ``.npz`` file holding the float32 embedding
+matrix, the chunks (id, name, content, metadata, content hash) as JSON, and
+a header with the embedder model and dimensions. Importing one bulk-loads
+the table with ``COPY`` in a single transaction, so a new environment gets
+working retrieval without any embedding calls. The content hashes come
+along too, so a later incremental seed (``kb_sync``) only embeds what
+changed since the snapshot was taken.
+"""
+
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+TABLE = "ai.pedagogy_vectors"
+COLUMNS = ("id", "name", "meta_data", "content", "embedding", "content_hash")
+
+
+class SnapshotMismatch(ValueError):
+    """The snapshot was made with a different embedder than this deployment uses."""
+
+
+@dataclass
+class Snapshot:
+    header: dict
+    chunks: list[dict]
+    embeddings: np.ndarray
+
+    @property
+    def model(self) -> str:
+        return self.header["model"]
+
+    @property
+    def dimensions(self) -> int:
+        return self.header["dimensions"]
+
+
+def write_snapshot(path: Path, snapshot: Snapshot) -> int:
+    """Write ``snapshot`` atomically; returns the file size in bytes."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(f".{path.name}.tmp")
+    with open(tmp, "wb") as f:
+        np.savez_compressed(
+            f,
+            header=np.frombuffer(json.dumps(snapshot.header).encode(), dtype=np.uint8),
+            chunks=np.frombuffer(json.dumps(snapshot.chunks).encode(), dtype=np.uint8),
+            embeddings=np.asarray(snapshot.embeddings, dtype=np.float32),
+        )
+    os.replace(tmp, path)
+    return path.stat().st_size
+
+
+def read_snapshot(path: Path) -> Snapshot:
+    with np.load(path, allow_pickle=False) as data:
+        header = json.loads(data["header"].tobytes())
+        if header.get("format") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported snapshot format {header.get('format')!r}")
+        return Snapshot(header, json.loads(data["chunks"].tobytes()), data["embeddings"])
+
+
+def export_snapshot(engine: Engine, path: Path, model: str) -> tuple[Snapshot, int]:
+    """Snapshot the table to ``path``; returns it and the file size."""
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            f"SELECT id, name, meta_data, content, embedding::text AS embedding, content_hash "
+            f"FROM {TABLE} WHERE embedding IS NOT NULL ORDER BY id"
+        )).fetchall()
+    embeddings = np.array([json.loads(row.embedding) for row in rows], dtype=np.float32)
+    dimensions = int(embeddings.shape[1]) if len(rows) else 0
+    snapshot = Snapshot(
+        header={
+            "format": FORMAT_VERSION,
+            "model": model,
+            "dimensions": dimensions,
+            "rows": len(rows),
+            "created_at": datetime.now(timezone.utc).isoformat(),
+        },
+        chunks=[
+            {
+                "id": row.id,
+                "name": row.name,
+                "content": row.content,
+                "meta_data": row.meta_data or {},
+                "content_hash": row.content_hash,
+            }
+            for row in rows
+        ],
+        embeddings=embeddings.reshape(len(rows), dimensions),
+    )
+    return snapshot, write_snapshot(path, snapshot)
+
+
+def table_dimensions(engine: Engine) -> int | None:
+    """Declared dimensions of the table's ``embedding`` column, if it exists."""
+    with engine.connect() as conn:
+        declared = conn.execute(text(
+            "SELECT format_type(atttypid, atttypmod) FROM pg_attribute "
+            "WHERE attrelid = to_regclass(:table) AND attname = 'embedding'"
+        ), {"table": TABLE}).scalar()
+    if not declared or "(" not in declared:
+        return None
+    return int(declared.split("(", 1)[1].rstrip(")"))
+
+
+def table_rows(engine: Engine) -> int:
+    with engine.connect() as conn:
+        return conn.execute(text(f"SELECT count(*) FROM {TABLE}")).scalar_one()
+
+
+def check_compatible(snapshot: Snapshot, model: str, dimensions: int | None) -> None:
+    """Refuse a snapshot whose vectors this deployment couldn't search."""
+    if snapshot.model != model:
+        raise SnapshotMismatch(f"Snapshot embedder is {snapshot.model!r}, this deployment uses {model!r}")
+    if dimensions is not None and snapshot.chunks and snapshot.dimensions != dimensions:
+        raise SnapshotMismatch(f"Snapshot has {snapshot.dimensions}-d vectors, the table expects {dimensions}")
+
+
+def copy_rows(snapshot: Snapshot):
+    """``COPY`` rows (text format) for the snapshot's chunks."""
+    for chunk, vector in zip(snapshot.chunks, snapshot.embeddings):
+        yield (
+            chunk["id"],
+            chunk["name"],
+            json.dumps(chunk["meta_data"]),
+            chunk["content"],
+            "[" + ",".join(f"{x:.9g}" for x in vector.tolist()) + "]",  # exact for float32
+            chunk["content_hash"],
+        )
+
+
+def import_snapshot(engine: Engine, snapshot: Snapshot) -> float:
+    """Replace the table's rows with the snapshot's in one transaction; returns the load time in ms."""
+    start = time.perf_counter()
+    raw = engine.raw_connection()
+    try:
+        with raw.cursor() as cur:
+            cur.execute(f"TRUNCATE {TABLE}")
+            with cur.copy(f"COPY {TABLE} ({', '.join(COLUMNS)}) FROM STDIN") as copy:
+                for row in copy_rows(snapshot):
+                    copy.write_row(row)
+            cur.execute(f"ANALYZE {TABLE}")
+        raw.commit()
+    except Exception:
+        raw.rollback()
+        raise
+    finally:
+        raw.close()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    logger.info("Imported %d chunks in %.0f ms", len(snapshot.chunks), elapsed_ms)
+    return elapsed_ms
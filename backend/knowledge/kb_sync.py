@@ -0,0 +1,161 @@
+"""Incremental sync of the source documents into ``ai.pedagogy_vectors``.
+
+Each source chunk has a stable id (``elaboration:AC9M5N06``,
+``pedagogy:differentiation:1``) and a content hash over its text, its
+metadata and the embedder's model and dimensions, stored in the row's
+``content_hash``. A sync compares those hashes with the table and then:
+
+- embeds only new and changed chunks, in batches of ``KB_SEED_BATCH_SIZE``
+  texts per API call with at most ``KB_SEED_CONCURRENCY`` calls in flight;
+- upserts them by id, so changed chunks are updated in place;
+- deletes rows whose chunk is no longer in the sources.
+
+A restart with unchanged sources costs one query and no embedding calls.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects import postgresql
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SourceChunk:
+    id: str
+    name: str
+    content: str
+    meta_data: dict = field(default_factory=dict, hash=False)
+
+
+@dataclass
+class SyncPlan:
+    new: list[SourceChunk]
+    changed: list[SourceChunk]
+    unchanged: int
+    deleted: list[str]
+
+    @property
+    def to_embed(self) -> list[SourceChunk]:
+        return self.new + self.changed
+
+
+@dataclass
+class SyncResult:
+    inserted: int
+    updated: int
+    unchanged: int
+    deleted: int
+    embed_calls: int
+    elapsed_ms: float
+
+    @property
+    def changed(self) -> bool:
+        return bool(self.inserted or self.updated or self.deleted)
+
+
+def chunk_hash(chunk: SourceChunk, model: str, dimensions: int | None) -> str:
+    # Metadata is hashed too, so a corrected tag reaches the table on the next sync
+    meta = json.dumps(chunk.meta_data, sort_keys=True)
+    return hashlib.sha256(f"{model}|{dimensions}|{chunk.name}|{meta}|{chunk.content}".encode()).hexdigest()
+
+
+def plan_sync(chunks: list[SourceChunk], existing: dict[str, str], model: str, dimensions: int | None) -> SyncPlan:
+    """What a sync has to do, given the table's ``{id: content_hash}``."""
+    new, changed, unchanged = [], [], 0
+    for chunk in chunks:
+        stored = existing.get(chunk.id)
+        if stored is None:
+            new.append(chunk)
+        elif stored != chunk_hash(chunk, model, dimensions):
+            changed.append(chunk)
+        else:
+            unchanged += 1
+    ids = {c.id for c in chunks}
+    return SyncPlan(new, changed, unchanged, sorted(i for i in existing if i not in ids))
+
+
+def embed_batches(texts: list[str], embed, batch_size: int, concurrency: int) -> tuple[list[list[float]], int]:
+    """Embeddings of ``texts`` in order, via ``embed(batch) -> list of vectors``; also returns the calls made."""
+    batches = [texts[i : i + batch_size] for i in range(0, len(texts), batch_size)]
+    if not batches:
+        return [], 0
+    with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(batches)))) as pool:
+        results = list(pool.map(embed, batches))
+    embeddings = [vector for batch in results for vector in batch]
+    if len(embeddings) != len(texts):
+        raise RuntimeError(f"Expected {len(texts)} embeddings, got {len(embeddings)}")
+    return embeddings, len(batches)
+
+
+def openai_batch_embedder(embedder):
+    """``embed(batch)`` for an agno ``OpenAIEmbedder``, one API call per batch."""
+
+    def embed(batch: list[str]) -> list[list[float]]:
+        response = embedder.response(batch)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+    return embed
+
+
+def sync_knowledge_base(vector_db, chunks: list[SourceChunk], embed=None) -> SyncResult:
+    """Bring ``vector_db``'s table in line with ``chunks``."""
+    start = time.perf_counter()
+    table = vector_db.table
+    model, dimensions = vector_db.embedder.id, vector_db.embedder.dimensions
+    with vector_db.db_engine.connect() as conn:
+        existing = dict(conn.execute(select(table.c.id, table.c.content_hash)).fetchall())
+    plan = plan_sync(chunks, existing, model, dimensions)
+
+    todo = plan.to_embed
+    embeddings, calls = embed_batches(
+        [c.content for c in todo],
+        embed or openai_batch_embedder(vector_db.embedder),
+        settings.KB_SEED_BATCH_SIZE,
+        settings.KB_SEED_CONCURRENCY,
+    )
+    with vector_db.db_engine.begin() as conn:
+        if todo:
+            stmt = postgresql.insert(table).values([
+                {
+                    "id": c.id,
+                    "name": c.name,
+                    "meta_data": c.meta_data,
+                    "content": c.content,
+                    "embedding": embedding,
+                    "content_hash": chunk_hash(c, model, dimensions),
+                }
+                for c, embedding in zip(todo, embeddings)
+            ])
+            conn.execute(stmt.on_conflict_do_update(
+                index_elements=[table.c.id],
+                set_={
+                    "name": stmt.excluded.name,
+                    "meta_data": stmt.excluded.meta_data,
+                    "content": stmt.excluded.content,
+                    "embedding": stmt.excluded.embedding,
+                    "content_hash": stmt.excluded.content_hash,
+                    "updated_at": func.now(),
+                },
+            ))
+        if plan.deleted:
+            conn.execute(delete(table).where(table.c.id.in_(plan.deleted)))
+
+    result = SyncResult(
+        inserted=len(plan.new),
+        updated=len(plan.changed),
+        unchanged=plan.unchanged,
+        deleted=len(plan.deleted),
+        embed_calls=calls,
+        elapsed_ms=(time.perf_counter() - start) * 1000,
+    )
+    logger.info("Knowledge base sync: %s", result)
+    return result
@@ -0,0 +1,205 @@
+"""Heading-aware, token-bounded chunking of the markdown pedagogy guides.
+
+A guide is split at its headings, so every chunk covers one section, and its
+text starts with the section's heading path (``Differentiation > Scaffolding
+Strategies > Enabling Prompts``) for context. Inside a section the text is
+parsed into blocks (paragraphs, lists, tables, fenced code), and the blocks
+are packed into chunks of at most ``max_tokens`` (estimated with
+``token_budget.count_tokens``):
+
+- lists, tables and code blocks are never split, so one that is longer than
+  the window becomes a chunk of its own;
+- paragraphs longer than the window are split at sentence ends;
+- when a section needs several chunks, each one after the first repeats up
+  to ``overlap_tokens`` from the end of the one before;
+- a short lead-in before a section's first subheading ("In mathematics,
+  this includes:") is carried into that subsection's first chunk instead
+  of becoming a chunk of its own.
+"""
+
+import re
+from dataclasses import dataclass
+
+from backend.services.token_budget import count_tokens
+
+_HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+_LIST_RE = re.compile(r"^\s*(?:[-*+]|\d+[.)])\s+")
+_FENCE_RE = re.compile(r"^\s*(```|~~~)")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+PATH_SEPARATOR = " > "
+LEAD_IN_TOKENS = 40  # shorter section intros are carried into the first subsection
+
+
+@dataclass(frozen=True)
+class MarkdownChunk:
+    content: str
+    heading_path: tuple[str, ...]
+
+    @property
+    def section(self) -> str:
+        return self.heading_path[-1] if self.heading_path else ""
+
+
+@dataclass
+class _Section:
+    level: int
+    heading_path: tuple[str, ...]
+    blocks: list[tuple[str, str]]  # (kind, text)
+
+
+def _blocks(lines: list[str]) -> list[tuple[str, str]]:
+    """Group a section's lines into paragraph, list, table and code blocks."""
+    blocks: list[tuple[str, str]] = []
+    kind, current = None, []
+
+    def flush():
+        nonlocal kind, current
+        if current:
+            blocks.append((kind, "\n".join(current).strip("\n")))
+        kind, current = None, []
+
+    for line in lines:
+        if kind == "code":
+            current.append(line)
+            if _FENCE_RE.match(line):
+                flush()
+            continue
+        if _FENCE_RE.match(line):
+            flush()
+            kind, current = "code", [line]
+        elif not line.strip():
+            # Blank lines end paragraphs and tables; a list may continue after one
+            if kind != "list":
+                flush()
+            elif current[-1].strip():
+                current.append(line)
+        elif line.lstrip().startswith("|"):
+            if kind != "table":
+                flush()
+            kind = "table"
+            current.append(line)
+        elif _LIST_RE.match(line) or (kind == "list" and line[:1].isspace()):
+            if kind != "list":
+                flush()
+            kind = "list"
+            current.append(line)
+        else:
+            if kind != "paragraph":
+                flush()
+            kind = "paragraph"
+            current.append(line)
+    flush()
+    return [(k, text.rstrip()) for k, text in blocks if text.strip()]
+
+
+def _sections(text: str) -> list[_Section]:
+    sections = [_Section(0, (), [])]
+    path: list[tuple[int, str]] = []
+    lines: list[str] = []
+    in_code = False
+    for line in text.splitlines():
+        if _FENCE_RE.match(line):
+            in_code = not in_code
+        heading = None if in_code else _HEADING_RE.match(line)
+        if heading is None:
+            lines.append(line)
+            continue
+        sections[-1].blocks = _blocks(lines)
+        lines = []
+        level = len(heading.group(1))
+        path = [(lvl, title) for lvl, title in path if lvl < level] + [(level, heading.group(2))]
+        sections.append(_Section(level, tuple(title for _, title in path), []))
+    sections[-1].blocks = _blocks(lines)
+    return sections
+
+
+def _split_paragraph(text: str, max_tokens: int) -> list[str]:
+    pieces, current = [], []
+    for sentence in _SENTENCE_RE.split(text):
+        if current and count_tokens(" ".join(current + [sentence])) > max_tokens:
+            pieces.append(" ".join(current))
+            current = []
+        current.append(sentence)
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def _overlap(blocks: list[tuple[str, str]], overlap_tokens: int) -> list[tuple[str, str]]:
+    """Trailing blocks (or sentences of a trailing paragraph) within ``overlap_tokens``."""
+    tail: list[tuple[str, str]] = []
+    used = 0
+    for kind, text in reversed(blocks):
+        cost = count_tokens(text)
+        if used + cost <= overlap_tokens:
+            tail.insert(0, (kind, text))
+            used += cost
+            continue
+        if kind == "paragraph":
+            sentences = _SENTENCE_RE.split(text)
+            kept: list[str] = []
+            for sentence in reversed(sentences):
+                if used + count_tokens(" ".join([sentence] + kept)) > overlap_tokens:
+                    break
+                kept.insert(0, sentence)
+            if kept:
+                tail.insert(0, (kind, " ".join(kept)))
+        break
+    return tail
+
+
+def _pack(
+    blocks: list[tuple[str, str]], header: str, max_tokens: int, overlap_tokens: int
+) -> list[list[tuple[str, str]]]:
+    budget = max(1, max_tokens - count_tokens(header))
+    # Pieces of a long paragraph leave room for the overlap carried in front of them
+    piece_budget = max(1, budget - overlap_tokens)
+    units: list[tuple[str, str]] = []
+    for kind, text in blocks:
+        if kind == "paragraph" and count_tokens(text) > budget:
+            units.extend((kind, piece) for piece in _split_paragraph(text, piece_budget))
+        else:
+            units.append((kind, text))
+
+    packs: list[list[tuple[str, str]]] = []
+    current: list[tuple[str, str]] = []
+    fresh = 0  # blocks in ``current`` that are not overlap
+    for unit in units:
+        candidate = "\n\n".join(text for _, text in current + [unit])
+        if fresh and count_tokens(candidate) > budget:
+            packs.append(current)
+            current = _overlap(current, overlap_tokens)
+            if count_tokens("\n\n".join(text for _, text in current + [unit])) > budget:
+                current = []
+            fresh = 0
+        current.append(unit)
+        fresh += 1
+    if fresh:
+        packs.append(current)
+    return packs
+
+
+def chunk_markdown(text: str, max_tokens: int, overlap_tokens: int = 0) -> list[MarkdownChunk]:
+    """Split a markdown document into heading-scoped chunks of at most ``max_tokens``."""
+    chunks: list[MarkdownChunk] = []
+    sections = _sections(text)
+    lead_in: list[tuple[str, str]] = []
+    for i, section in enumerate(sections):
+        blocks = lead_in + section.blocks
+        lead_in = []
+        if not blocks:
+            continue
+        following = sections[i + 1] if i + 1 < len(sections) else None
+        if (
+            following is not None
+            and following.level > section.level
+            and count_tokens("\n\n".join(text for _, text in blocks)) < LEAD_IN_TOKENS
+        ):
+            lead_in = blocks
+            continue
+        header = PATH_SEPARATOR.join(section.heading_path)
+        for pack in _pack(blocks, header, max_tokens, overlap_tokens):
+            body = "\n\n".join(text for _, text in pack)
+            chunks.append(MarkdownChunk(f"{header}\n\n{body}" if header else body, section.heading_path))
+    return chunks
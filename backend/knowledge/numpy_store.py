@@ -0,0 +1,250 @@
+"""In-process vector backend: a memory-mapped NumPy snapshot of the knowledge base.
+
+The pedagogy knowledge base is a few hundred chunks, so a search does not
+need a round trip to Postgres. ``export_snapshot`` writes every chunk's
+normalised embedding to ``embeddings.npy`` and its id, name, content and
+metadata to ``chunks.json`` in a new snapshot directory, then switches the
+``CURRENT`` pointer to it with an atomic rename. Each worker memory-maps the
+embeddings, so they share one copy through the page cache. A worker notices
+a new snapshot within ``SNAPSHOT_CHECK_S`` and loads it on the next search.
+
+Search is a matrix-vector product over the (scoped) rows; keyword and hybrid
+modes rank on the chunks' content words and fuse by reciprocal rank, like
+the SQL versions in ``pedagogy_search``.
+"""
+
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+from agno.knowledge.document import Document
+from agno.vectordb.distance import Distance
+from agno.vectordb.score import normalize_score
+from sqlalchemy import select
+
+from backend.config import settings
+from backend.knowledge.chunk_metadata import ELABORATION, PEDAGOGY
+from backend.services.input_analysis import content_words, normalise
+
+logger = logging.getLogger(__name__)
+
+CURRENT = "CURRENT"
+EMBEDDINGS = "embeddings.npy"
+CHUNKS = "chunks.json"
+SNAPSHOT_CHECK_S = 5.0
+KEEP_SNAPSHOTS = 2  # the current one and its predecessor, which workers may still have mapped
+
+
+def snapshot_dir() -> Path:
+    return Path(settings.RAG_NUMPY_SNAPSHOT_DIR)
+
+
+def current_snapshot(directory: Path | None = None) -> str | None:
+    """Name of the snapshot ``CURRENT`` points to, if any."""
+    try:
+        return ((directory or snapshot_dir()) / CURRENT).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def snapshot_version(directory: Path | None = None) -> str | None:
+    """Knowledge base version the current snapshot was exported at."""
+    directory = directory or snapshot_dir()
+    name = current_snapshot(directory)
+    if name is None:
+        return None
+    try:
+        with open(directory / name / CHUNKS, encoding="utf-8") as f:
+            return json.load(f).get("version")
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def export_snapshot(vector_db, version: str, directory: Path | None = None) -> str:
+    """Write the vector table to a new snapshot and make it current; returns its name."""
+    directory = directory or snapshot_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    table = vector_db.table
+    with vector_db.db_engine.connect() as conn:
+        rows = conn.execute(
+            select(table.c.id, table.c.name, table.c.meta_data, table.c.content, table.c.embedding)
+            .where(table.c.embedding.isnot(None))
+            .order_by(table.c.id)
+        ).fetchall()
+
+    embeddings = np.asarray([np.asarray(row.embedding, dtype=np.float32) for row in rows], dtype=np.float32)
+    if len(rows):
+        embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+    chunks = [
+        {"id": row.id, "name": row.name, "content": row.content, "meta_data": row.meta_data or {}}
+        for row in rows
+    ]
+
+    name = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    staging = directory / f".{name}.tmp"
+    staging.mkdir()
+    np.save(staging / EMBEDDINGS, embeddings)
+    with open(staging / CHUNKS, "w", encoding="utf-8") as f:
+        json.dump({"version": version, "model": vector_db.embedder.id, "chunks": chunks}, f)
+    staging.rename(directory / name)
+
+    pointer = directory / f".{CURRENT}.tmp"
+    pointer.write_text(name)
+    os.replace(pointer, directory / CURRENT)
+    _prune(directory, name)
+    logger.info("Exported %d chunks to vector snapshot %s", len(chunks), name)
+    return name
+
+
+def _prune(directory: Path, current: str) -> None:
+    snapshots = sorted(p for p in directory.iterdir() if p.is_dir() and not p.name.startswith("."))
+    for old in snapshots[:-KEEP_SNAPSHOTS]:
+        if old.name != current:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+class NumpyVectorStore:
+    """One loaded snapshot: mapped embeddings plus per-chunk metadata arrays."""
+
+    def __init__(self, path: Path):
+        self.name = path.name
+        self.embeddings = np.load(path / EMBEDDINGS, mmap_mode="r")
+        with open(path / CHUNKS, encoding="utf-8") as f:
+            data = json.load(f)
+        self.version = data.get("version")
+        self.chunks = data["chunks"]
+        meta = [c["meta_data"] for c in self.chunks]
+        self.doc_type = np.array([m.get("doc_type") for m in meta], dtype=object)
+        self.descriptor_code = np.array([m.get("descriptor_code") for m in meta], dtype=object)
+        self.year = np.array([-1 if m.get("year") is None else m["year"] for m in meta], dtype=np.int16)
+        self.strand = np.array([m.get("strand") for m in meta], dtype=object)
+        self.teaching_focus = np.array([m.get("teaching_focus") for m in meta], dtype=object)
+        self.terms = [{normalise(w) for w in content_words(c["content"] or "")} for c in self.chunks]
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def mask(self, scope) -> np.ndarray:
+        """Rows ``scope`` allows, with the same rules as ``Scope.clause``."""
+        n = len(self.chunks)
+        if scope is None:
+            return np.ones(n, dtype=bool)
+        elaboration = np.zeros(n, dtype=bool) if scope.codes or scope.years else np.ones(n, dtype=bool)
+        if scope.codes:
+            elaboration |= np.isin(self.descriptor_code, list(scope.codes))
+        if scope.years:
+            nearby = np.isin(self.year, list(scope.years))
+            if scope.strands:
+                nearby &= np.isin(self.strand, list(scope.strands))
+            elaboration |= nearby
+        pedagogy = np.ones(n, dtype=bool)
+        if scope.teaching_focus:
+            pedagogy = (self.teaching_focus == None) | (self.teaching_focus == scope.teaching_focus)  # noqa: E711
+        return (
+            (self.doc_type == None)  # noqa: E711
+            | ((self.doc_type == ELABORATION) & elaboration)
+            | ((self.doc_type == PEDAGOGY) & pedagogy)
+        )
+
+    def vector_ranking(self, embedding, rows: np.ndarray, limit: int) -> list[tuple[int, float]]:
+        """(row, cosine similarity) of the nearest ``limit`` of ``rows``."""
+        if not len(rows):
+            return []
+        query = np.array(embedding, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        scores = self.embeddings[rows] @ query
+        top = np.argpartition(-scores, limit - 1)[:limit] if len(rows) > limit else np.arange(len(rows))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(int(rows[i]), float(scores[i])) for i in top]
+
+    def keyword_ranking(self, terms: list[str], rows: np.ndarray, limit: int) -> list[tuple[int, float]]:
+        """(row, share of ``terms`` present) for rows containing any of them."""
+        wanted = {normalise(t) for t in terms}
+        if not wanted:
+            return []
+        scored = [(int(i), len(wanted & self.terms[i]) / len(wanted)) for i in rows]
+        scored = [s for s in scored if s[1] > 0]
+        scored.sort(key=lambda s: -s[1])
+        return scored[:limit]
+
+    def search(
+        self,
+        embedding: list[float] | None,
+        terms: list[str],
+        limit: int,
+        mode: str,
+        scope=None,
+        pool: int | None = None,
+    ) -> list[Document]:
+        from backend.knowledge.pedagogy_search import HYBRID, KEYWORD, RRF_K  # it imports this module
+
+        rows = np.flatnonzero(self.mask(scope))
+        if mode == KEYWORD or not embedding:
+            return [self._document(i, score) for i, score in self.keyword_ranking(terms, rows, limit)]
+        if mode == HYBRID and terms:
+            pool = pool or settings.RAG_HYBRID_POOL
+            fused: dict[int, float] = {}
+            for ranking in (self.vector_ranking(embedding, rows, pool), self.keyword_ranking(terms, rows, pool)):
+                for rank, (i, _) in enumerate(ranking, 1):
+                    fused[i] = fused.get(i, 0.0) + 1.0 / (RRF_K + rank)
+            best = sorted(fused.items(), key=lambda item: -item[1])[:limit]
+            return [self._document(i, score) for i, score in best]
+        return [
+            self._document(i, normalize_score(1.0 - score, Distance.cosine))
+            for i, score in self.vector_ranking(embedding, rows, limit)
+        ]
+
+    def _document(self, i: int, score: float) -> Document:
+        chunk = self.chunks[i]
+        meta_data = dict(chunk["meta_data"])
+        meta_data["similarity_score"] = score
+        return Document(id=chunk["id"], name=chunk["name"], meta_data=meta_data, content=chunk["content"])
+
+
+_store: NumpyVectorStore | None = None
+_checked_at = 0.0
+_lock = threading.Lock()
+
+
+def get_store() -> NumpyVectorStore:
+    """The current snapshot, reloaded when ``CURRENT`` has moved on."""
+    global _store, _checked_at
+    now = time.monotonic()
+    if _store is not None and now - _checked_at < SNAPSHOT_CHECK_S:
+        return _store
+    with _lock:
+        if _store is None or now - _checked_at >= SNAPSHOT_CHECK_S:
+            directory = snapshot_dir()
+            name = current_snapshot(directory)
+            if name is None:
+                raise FileNotFoundError(f"No vector snapshot in {directory}; run the knowledge seeder")
+            if _store is None or _store.name != name:
+                start = time.perf_counter()
+                _store = NumpyVectorStore(directory / name)
+                logger.info(
+                    "Loaded vector snapshot %s (%d chunks) in %.0f ms",
+                    name, len(_store), (time.perf_counter() - start) * 1000,
+                )
+            _checked_at = now
+    return _store
+
+
+def reset_store() -> None:
+    global _store, _checked_at
+    _store, _checked_at = None, 0.0
+
+
+def warm_store() -> None:
+    """Map the snapshot at startup when it is the configured backend."""
+    if settings.RAG_VECTOR_BACKEND != "numpy":  # pedagogy_search.NUMPY
+        return
+    try:
+        get_store()
+    except Exception:
+        logger.warning("Could not load the vector snapshot at startup", exc_info=True)
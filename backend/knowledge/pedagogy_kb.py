@@ -1,21 +1,152 @@
-"""PgVector knowledge base for pedagogy documents and elaborations."""
+"""PgVector knowledge base for pedagogy documents and elaborations.
+
+Building a knowledge base connects to check and create the vector table,
+so it is a process-wide singleton: it borrows the application's SQLAlchemy
+engine (and so its connection pool) and the pooled OpenAI client, and is
+warmed at startup so the first retrieval doesn't pay for engine creation,
+table checks and connection setup. ``PgVector`` uses a thread-local scoped
+session per call, so the shared instance is safe to search from the request
+handlers and the RAG prefetch workers at the same time.
+
+The NumPy backend searches a snapshot instead, so it embeds queries with
+``get_query_embedder``, which touches neither the engine nor the
+Postgres-backed embedding cache.
+"""
+
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
 
 from agno.knowledge.embedder.openai import OpenAIEmbedder
 from agno.knowledge.knowledge import Knowledge
 from agno.vectordb.pgvector import PgVector, SearchType
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
 
 from backend.config import settings
+from backend.db.session import engine
+from backend.services.llm_pool import get_openai_client
+from backend.services.metrics import metrics
+from backend.services.rag_cache import EmbeddingCache, embedding_cache, memory_embedding_cache
 
+logger = logging.getLogger(__name__)
 
-def get_knowledge_base() -> Knowledge:
-    vector_db = PgVector(
+
+@dataclass
+class CachedOpenAIEmbedder(OpenAIEmbedder):
+    """OpenAI embedder that serves repeated query texts from the embedding cache."""
+
+    cache: EmbeddingCache = field(default=embedding_cache, repr=False)
+
+    def get_embedding(self, text: str) -> list[float]:
+        if not settings.RAG_EMBEDDING_CACHE_ENABLED:
+            return super().get_embedding(text)
+        embedding = self.cache.get(text, self.id, self.dimensions)
+        if embedding is None:
+            embedding = super().get_embedding(text)
+            if embedding:
+                self.cache.put(text, self.id, self.dimensions, embedding)
+        return embedding
+
+    def get_embeddings(self, texts: list[str]) -> list[list[float]]:
+        """Embeddings of ``texts`` in order; the uncached ones in a single API call."""
+        cached = [
+            self.cache.get(text, self.id, self.dimensions) if settings.RAG_EMBEDDING_CACHE_ENABLED else None
+            for text in texts
+        ]
+        missing = list(dict.fromkeys(t for t, e in zip(texts, cached) if e is None))
+        if not missing:
+            return cached
+        response = self.response(missing)
+        fresh = {missing[item.index]: item.embedding for item in response.data}
+        if settings.RAG_EMBEDDING_CACHE_ENABLED:
+            for text, embedding in fresh.items():
+                self.cache.put(text, self.id, self.dimensions, embedding)
+        return [e if e is not None else fresh.get(t, []) for t, e in zip(texts, cached)]
+
+
+_knowledge_base: Knowledge | None = None
+_query_embedder: CachedOpenAIEmbedder | None = None
+_lock = threading.Lock()
+
+
+def build_vector_db(db_engine: Engine | None = None) -> PgVector:
+    """The pedagogy vector store on ``db_engine`` and the pooled, cached embedder.
+
+    Without an engine it creates its own engine and an uncached OpenAI
+    embedder, as every retrieval used to (kept for the latency benchmark).
+    """
+    return PgVector(
         table_name="pedagogy_vectors",
-        db_url=settings.DATABASE_URL,
+        db_url=None if db_engine else settings.DATABASE_URL,
+        db_engine=db_engine,
         search_type=SearchType.vector,
-        embedder=OpenAIEmbedder(id="text-embedding-3-small"),
+        embedder=(
+            CachedOpenAIEmbedder(
+                id=settings.EMBEDDING_MODEL,
+                dimensions=settings.EMBEDDING_DIMENSIONS,
+                openai_client=get_openai_client(),
+            )
+            if db_engine
+            else OpenAIEmbedder(id=settings.EMBEDDING_MODEL, dimensions=settings.EMBEDDING_DIMENSIONS)
+        ),
     )
+
+
+def build_knowledge_base(db_engine: Engine | None = None) -> Knowledge:
+    """A new knowledge base; this connects to create the table if it is missing."""
     return Knowledge(
         name="Pedagogy Knowledge Base",
         description="Educational pedagogy documents and curriculum elaborations for mathematics teaching",
-        vector_db=vector_db,
+        vector_db=build_vector_db(db_engine),
     )
+
+
+def get_knowledge_base() -> Knowledge:
+    """The process-wide knowledge base on the application's engine."""
+    global _knowledge_base
+    if _knowledge_base is None:
+        with _lock:
+            if _knowledge_base is None:
+                start = time.perf_counter()
+                _knowledge_base = build_knowledge_base(engine)
+                metrics.observe("knowledge_base.build_ms", (time.perf_counter() - start) * 1000)
+    return _knowledge_base
+
+
+def get_query_embedder() -> CachedOpenAIEmbedder:
+    """Pooled query embedder with an in-process cache only, for searches that need no database."""
+    global _query_embedder
+    if _query_embedder is None:
+        with _lock:
+            if _query_embedder is None:
+                _query_embedder = CachedOpenAIEmbedder(
+                    id=settings.EMBEDDING_MODEL,
+                    dimensions=settings.EMBEDDING_DIMENSIONS,
+                    openai_client=get_openai_client(),
+                    cache=memory_embedding_cache,
+                )
+    return _query_embedder
+
+
+def reset_knowledge_base() -> None:
+    global _knowledge_base, _query_embedder
+    _knowledge_base = _query_embedder = None
+
+
+def warm_knowledge_base() -> None:
+    """Build the knowledge base, open a pooled connection and run a probe query."""
+    start = time.perf_counter()
+    try:
+        vector_db = get_knowledge_base().vector_db
+        if not vector_db.table_exists():
+            logger.warning("Knowledge base table %s does not exist yet", vector_db.table.fullname)
+            return
+        with vector_db.Session() as sess:
+            sess.execute(select(vector_db.table.c.id).limit(1)).first()
+        vector_db.Session.remove()
+    except Exception:
+        logger.warning("Could not warm the knowledge base at startup", exc_info=True)
+        return
+    logger.info("Knowledge base ready in %.0f ms", (time.perf_counter() - start) * 1000)
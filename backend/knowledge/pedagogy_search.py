@@ -0,0 +1,369 @@
+"""Pedagogy retrieval over ``ai.pedagogy_vectors``.
+
+Searches run as SQL on the shared knowledge base's engine rather than
+through ``PgVector.search``, whose ANN knobs are fixed per instance: here
+``ef_search`` and ``probes`` are set per call (see ``vector_index``), and
+``exact=True`` bypasses the index for recall measurements.
+
+Three modes:
+
+- ``vector``: cosine nearest neighbours of the query embedding.
+- ``keyword``: full-text ranking on the ``content_tsv`` column (GIN index),
+  matching any of the query's content words.
+- ``hybrid``: both candidate lists, fused with reciprocal rank fusion, in a
+  single SQL statement, so exact terms such as "denominator" are found
+  without an extra round trip.
+
+With ``RAG_VECTOR_BACKEND=numpy`` the same searches run in-process on a
+memory-mapped snapshot of the table instead (see ``numpy_store``), and
+neither the search nor the query embedding touches the database.
+
+Any mode can be narrowed by a ``Scope`` on the indexed metadata columns
+(see ``chunk_metadata``) before ranking, so chunks for unrelated year levels
+or other teaching focuses are neither scanned nor returned.
+
+``multi_search`` runs several focused queries (one per matched descriptor,
+say) for one request: their embeddings come from a single batched call, the
+searches run concurrently, and the ranked lists are fused by reciprocal rank
+with duplicates removed.
+
+If the query embedding cannot be had (the embedding API is unreachable, as
+in an air-gapped deployment), both fall back to keyword search and count
+``rag.embedding_fallbacks``.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from agno.exceptions import EmbeddingError
+from agno.knowledge.document import Document
+from agno.vectordb.distance import Distance
+from agno.vectordb.score import normalize_score
+from openai import OpenAIError
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import bindparam, text
+
+from backend.config import settings
+from backend.knowledge import numpy_store, vector_index
+from backend.knowledge.chunk_metadata import ELABORATION, PEDAGOGY
+from backend.knowledge.pedagogy_kb import get_knowledge_base, get_query_embedder
+from backend.knowledge.vector_index import apply_search_params
+from backend.services.input_analysis import content_words
+from backend.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+VECTOR = "vector"
+KEYWORD = "keyword"
+HYBRID = "hybrid"
+MODES = (VECTOR, KEYWORD, HYBRID)
+PGVECTOR = "pgvector"
+NUMPY = "numpy"
+
+RRF_K = 60  # rank constant from the original RRF paper
+MAX_QUERY_TERMS = 32
+
+_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="rag-search")
+
+KEYWORD_SQL = """
+    SELECT id, name, meta_data, content, ts_rank_cd(content_tsv, query) AS score
+    FROM ai.pedagogy_vectors, to_tsquery('english', :terms) AS query
+    WHERE content_tsv @@ query AND {scope}
+    ORDER BY score DESC
+    LIMIT :limit
+"""
+
+# Candidates come from the ANN index (on a quantised expression, for halfvec
+# and bit storage) and are reranked on the full-precision column
+VECTOR_SQL = """
+    WITH candidates AS (
+        SELECT id
+        FROM ai.pedagogy_vectors
+        WHERE {scope}
+        ORDER BY {distance}
+        LIMIT :candidates
+    )
+    SELECT v.id, v.name, v.meta_data, v.content, v.embedding <=> :embedding AS distance
+    FROM candidates c JOIN ai.pedagogy_vectors v ON v.id = c.id
+    ORDER BY distance
+    LIMIT :limit
+"""
+
+HYBRID_SQL = """
+    WITH candidates AS (
+        SELECT id
+        FROM ai.pedagogy_vectors
+        WHERE {scope}
+        ORDER BY {distance}
+        LIMIT :candidates
+    ),
+    semantic AS (
+        SELECT id, row_number() OVER (ORDER BY distance) AS rank
+        FROM (
+            SELECT v.id, v.embedding <=> :embedding AS distance
+            FROM candidates c JOIN ai.pedagogy_vectors v ON v.id = c.id
+            ORDER BY distance
+            LIMIT :pool
+        ) nearest
+    ),
+    lexical AS (
+        SELECT id, row_number() OVER (ORDER BY score DESC) AS rank
+        FROM (
+            SELECT id, ts_rank_cd(content_tsv, query) AS score
+            FROM ai.pedagogy_vectors, to_tsquery('english', :terms) AS query
+            WHERE content_tsv @@ query AND {scope}
+            ORDER BY score DESC
+            LIMIT :pool
+        ) matched
+    ),
+    fused AS (
+        SELECT coalesce(s.id, l.id) AS id,
+               coalesce(1.0 / (:rrf_k + s.rank), 0) + coalesce(1.0 / (:rrf_k + l.rank), 0) AS score
+        FROM semantic s FULL OUTER JOIN lexical l ON s.id = l.id
+    )
+    SELECT v.id, v.name, v.meta_data, v.content, f.score
+    FROM fused f JOIN ai.pedagogy_vectors v ON v.id = f.id
+    ORDER BY f.score DESC
+    LIMIT :limit
+"""
+
+
+@dataclass(frozen=True)
+class Scope:
+    """Which chunks a search may return.
+
+    Elaboration chunks must be for one of ``codes`` or, failing that, from
+    one of ``years`` (and one of ``strands``, if given); pedagogy guides must
+    be for ``teaching_focus`` or general. Empty fields don't filter, and
+    chunks seeded without metadata always pass.
+    """
+
+    codes: tuple[str, ...] = ()
+    years: tuple[int, ...] = ()
+    strands: tuple[str, ...] = ()
+    teaching_focus: str | None = None
+
+    def clause(self) -> tuple[str, dict]:
+        """SQL condition on the metadata columns, and its parameters."""
+        params: dict = {"scope_elaboration": ELABORATION, "scope_pedagogy": PEDAGOGY}
+        elaboration = []
+        if self.codes:
+            elaboration.append("descriptor_code = ANY(:scope_codes)")
+            params["scope_codes"] = list(self.codes)
+        if self.years:
+            nearby = "year_ordinal = ANY(:scope_years)"
+            params["scope_years"] = list(self.years)
+            if self.strands:
+                nearby += " AND strand = ANY(:scope_strands)"
+                params["scope_strands"] = list(self.strands)
+            elaboration.append(f"({nearby})")
+        pedagogy = "TRUE"
+        if self.teaching_focus:
+            pedagogy = "(teaching_focus IS NULL OR teaching_focus = :scope_focus)"
+            params["scope_focus"] = self.teaching_focus
+        return (
+            "(doc_type IS NULL"
+            f" OR (doc_type = :scope_elaboration AND ({' OR '.join(elaboration) or 'TRUE'}))"
+            f" OR (doc_type = :scope_pedagogy AND {pedagogy}))"
+        ), params
+
+
+def _scoped(scope: Scope | None) -> tuple[str, dict]:
+    return scope.clause() if scope else ("TRUE", {})
+
+
+def keyword_terms(query: str) -> str:
+    """``to_tsquery`` text matching any content word of ``query``."""
+    # Hyphenated words become their parts; nothing else reaches tsquery syntax
+    words = dict.fromkeys(part for w in content_words(query) for part in w.split("-") if part)
+    return " | ".join(list(words)[:MAX_QUERY_TERMS])
+
+
+def vector_search(
+    vector_db,
+    embedding: list[float],
+    limit: int = 5,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    exact: bool = False,
+    scope: Scope | None = None,
+    storage: str | None = None,
+) -> list[Document]:
+    """Nearest chunks to ``embedding`` by cosine distance.
+
+    ``exact`` scans the full-precision column without the index (for recall
+    measurements); otherwise ``storage`` (default ``VECTOR_STORAGE``) says
+    which index expression supplies the candidates.
+    """
+    storage = vector_index.VECTOR if exact else (storage or settings.VECTOR_STORAGE)
+    condition, params = _scoped(scope)
+    stmt = _embedding_sql(VECTOR_SQL, condition, storage)
+    candidates = vector_index.rescore_candidates(storage, limit)
+    params.update(embedding=embedding, limit=limit, candidates=candidates)
+    with vector_db.db_engine.begin() as conn:
+        if exact:
+            conn.execute(text("SET LOCAL enable_indexscan = off"))
+        else:
+            apply_search_params(conn, _ef_search(ef_search, candidates), probes, filtered=scope is not None)
+        rows = conn.execute(stmt, params).fetchall()
+    return [_document(row, normalize_score(row.distance, Distance.cosine)) for row in rows]
+
+
+def keyword_search(vector_db, terms: str, limit: int = 5, scope: Scope | None = None) -> list[Document]:
+    """Chunks ranked by full-text match on any of ``terms``."""
+    condition, params = _scoped(scope)
+    with vector_db.db_engine.begin() as conn:
+        rows = conn.execute(
+            text(KEYWORD_SQL.format(scope=condition)), {"terms": terms, "limit": limit, **params}
+        ).fetchall()
+    return [_document(row, row.score) for row in rows]
+
+
+def hybrid_search(
+    vector_db,
+    embedding: list[float],
+    terms: str,
+    limit: int = 5,
+    pool: int | None = None,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    scope: Scope | None = None,
+    storage: str | None = None,
+) -> list[Document]:
+    """Vector and keyword candidates fused by reciprocal rank, in one statement."""
+    storage = storage or settings.VECTOR_STORAGE
+    pool = pool or settings.RAG_HYBRID_POOL
+    condition, params = _scoped(scope)
+    stmt = _embedding_sql(HYBRID_SQL, condition, storage)
+    candidates = vector_index.rescore_candidates(storage, pool)
+    params.update(embedding=embedding, terms=terms, limit=limit, pool=pool, candidates=candidates, rrf_k=RRF_K)
+    with vector_db.db_engine.begin() as conn:
+        apply_search_params(conn, _ef_search(ef_search, candidates), probes, filtered=scope is not None)
+        rows = conn.execute(stmt, params).fetchall()
+    return [_document(row, float(row.score)) for row in rows]
+
+
+def _ef_search(ef_search: int | None, candidates: int) -> int:
+    # An HNSW scan returns at most ef_search rows
+    return max(settings.VECTOR_HNSW_EF_SEARCH if ef_search is None else ef_search, candidates)
+
+
+def _embedding_sql(template: str, condition: str, storage: str):
+    distance = vector_index.index_distance(storage, settings.EMBEDDING_DIMENSIONS)
+    return text(template.format(scope=condition, distance=distance)).bindparams(
+        bindparam("embedding", type_=Vector())
+    )
+
+
+def _document(row, score: float) -> Document:
+    meta_data = dict(row.meta_data or {})
+    meta_data["similarity_score"] = score
+    return Document(id=row.id, name=row.name, meta_data=meta_data, content=row.content)
+
+
+def search(
+    query: str,
+    limit: int = 5,
+    mode: str | None = None,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    scope: Scope | None = None,
+    embedding: list[float] | None = None,
+) -> list[Document]:
+    """Pedagogy chunks for ``query`` in ``mode`` (default ``RAG_SEARCH_MODE``).
+
+    If ``scope`` leaves nothing to return, the search is repeated unscoped.
+    ``embedding`` is the query's, if the caller already has it.
+    """
+    mode = mode or settings.RAG_SEARCH_MODE
+    if mode not in MODES:
+        raise ValueError(f"Unknown search mode {mode!r}")
+    terms = keyword_terms(query)
+    if mode == KEYWORD:
+        embedding = None
+    elif embedding is None:
+        # The embedding goes through the shared embedder and its cache
+        embedding = _embedded(_query_embedder().get_embedding, query)
+
+    def run(scope: Scope | None) -> list[Document]:
+        if settings.RAG_VECTOR_BACKEND == NUMPY:
+            words = terms.split(" | ") if terms else []
+            return numpy_store.get_store().search(embedding, words, limit, mode, scope=scope)
+        vector_db = get_knowledge_base().vector_db
+        if not embedding:
+            return keyword_search(vector_db, terms, limit, scope=scope) if terms else []
+        if mode == HYBRID and terms:
+            return hybrid_search(
+                vector_db, embedding, terms, limit, ef_search=ef_search, probes=probes, scope=scope
+            )
+        return vector_search(vector_db, embedding, limit, ef_search=ef_search, probes=probes, scope=scope)
+
+    results = run(scope)
+    if scope is not None and not results:
+        metrics.incr("rag.scope_fallbacks")
+        results = run(None)
+    return results
+
+
+def _query_embedder():
+    """The knowledge base's embedder, or for the NumPy backend one that needs no database."""
+    if settings.RAG_VECTOR_BACKEND == NUMPY:
+        return get_query_embedder()
+    return get_knowledge_base().vector_db.embedder
+
+
+def _embedded(embed, queries):
+    """``embed(queries)``, or ``None`` if the embedding API failed (searches then use keywords)."""
+    try:
+        return embed(queries)
+    except (EmbeddingError, OpenAIError):
+        logger.warning("Query embedding failed; falling back to keyword search", exc_info=True)
+        metrics.incr("rag.embedding_fallbacks")
+        return None
+
+
+def embed_queries(embedder, queries: list[str]) -> list[list[float]]:
+    """Embeddings of ``queries``, in one API call when the embedder can batch."""
+    if hasattr(embedder, "get_embeddings"):
+        return embedder.get_embeddings(queries)
+    return [embedder.get_embedding(q) for q in queries]
+
+
+def fuse(rankings: list[list[Document]], limit: int) -> list[Document]:
+    """Reciprocal rank fusion of ranked lists; a chunk found by several lists appears once."""
+    scores: dict[str, float] = {}
+    docs: dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, 1):
+            key = doc.id or doc.content
+            scores[key] = scores.get(key, 0.0) + 1.0 / (RRF_K + rank)
+            docs.setdefault(key, doc)
+    ordered = sorted(scores, key=lambda key: scores[key], reverse=True)
+    return [docs[key] for key in ordered[:limit]]
+
+
+def multi_search(
+    queries: list[str],
+    limit: int = 5,
+    mode: str | None = None,
+    scope: Scope | None = None,
+) -> list[Document]:
+    """Pedagogy chunks for several focused queries, searched concurrently and fused."""
+    mode = mode or settings.RAG_SEARCH_MODE
+    if mode not in MODES:
+        raise ValueError(f"Unknown search mode {mode!r}")
+    if len(queries) == 1:
+        return search(queries[0], limit, mode, scope=scope)
+    embeddings = None
+    if mode != KEYWORD:
+        embedder = _query_embedder()
+        embeddings = _embedded(lambda texts: embed_queries(embedder, texts), queries)
+    if embeddings is None:
+        mode, embeddings = KEYWORD, [None] * len(queries)
+    futures = [
+        _executor.submit(search, query, limit, mode, scope=scope, embedding=embedding)
+        for query, embedding in zip(queries, embeddings)
+    ]
+    metrics.observe("rag.multi_query.queries", len(queries))
+    return fuse([f.result() for f in futures], limit)
@@ -0,0 +1,177 @@
+"""Approximate-nearest-neighbour index on ``ai.pedagogy_vectors``.
+
+Without an index every pedagogy search is an exact scan of the table. The
+seeding step calls ``ensure_vector_index`` to build an HNSW or IVFFlat index
+from the ``VECTOR_INDEX_*`` settings; it is rebuilt when those build
+parameters change and left alone otherwise. Index names follow agno's
+(``pedagogy_vectors_hnsw_index``), so ``PgVector.optimize`` sees them too.
+
+``VECTOR_STORAGE`` picks what the index holds. ``vector`` indexes the
+float32 embeddings. ``halfvec`` (float16, half the size) and ``bit``
+(binary quantised, 1/32 of the size, Hamming distance) index an expression
+over the same column. Searches rank candidates by that expression and
+rescore the top ``VECTOR_RESCORE_CANDIDATES`` against the full-precision
+column, so the table keeps float32 and no schema change is needed to switch.
+
+The query-time knobs (``hnsw.ef_search``, ``ivfflat.probes``) are set with
+``SET LOCAL`` inside each search's own transaction, so they can differ per
+request without leaking into other pooled connections.
+"""
+
+import logging
+import math
+import re
+from dataclasses import dataclass
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from backend.config import settings
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = "ai"
+TABLE = "pedagogy_vectors"
+HNSW = "hnsw"
+IVFFLAT = "ivfflat"
+VECTOR = "vector"
+HALFVEC = "halfvec"
+BIT = "bit"
+OPCLASSES = {
+    VECTOR: "vector_cosine_ops",  # PgVector's default cosine distance
+    HALFVEC: "halfvec_cosine_ops",
+    BIT: "bit_hamming_ops",
+}
+ITERATIVE_SCANS = ("strict_order", "relaxed_order")
+
+
+def indexed_expression(storage: str, dimensions: int) -> str:
+    """What the ANN index is built over for ``storage``."""
+    if storage == HALFVEC:
+        return f"(embedding::halfvec({dimensions}))"
+    if storage == BIT:
+        return f"(binary_quantize(embedding)::bit({dimensions}))"
+    return "embedding"
+
+
+def index_distance(storage: str, dimensions: int, param: str = ":embedding") -> str:
+    """ORDER BY expression for ``storage`` that its ANN index can serve."""
+    if storage == HALFVEC:
+        return f"embedding::halfvec({dimensions}) <=> CAST({param} AS halfvec({dimensions}))"
+    if storage == BIT:
+        return f"binary_quantize(embedding)::bit({dimensions}) <~> binary_quantize(CAST({param} AS vector))"
+    return f"embedding <=> {param}"
+
+
+def rescore_candidates(storage: str, limit: int) -> int:
+    """Rows to take from the index before reranking ``limit`` at full precision."""
+    return limit if storage == VECTOR else max(limit, settings.VECTOR_RESCORE_CANDIDATES)
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    kind: str  # HNSW or IVFFLAT
+    m: int = 16
+    ef_construction: int = 64
+    lists: int = 100
+    storage: str = VECTOR
+    dimensions: int = 1536
+
+    @property
+    def name(self) -> str:
+        if self.storage == VECTOR:
+            return f"{TABLE}_{self.kind}_index"
+        return f"{TABLE}_{self.kind}_{self.storage}_index"
+
+    @property
+    def options(self) -> dict[str, int]:
+        if self.kind == HNSW:
+            return {"m": self.m, "ef_construction": self.ef_construction}
+        return {"lists": self.lists}
+
+    def create_sql(self, table: str = f"{SCHEMA}.{TABLE}", name: str | None = None) -> str:
+        options = ", ".join(f"{k} = {v}" for k, v in self.options.items())
+        return (
+            f'CREATE INDEX "{name or self.name}" ON {table} USING {self.kind} '
+            f"({indexed_expression(self.storage, self.dimensions)} {OPCLASSES[self.storage]}) WITH ({options})"
+        )
+
+    def matches(self, indexdef: str) -> bool:
+        """Whether an existing index definition was built with this spec."""
+        if f"USING {self.kind} " not in indexdef or OPCLASSES[self.storage] not in indexdef:
+            return False
+        built = dict(re.findall(r"(\w+)='?(\d+)'?", indexdef.split("WITH", 1)[-1]))
+        return all(built.get(k) == str(v) for k, v in self.options.items())
+
+
+def ivfflat_lists(rows: int) -> int:
+    """pgvector's guidance: rows / 1000 up to 1M rows, sqrt(rows) beyond."""
+    return max(rows // 1000, 1) if rows < 1_000_000 else max(int(math.sqrt(rows)), 1)
+
+
+def index_spec(rows: int) -> IndexSpec | None:
+    """The index the settings ask for, given the current row count."""
+    kind = settings.VECTOR_INDEX_TYPE.lower()
+    storage = {"storage": settings.VECTOR_STORAGE, "dimensions": settings.EMBEDDING_DIMENSIONS}
+    if kind == HNSW:
+        return IndexSpec(
+            HNSW, m=settings.VECTOR_HNSW_M, ef_construction=settings.VECTOR_HNSW_EF_CONSTRUCTION, **storage
+        )
+    if kind == IVFFLAT:
+        return IndexSpec(IVFFLAT, lists=settings.VECTOR_IVFFLAT_LISTS or ivfflat_lists(rows), **storage)
+    return None
+
+
+def _ann_indexes(conn: Connection) -> dict[str, str]:
+    rows = conn.execute(
+        text(
+            "SELECT indexname, indexdef FROM pg_indexes "
+            "WHERE schemaname = :schema AND tablename = :table "
+            "AND (indexdef LIKE '%USING hnsw%' OR indexdef LIKE '%USING ivfflat%')"
+        ),
+        {"schema": SCHEMA, "table": TABLE},
+    )
+    return {name: indexdef for name, indexdef in rows}
+
+
+def ensure_vector_index(engine: Engine, force: bool = False) -> str:
+    """Create or rebuild the ANN index; returns what was done."""
+    with engine.begin() as conn:
+        rows = conn.execute(text(f"SELECT count(*) FROM {SCHEMA}.{TABLE}")).scalar_one()
+        spec = index_spec(rows)
+        existing = _ann_indexes(conn)
+        if spec is None:
+            return "disabled"
+        if not force and spec.name in existing and spec.matches(existing[spec.name]):
+            return "exists"
+        if spec.kind == IVFFLAT and rows == 0:
+            # IVFFlat clusters are trained on the rows present at build time
+            return "deferred"
+        for name in existing:
+            conn.execute(text(f'DROP INDEX IF EXISTS {SCHEMA}."{name}"'))
+        conn.execute(text(f"SET LOCAL maintenance_work_mem = '{settings.VECTOR_INDEX_BUILD_MEMORY}'"))
+        conn.execute(text(spec.create_sql()))
+    logger.info("Built %s on %d rows with %s", spec.name, rows, spec.options)
+    return "rebuilt" if existing else "created"
+
+
+def apply_search_params(
+    conn: Connection,
+    ef_search: int | None = None,
+    probes: int | None = None,
+    filtered: bool = False,
+) -> None:
+    """Set the ANN query knobs for the current transaction only.
+
+    A filtered search discards index candidates that fail the filter, so it
+    can come back short; ``filtered`` turns on pgvector's iterative scans.
+    """
+    ef_search = settings.VECTOR_HNSW_EF_SEARCH if ef_search is None else ef_search
+    probes = settings.VECTOR_IVFFLAT_PROBES if probes is None else probes
+    conn.execute(text(f"SET LOCAL hnsw.ef_search = {int(ef_search)}"))
+    conn.execute(text(f"SET LOCAL ivfflat.probes = {int(probes)}"))
+    scan = settings.VECTOR_ITERATIVE_SCAN
+    if filtered and scan in ITERATIVE_SCANS:
+        conn.execute(text(f"SET LOCAL hnsw.iterative_scan = {scan}"))
+        if scan == "relaxed_order":  # the only order IVFFlat supports
+            conn.execute(text(f"SET LOCAL ivfflat.iterative_scan = {scan}"))
@@ -1,14 +1,38 @@
 """FastAPI application entry point."""
 
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from backend.api.router import router
+from backend.knowledge.numpy_store import warm_store
+from backend.knowledge.pedagogy_kb import warm_knowledge_base
+from backend.services.curriculum_graph import warm_curriculum_graph
+from backend.services.descriptor_embeddings import warm_descriptor_embeddings
+from backend.services.descriptor_index import warm_descriptor_index
+from backend.services.input_analysis import warm_vocabulary
+from backend.services.llm_pool import close_clients
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await asyncio.to_thread(warm_descriptor_index)
+    await asyncio.to_thread(warm_vocabulary)
+    await asyncio.to_thread(warm_curriculum_graph)
+    await asyncio.to_thread(warm_descriptor_embeddings)
+    await asyncio.to_thread(warm_knowledge_base)
+    await asyncio.to_thread(warm_store)
+    yield
+    await close_clients()
+
 
 app = FastAPI(
     title="LessonForge",
     description="AI Lesson Resource Generator for Educators",
     version="0.1.0",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -0,0 +1,171 @@
+"""Memoised curriculum-match results.
+
+The same (topic, year level, strand) requests recur constantly, so CAG
+matches are cached under a normalised topic key: lower-cased, stop words
+dropped, words reduced to a crude singular form and sorted. Entries live in
+an in-process LRU in front of the ``cag_match_cache`` table and are
+versioned by curriculum hash, matcher model and matcher configuration
+(see ``matcher_config``), so new curriculum data, a different model or a
+different way of matching never serves stale matches. Rows from older
+curriculum versions are purged the first time a new version is written.
+"""
+
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+
+from sqlalchemy.exc import SQLAlchemyError
+
+from backend.config import settings
+from backend.db.models import CagMatchCache
+from backend.db.session import SessionLocal
+from backend.services.input_analysis import content_words, normalise
+from backend.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+MEMORY = "memory"
+DATABASE = "db"
+
+
+def topic_key(topic: str) -> str:
+    """Order- and inflection-insensitive form of a topic."""
+    return " ".join(sorted({normalise(w) for w in content_words(topic)}))
+
+
+def matcher_config() -> str:
+    """The settings that decide which descriptors the matcher sees and how it is prompted."""
+    return ":".join(
+        str(value)
+        for value in (
+            settings.CAG_MATCH_MODE,
+            settings.CAG_SHORTLIST_K,
+            settings.CAG_EMBEDDING_TOP_K,
+            int(settings.CAG_COMPACT_PROMPT),
+            settings.CAG_HIERARCHICAL_THRESHOLD,
+            settings.CAG_STAGE1_GROUPS,
+            settings.CAG_STAGE1_PICKS,
+        )
+    )
+
+
+@dataclass
+class CachedMatches:
+    matches: list[dict]
+    created_at: datetime
+    source: str  # MEMORY or DATABASE
+
+
+class CagCache:
+    """In-process LRU over a Postgres table of CAG results."""
+
+    def __init__(self, size: int, session_factory=SessionLocal):
+        self.size = size
+        self._session_factory = session_factory
+        self._memory: OrderedDict[str, tuple[list[dict], datetime]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._purged_version: str | None = None
+
+    @staticmethod
+    def key(topic: str, year_level: str, strand: str, version: str, model: str) -> str:
+        raw = "|".join([version, model, matcher_config(), topic_key(topic), year_level.lower(), strand.lower()])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def get(self, topic: str, year_level: str, strand: str, version: str, model: str) -> CachedMatches | None:
+        key = self.key(topic, year_level, strand, version, model)
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+        if entry is not None:
+            return self._hit(CachedMatches(entry[0], entry[1], MEMORY))
+
+        row = None
+        db = self._session_factory()
+        try:
+            row = db.get(CagMatchCache, key)
+        except SQLAlchemyError:
+            logger.warning("CAG cache lookup failed", exc_info=True)
+        finally:
+            db.close()
+        if row is None:
+            metrics.incr("cag_cache.misses")
+            return None
+        created_at = _aware(row.created_at)
+        self._remember(key, row.matches, created_at)
+        return self._hit(CachedMatches(row.matches, created_at, DATABASE))
+
+    def put(
+        self, topic: str, year_level: str, strand: str, version: str, model: str, matches: list[dict]
+    ) -> None:
+        key = self.key(topic, year_level, strand, version, model)
+        now = datetime.now(timezone.utc)
+        self._remember(key, matches, now)
+        db = self._session_factory()
+        try:
+            if self._purged_version != version:
+                db.query(CagMatchCache).filter(CagMatchCache.curriculum_hash != version).delete()
+                self._purged_version = version
+            db.merge(CagMatchCache(
+                key=key,
+                topic_key=topic_key(topic),
+                year_level=year_level,
+                strand=strand,
+                curriculum_hash=version,
+                model=model,
+                matches=matches,
+                created_at=now,
+            ))
+            db.commit()
+            metrics.incr("cag_cache.writes")
+        except SQLAlchemyError:
+            db.rollback()
+            logger.warning("CAG cache write failed", exc_info=True)
+        finally:
+            db.close()
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    def _remember(self, key: str, matches: list[dict], created_at: datetime) -> None:
+        with self._lock:
+            self._memory[key] = (matches, created_at)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.size:
+                self._memory.popitem(last=False)
+
+    @staticmethod
+    def _hit(cached: CachedMatches) -> CachedMatches:
+        metrics.incr(f"cag_cache.hits.{cached.source}")
+        age_s = (datetime.now(timezone.utc) - cached.created_at).total_seconds()
+        metrics.observe("cag_cache.hit_age_s", age_s)
+        return cached
+
+
+def _aware(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def cache_report() -> dict:
+    """Hit rates and ages of served entries for the metrics endpoint."""
+    memory = metrics.count(f"cag_cache.hits.{MEMORY}")
+    database = metrics.count(f"cag_cache.hits.{DATABASE}")
+    lookups = memory + database + metrics.count("cag_cache.misses")
+    return {
+        "lookups": lookups,
+        "hit_rate": (memory + database) / lookups if lookups else None,
+        "memory_hits": memory,
+        "db_hits": database,
+        "entries_in_memory": len(cag_cache._memory),
+        "hit_age_s": {
+            "p50": metrics.percentile("cag_cache.hit_age_s", 50),
+            "p90": metrics.percentile("cag_cache.hit_age_s", 90),
+        },
+    }
+
+
+cag_cache = CagCache(settings.CAG_CACHE_SIZE)
@@ -1,20 +1,28 @@
 """CAG (Context-Augmented Generation) service.
 
-Loads all 240 content descriptors into LLM context for semantic matching.
+Loads the curriculum's content descriptors and builds the matching prompt
+that puts them, or a per-request shortlist of them, into LLM context.
 """
 
+import hashlib
 import json
+import re
+import threading
+import time
+from collections import OrderedDict
 
 from sqlalchemy.orm import Session
 
-from backend.db.models import ContentDescriptor
+from backend.config import settings
+from backend.db.models import ContentDescriptor, Elaboration, Subject
 
 
 def load_all_descriptors(db: Session) -> list[dict]:
     """Load all content descriptors for CAG context."""
     rows = (
-        db.query(ContentDescriptor)
-        .order_by(ContentDescriptor.year_level_code, ContentDescriptor.strand_title)
+        db.query(ContentDescriptor, Subject.title)
+        .outerjoin(Subject, Subject.code == ContentDescriptor.subject_code)
+        .order_by(ContentDescriptor.subject_code, ContentDescriptor.year_level_code, ContentDescriptor.strand_title)
         .all()
     )
     return [
@@ -23,42 +31,208 @@ def load_all_descriptors(db: Session) -> list[dict]:
             "text": r.text,
             "year_level_code": r.year_level_code,
             "strand_title": r.strand_title,
+            "subject_code": r.subject_code,
+            "subject": subject,
         }
-        for r in rows
+        for r, subject in rows
     ]
 
 
-def build_cag_prompt(topic: str, year_level: str, strand: str, descriptors: list[dict]) -> str:
-    """Build the CAG matching prompt with all descriptors in context."""
-    descriptor_text = "\n".join(
-        f"- [{d['code']}] ({d['year_level_code']} / {d['strand_title']}): {d['text']}"
-        for d in descriptors
-    )
+def load_elaborations(db: Session) -> dict[str, list[str]]:
+    """Elaboration texts grouped by content descriptor code."""
+    grouped: dict[str, list[str]] = {}
+    for row in db.query(Elaboration.content_descriptor_code, Elaboration.text).order_by(Elaboration.code):
+        grouped.setdefault(row.content_descriptor_code, []).append(row.text)
+    return grouped
 
-    return f"""You are a curriculum matching expert for the Australian Mathematics Curriculum (ACARA v9).
 
-A teacher wants to teach: "{topic}"
-Year Level preference: {year_level}
-Strand preference: {strand}
+_hash_lock = threading.Lock()
+_hash_cache: tuple[float, str] | None = None  # (checked at, hash)
 
-Below are ALL 240 content descriptors from the ACARA v9 Mathematics curriculum.
-Find the 3-5 most relevant descriptors that match the teacher's topic.
 
-CONTENT DESCRIPTORS:
-{descriptor_text}
+def curriculum_hash(db: Session) -> str:
+    """Hash of all descriptor and elaboration text.
+
+    Versions everything derived from the curriculum (indexes, embeddings,
+    cached matches). Re-read from the database at most every
+    ``CURRICULUM_HASH_TTL_S`` seconds.
+    """
+    global _hash_cache
+    now = time.monotonic()
+    cached = _hash_cache
+    if cached and now - cached[0] < settings.CURRICULUM_HASH_TTL_S:
+        return cached[1]
+    with _hash_lock:
+        digest = hashlib.sha256()
+        for row in db.query(ContentDescriptor).order_by(ContentDescriptor.code):
+            digest.update(
+                f"D|{row.code}|{row.subject_code}|{row.year_level_code}|{row.strand_title}|{row.text}\n".encode()
+            )
+        for row in db.query(Elaboration).order_by(Elaboration.code):
+            digest.update(f"E|{row.code}|{row.content_descriptor_code}|{row.text}\n".encode())
+        value = digest.hexdigest()[:16]
+        _hash_cache = (now, value)
+    return value
+
+
+def reset_curriculum_hash() -> None:
+    global _hash_cache
+    _hash_cache = None
+
+
+_catalogue_cache: OrderedDict[tuple[int, bool], str] = OrderedDict()
+_catalogue_lock = threading.Lock()
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def local_id(position: int) -> str:
+    """Short prompt id of the descriptor at ``position`` in the catalogue."""
+    return f"d{position + 1}"
+
+
+def _spans_subjects(descriptors: list[dict]) -> bool:
+    return len({d.get("subject_code") for d in descriptors}) > 1
+
+
+def subject_names(descriptors: list[dict]) -> list[str]:
+    """Titles (or codes) of the subjects ``descriptors`` come from, in catalogue order."""
+    return list(dict.fromkeys(d.get("subject") or d["subject_code"] for d in descriptors if d.get("subject_code")))
+
+
+def descriptor_catalogue(descriptors: list[dict], compact: bool = True) -> str:
+    """The descriptor block of the CAG prompt, memoised per descriptor list.
+
+    Shortlists differ per request, so the cache is a bounded LRU
+    (``CAG_CATALOGUE_CACHE_SIZE``); the full curriculum stays hot in it.
+
+    The compact form groups descriptors under a ``## <year level> / <strand>``
+    header (prefixed by the subject when there are several) and lists each as
+    ``<local id> <text>``; the verbose form repeats the code, year level and
+    strand on every line.
+    """
+    key = (
+        hash(
+            tuple(
+                (d["code"], d["text"], d.get("subject_code"), d["year_level_code"], d["strand_title"])
+                for d in descriptors
+            )
+        ),
+        compact,
+    )
+    with _catalogue_lock:
+        block = _catalogue_cache.get(key)
+        if block is not None:
+            _catalogue_cache.move_to_end(key)
+            return block
+
+    if not compact:
+        block = "\n".join(
+            f"- [{d['code']}] ({d['year_level_code']} / {d['strand_title']}): {d['text']}"
+            for d in descriptors
+        )
+    else:
+        # Subjects are only named when the catalogue spans several
+        with_subject = _spans_subjects(descriptors)
+        lines = []
+        group = None
+        for i, d in enumerate(descriptors):
+            if (d.get("subject_code"), d["year_level_code"], d["strand_title"]) != group:
+                group = (d.get("subject_code"), d["year_level_code"], d["strand_title"])
+                header = " / ".join(str(part or "-") for part in (group if with_subject else group[1:]))
+                lines.append(f"## {header}")
+            lines.append(f"{local_id(i)} {_WHITESPACE_RE.sub(' ', d['text']).strip()}")
+        block = "\n".join(lines)
+    with _catalogue_lock:
+        _catalogue_cache[key] = block
+        while len(_catalogue_cache) > settings.CAG_CATALOGUE_CACHE_SIZE:
+            _catalogue_cache.popitem(last=False)
+    return block
+
 
-Return a JSON array of matches. Each match must have:
+def build_cag_prompt(
+    topic: str, year_level: str, strand: str, descriptors: list[dict], compact: bool | None = None
+) -> str:
+    """Build the CAG matching prompt with the given descriptors in context.
+
+    ``descriptors`` is the whole curriculum or a shortlist of candidates; the
+    subjects the prompt names and its group header format follow from them.
+    The teacher's request comes last, so with the whole curriculum everything
+    before it is identical across requests and the provider's prefix cache
+    serves the catalogue. A shortlist (``CAG_SHORTLIST_K``) differs per
+    request, so only the instructions above the catalogue are shared: that
+    trades prefix-cache hits on the catalogue for a much shorter prompt. In the
+    compact encoding (``CAG_COMPACT_PROMPT``) the model answers with local ids,
+    which ``resolve_matches`` maps back to full descriptors.
+    """
+    compact = settings.CAG_COMPACT_PROMPT if compact is None else compact
+    subjects = " and ".join(subject_names(descriptors))
+    source = f"the ACARA v9 {subjects} curriculum" if subjects else "the ACARA v9 curriculum"
+    if compact:
+        header = "<year level code> / <strand>"
+        if _spans_subjects(descriptors):
+            header = f"<subject code> / {header}"
+        listing = f"Descriptors are grouped under \"## {header}\" headers; each line is \"<id> <text>\"."
+        output_format = """Return a JSON array of matches. Each match must have:
+- "id": the descriptor id (e.g., "d17")
+- "confidence": "high", "medium", or "low"
+- "reason": brief explanation of why this matches"""
+    else:
+        listing = ""
+        output_format = """Return a JSON array of matches. Each match must have:
 - "code": the descriptor code (e.g., "AC9M5N06")
 - "text": the full descriptor text
 - "year_level": the year level code
 - "strand": the strand title
 - "confidence": "high", "medium", or "low"
-- "reason": brief explanation of why this matches
+- "reason": brief explanation of why this matches"""
+
+    return f"""You are a curriculum matching expert for the Australian Curriculum (ACARA v9).
+
+Below are {len(descriptors)} content descriptors from {source}.
+You will be asked to find the 3-5 most relevant descriptors that match a teacher's topic.
+{listing}
+CONTENT DESCRIPTORS:
+{descriptor_catalogue(descriptors, compact)}
+
+{output_format}
 
 Prioritise descriptors from the requested year level and strand, but include relevant
 descriptors from nearby year levels if they are a strong match.
 
-Return ONLY valid JSON, no markdown formatting."""
+Return ONLY valid JSON, no markdown formatting.
+
+TEACHER'S REQUEST:
+A teacher wants to teach: "{topic}"
+Year Level preference: {year_level}
+Strand preference: {strand}"""
+
+
+def catalogue_lookup(descriptors: list[dict]) -> dict[str, dict]:
+    """Descriptors by local id and by code, for resolving LLM matches."""
+    lookup = {d["code"]: d for d in descriptors}
+    lookup.update({local_id(i): d for i, d in enumerate(descriptors)})
+    return lookup
+
+
+def resolve_match(match: dict, lookup: dict[str, dict]) -> dict | None:
+    """Full match record for an LLM match given by local id or code; ``None`` if unknown."""
+    descriptor = lookup.get(str(match.get("id") or match.get("code") or "").strip())
+    if descriptor is None:
+        return None
+    return {
+        "code": descriptor["code"],
+        "text": descriptor["text"],
+        "year_level": descriptor["year_level_code"],
+        "strand": descriptor["strand_title"],
+        "confidence": match.get("confidence", "medium"),
+        "reason": match.get("reason", ""),
+    }
+
+
+def resolve_matches(matches: list[dict], descriptors: list[dict]) -> list[dict]:
+    lookup = catalogue_lookup(descriptors)
+    resolved = [resolve_match(m, lookup) for m in matches if isinstance(m, dict)]
+    return [m for m in resolved if m is not None]
 
 
 def parse_cag_response(response_text: str) -> list[dict]:
@@ -77,3 +251,59 @@ def parse_cag_response(response_text: str) -> list[dict]:
     except json.JSONDecodeError:
         pass
     return []
+
+
+class MatchStreamParser:
+    """Incremental parser for a streamed JSON array of match objects.
+
+    ``feed`` takes response chunks as they arrive and returns the match
+    objects completed by that chunk, so callers can act on the first matches
+    before the model has finished. Text before the opening ``[`` (such as a
+    code fence) is skipped; objects that fail to parse are dropped, leaving
+    ``parse_cag_response`` on the full text as the fallback.
+    """
+
+    def __init__(self):
+        self.matches: list[dict] = []
+        self._started = False
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._buffer: list[str] = []
+
+    def feed(self, chunk: str) -> list[dict]:
+        completed = []
+        for ch in chunk:
+            if not self._started:
+                self._started = ch == "["
+                continue
+            if self._depth == 0:
+                # Between objects: commas, whitespace and the closing bracket
+                if ch == "{":
+                    self._depth = 1
+                    self._buffer = [ch]
+                continue
+
+            self._buffer.append(ch)
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif ch == "\\":
+                    self._escaped = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{":
+                self._depth += 1
+            elif ch == "}":
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        match = json.loads("".join(self._buffer))
+                    except json.JSONDecodeError:
+                        continue
+                    if isinstance(match, dict):
+                        self.matches.append(match)
+                        completed.append(match)
+        return completed
@@ -0,0 +1,262 @@
+"""Structure of the curriculum: descriptor codes, year levels and progressions.
+
+ACARA v9 content descriptor codes encode where a descriptor sits, e.g.
+``AC9M5N06`` is Mathematics, Year 5, Number, item 6 and ``AC9MFSP01`` is
+Mathematics, Foundation, Space, item 1. ``decode_code`` parses them and
+``year_ordinal`` turns year level titles and codes ("Year 5", "MATMATY5",
+"Foundation Year", "MATMATFY") into 0 (Foundation) to 10.
+
+``CurriculumGraph`` holds every descriptor and year level in memory with a
+precomputed learning-progression graph: each descriptor links to the most
+related descriptors of the same subject and strand in the year before and
+the year after, ranked by text similarity and position within the strand.
+Lookups are dictionary reads, so matching and resource planning can find
+neighbouring descriptors without asking the LLM.
+"""
+
+import logging
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+
+from sqlalchemy.orm import Session
+
+from backend.db.models import YearLevel
+from backend.db.session import SessionLocal
+from backend.services.cag_service import curriculum_hash, load_all_descriptors
+from backend.services.input_analysis import content_words, normalise
+
+logger = logging.getLogger(__name__)
+
+CODE_RE = re.compile(r"^AC9([A-Z]+?)(F|10|[1-9])([A-Z]+)(\d{2})$")
+YEAR_TITLE_RE = re.compile(r"^(?:year|yr|y)?\s*(10|[1-9])$")
+YEAR_CODE_RE = re.compile(r"(?:Y(10|[1-9])|FY)$")
+
+PROGRESSION_LINKS = 2  # neighbours kept per direction
+STRAND_ORDER_WEIGHT = 0.2  # weight of position within the strand vs text similarity
+
+
+@dataclass(frozen=True)
+class DescriptorCode:
+    code: str
+    learning_area: str  # e.g. "M" for Mathematics, "S" for Science
+    year: int  # 0 is Foundation
+    strand: str  # e.g. "N", "SP"
+    number: int
+
+
+@dataclass(frozen=True)
+class YearLevelInfo:
+    code: str
+    title: str
+    year: int | None
+    band: str
+    subject_code: str | None
+
+
+@dataclass(frozen=True)
+class Progression:
+    code: str
+    year_level_code: str
+    text: str
+    score: float
+
+
+def decode_code(code: str) -> DescriptorCode | None:
+    """Parse an ACARA v9 descriptor code, or ``None`` if it isn't one."""
+    m = CODE_RE.match(code.strip().upper()) if code else None
+    if not m:
+        return None
+    area, year, strand, number = m.groups()
+    return DescriptorCode(code.strip().upper(), area, 0 if year == "F" else int(year), strand, int(number))
+
+
+def year_ordinal(value: str | None) -> int | None:
+    """Year number (0 for Foundation) from a year level title or code."""
+    if not value:
+        return None
+    text = value.strip()
+    if text.lower().startswith(("foundation", "prep", "kindergarten")) or text.upper() == "F":
+        return 0
+    m = YEAR_TITLE_RE.match(text.lower())
+    if m:
+        return int(m.group(1))
+    m = YEAR_CODE_RE.search(text.upper())
+    if m:
+        return int(m.group(1)) if m.group(1) else 0
+    return None
+
+
+def _vectors(descriptors: list[dict]) -> list[dict[str, float]]:
+    """L2-normalised TF-IDF vectors of the descriptor texts."""
+    docs = [Counter(normalise(w) for w in content_words(d["text"])) for d in descriptors]
+    df: Counter[str] = Counter()
+    for doc in docs:
+        df.update(doc.keys())
+    n = len(docs)
+    vectors = []
+    for doc in docs:
+        vec = {t: f * math.log(1 + n / df[t]) for t, f in doc.items()}
+        norm = math.sqrt(sum(v * v for v in vec.values())) or 1.0
+        vectors.append({t: v / norm for t, v in vec.items()})
+    return vectors
+
+
+def _cosine(a: dict[str, float], b: dict[str, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(t, 0.0) for t, v in a.items())
+
+
+class CurriculumGraph:
+    """Descriptor and year level lookups plus the precomputed progression graph."""
+
+    def __init__(self, descriptors: list[dict], year_levels: list[YearLevelInfo]):
+        self.descriptors = {d["code"]: d for d in descriptors}
+        self.year_levels = {yl.code: yl for yl in year_levels}
+        self._decoded = {code: decode_code(code) for code in self.descriptors}
+        self._by_title: dict[str, list[YearLevelInfo]] = defaultdict(list)
+        self._by_year: dict[int, list[YearLevelInfo]] = defaultdict(list)
+        for yl in year_levels:
+            self._by_title[yl.title.lower()].append(yl)
+            if yl.year is not None:
+                self._by_year[yl.year].append(yl)
+        self._prior: dict[str, list[Progression]] = {}
+        self._next: dict[str, list[Progression]] = {}
+        self._build_progressions(descriptors)
+
+    def _year(self, d: dict) -> int | None:
+        decoded = self._decoded.get(d["code"])
+        if decoded:
+            return decoded.year
+        yl = self.year_levels.get(d["year_level_code"])
+        return yl.year if yl else year_ordinal(d["year_level_code"])
+
+    def _build_progressions(self, descriptors: list[dict]) -> None:
+        # (subject, strand) -> year -> descriptors in curriculum order
+        strands: dict[tuple, dict[int, list[dict]]] = defaultdict(lambda: defaultdict(list))
+        for d in descriptors:
+            year = self._year(d)
+            if year is not None:
+                strands[(d.get("subject_code"), d["strand_title"])][year].append(d)
+
+        vectors = dict(zip((d["code"] for d in descriptors), _vectors(descriptors)))
+        for by_year in strands.values():
+            years = sorted(by_year)
+            for earlier, later in zip(years, years[1:]):
+                if later - earlier != 1:
+                    continue
+                before, after = sorted(by_year[earlier], key=_order), sorted(by_year[later], key=_order)
+                scores = [
+                    [
+                        _cosine(vectors[a["code"]], vectors[b["code"]])
+                        + STRAND_ORDER_WEIGHT * (1 - abs(_position(i, before) - _position(j, after)))
+                        for j, b in enumerate(after)
+                    ]
+                    for i, a in enumerate(before)
+                ]
+                for i, a in enumerate(before):
+                    ranked = sorted(range(len(after)), key=lambda j: -scores[i][j])[:PROGRESSION_LINKS]
+                    self._next[a["code"]] = [_link(after[j], scores[i][j]) for j in ranked]
+                for j, b in enumerate(after):
+                    ranked = sorted(range(len(before)), key=lambda i: -scores[i][j])[:PROGRESSION_LINKS]
+                    self._prior[b["code"]] = [_link(before[i], scores[i][j]) for i in ranked]
+
+    def decode(self, code: str) -> DescriptorCode | None:
+        if code in self._decoded:
+            return self._decoded[code]
+        return decode_code(code)
+
+    def descriptor(self, code: str) -> dict | None:
+        return self.descriptors.get(code)
+
+    def prior(self, code: str) -> list[Progression]:
+        """Related descriptors in the previous year, most related first."""
+        return self._prior.get(code, [])
+
+    def next(self, code: str) -> list[Progression]:
+        """Related descriptors in the following year, most related first."""
+        return self._next.get(code, [])
+
+    def year_level(self, value: str | None, subject_code: str | None = None) -> YearLevelInfo | None:
+        """Year level for a title or code, preferring ``subject_code`` when several subjects share it."""
+        if not value:
+            return None
+        if value in self.year_levels:
+            return self.year_levels[value]
+        candidates = self._by_title.get(value.strip().lower())
+        if not candidates:
+            year = year_ordinal(value)
+            candidates = self._by_year.get(year, []) if year is not None else []
+        if not candidates:
+            return None
+        for yl in candidates:
+            if yl.subject_code == subject_code:
+                return yl
+        return candidates[0]
+
+    def adjacent_year_levels(self, year_level_code: str) -> list[YearLevelInfo]:
+        """The year levels either side of ``year_level_code`` in the same subject."""
+        yl = self.year_levels.get(year_level_code)
+        if yl is None or yl.year is None:
+            return []
+        return [
+            other
+            for year in (yl.year - 1, yl.year + 1)
+            for other in self._by_year.get(year, [])
+            if other.subject_code == yl.subject_code
+        ]
+
+
+def _order(d: dict) -> tuple:
+    decoded = decode_code(d["code"])
+    return (decoded.number if decoded else 0, d["code"])
+
+
+def _position(i: int, items: list) -> float:
+    return i / (len(items) - 1) if len(items) > 1 else 0.5
+
+
+def _link(d: dict, score: float) -> Progression:
+    return Progression(d["code"], d["year_level_code"], d["text"], round(score, 3))
+
+
+_graph: CurriculumGraph | None = None
+_graph_version: str | None = None
+_graph_lock = threading.Lock()
+
+
+def load_year_levels(db: Session) -> list[YearLevelInfo]:
+    rows = db.query(YearLevel).order_by(YearLevel.subject_code, YearLevel.sort_order).all()
+    return [YearLevelInfo(r.code, r.title, year_ordinal(r.title), r.band, r.subject_code) for r in rows]
+
+
+def get_curriculum_graph(db: Session) -> CurriculumGraph:
+    """Process-wide graph, rebuilt when the curriculum data changes."""
+    global _graph, _graph_version
+    version = curriculum_hash(db)
+    if _graph is None or _graph_version != version:
+        with _graph_lock:
+            if _graph is None or _graph_version != version:
+                _graph = CurriculumGraph(load_all_descriptors(db), load_year_levels(db))
+                _graph_version = version
+    return _graph
+
+
+def reset_curriculum_graph() -> None:
+    global _graph, _graph_version
+    _graph = _graph_version = None
+
+
+def warm_curriculum_graph() -> None:
+    """Build the graph at startup so the first request doesn't pay for it."""
+    db = SessionLocal()
+    try:
+        graph = get_curriculum_graph(db)
+        logger.info("Curriculum graph ready: %d descriptors", len(graph.descriptors))
+    except Exception:
+        logger.warning("Could not build the curriculum graph at startup", exc_info=True)
+    finally:
+        db.close()
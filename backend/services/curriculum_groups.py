@@ -0,0 +1,149 @@
+"""Two-stage (hierarchical) curriculum matching for large curricula.
+
+Once the curriculum holds more descriptors than fit comfortably in one CAG
+prompt, matching runs in two stages:
+
+1. Descriptors are grouped by (subject, year level, strand) and each group
+   is summarised by its most distinctive terms. A BM25 shortlist of groups
+   is shown to the LLM, which picks the groups the topic belongs to.
+2. Only descriptors inside the chosen groups are ranked by the usual CAG
+   prompt, shortlisted to ``CAG_SHORTLIST_K`` if the groups are large.
+
+Both prompts are bounded by configuration (``CAG_STAGE1_GROUPS`` summaries,
+``CAG_SHORTLIST_K`` descriptors), not by the size of the curriculum.
+"""
+
+import math
+import threading
+from collections import Counter
+from dataclasses import dataclass, field
+
+from sqlalchemy.orm import Session
+
+from backend.services.cag_service import curriculum_hash, load_all_descriptors, load_elaborations, parse_cag_response
+from backend.services.descriptor_index import DescriptorIndex, terms, year_level_codes
+
+SUMMARY_TERMS = 8
+
+
+@dataclass
+class CurriculumGroup:
+    id: str
+    subject_code: str | None
+    year_level_code: str
+    strand_title: str
+    descriptors: list[dict] = field(default_factory=list)
+    summary: str = ""
+
+    @property
+    def label(self) -> str:
+        parts = [self.subject_code, self.year_level_code, self.strand_title]
+        return " / ".join(p for p in parts if p)
+
+
+class CurriculumGroups:
+    """Descriptor groups with term summaries and a BM25 index over them."""
+
+    def __init__(
+        self,
+        descriptors: list[dict],
+        elaborations: dict[str, list[str]] | None = None,
+        year_codes: dict[str, frozenset[str]] | None = None,
+    ):
+        elaborations = elaborations or {}
+        by_key: dict[tuple, CurriculumGroup] = {}
+        for d in descriptors:
+            key = (d.get("subject_code"), d["year_level_code"], d["strand_title"])
+            group = by_key.get(key)
+            if group is None:
+                group = by_key[key] = CurriculumGroup(f"g{len(by_key) + 1}", *key)
+            group.descriptors.append(d)
+        self.groups = list(by_key.values())
+        self._by_id = {g.id: g for g in self.groups}
+
+        # Summaries: terms frequent in the group but rare across groups
+        group_terms = []
+        for g in self.groups:
+            counts: Counter[str] = Counter()
+            for d in g.descriptors:
+                counts.update(terms(d["text"]))
+                for text in elaborations.get(d["code"], []):
+                    counts.update(terms(text))
+            group_terms.append(counts)
+        df: Counter[str] = Counter()
+        for counts in group_terms:
+            df.update(counts.keys())
+        n = len(self.groups)
+        for g, counts in zip(self.groups, group_terms):
+            ranked = sorted(counts, key=lambda t: (-counts[t] * math.log(1 + n / df[t]), t))
+            g.summary = ", ".join(ranked[:SUMMARY_TERMS])
+
+        self.index = DescriptorIndex(
+            [
+                {
+                    "code": g.id,
+                    "text": " ".join(d["text"] for d in g.descriptors),
+                    "year_level_code": g.year_level_code,
+                    "strand_title": g.strand_title,
+                }
+                for g in self.groups
+            ],
+            {g.id: [t for d in g.descriptors for t in elaborations.get(d["code"], [])] for g in self.groups},
+            year_codes,
+        )
+
+    def shortlist(self, query: str, k: int, year_level: str | None = None, strand: str | None = None) -> list[CurriculumGroup]:
+        return [self._by_id[d["code"]] for d in self.index.shortlist(query, k, year_level, strand)]
+
+    def descriptors_in(self, group_ids: list[str]) -> list[dict]:
+        return [d for gid in group_ids if gid in self._by_id for d in self._by_id[gid].descriptors]
+
+
+_groups: CurriculumGroups | None = None
+_groups_version: str | None = None
+_groups_lock = threading.Lock()
+
+
+def get_curriculum_groups(db: Session) -> CurriculumGroups:
+    """Process-wide groups, rebuilt when the curriculum data changes."""
+    global _groups, _groups_version
+    version = curriculum_hash(db)
+    if _groups is None or _groups_version != version:
+        with _groups_lock:
+            if _groups is None or _groups_version != version:
+                _groups = CurriculumGroups(load_all_descriptors(db), load_elaborations(db), year_level_codes(db))
+                _groups_version = version
+    return _groups
+
+
+def build_group_prompt(topic: str, year_level: str, strand: str, groups: list[CurriculumGroup], picks: int) -> str:
+    """Stage 1 prompt: choose the curriculum groups the topic belongs to."""
+    lines = "\n".join(f"{g.id} {g.label}: {g.summary}" for g in groups)
+    return f"""You are a curriculum matching expert for the Australian Curriculum (ACARA v9).
+
+Below are {len(groups)} curriculum groups, one per line as "<id> <subject / year level / strand>: <key terms>".
+
+CURRICULUM GROUPS:
+{lines}
+
+Return a JSON array of the ids of the 1-{picks} groups most likely to contain the content
+descriptors a teacher needs for this topic, best first (e.g., ["g12", "g3"]).
+Prioritise the requested year level and strand, but include a nearby year level if it is a strong match.
+
+Return ONLY valid JSON, no markdown formatting.
+
+TEACHER'S REQUEST:
+A teacher wants to teach: "{topic}"
+Year Level preference: {year_level}
+Strand preference: {strand}"""
+
+
+def parse_group_selection(response_text: str, groups: list[CurriculumGroup], picks: int) -> list[str]:
+    """Group ids from the stage 1 response, limited to the offered groups."""
+    offered = {g.id for g in groups}
+    chosen = []
+    for item in parse_cag_response(response_text):
+        gid = item.get("id") if isinstance(item, dict) else item
+        if isinstance(gid, str) and gid.strip() in offered and gid.strip() not in chosen:
+            chosen.append(gid.strip())
+    return chosen[:picks]
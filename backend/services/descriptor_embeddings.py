@@ -0,0 +1,205 @@
+"""Embedding-based curriculum matching with an in-memory NumPy matrix.
+
+Each descriptor (its text plus elaborations) is embedded once per curriculum
+version; the L2-normalised vectors are held as one float32 matrix, so
+scoring a request is a single matrix-vector product. The matrix is cached on
+disk by curriculum hash and embedding model, and rebuilt when either
+changes.
+
+In ``hybrid`` CAG mode the matcher uses ``match``: when the best descriptor
+clearly beats the runner-up, the top matches are returned without an LLM
+call; otherwise only the top-k candidates are sent to the LLM.
+"""
+
+import logging
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from backend.config import settings
+from backend.db.session import SessionLocal
+from backend.services.cag_service import curriculum_hash, load_all_descriptors, load_elaborations
+from backend.services.descriptor_index import requested_year_codes, year_level_codes
+from backend.services.llm_pool import get_openai_client
+from backend.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+EMBED_BATCH_SIZE = 256
+
+
+def embed_texts(texts: list[str]) -> np.ndarray:
+    """Embed ``texts`` with the configured model; rows are L2-normalised."""
+    client = get_openai_client()
+    rows = []
+    for start in range(0, len(texts), EMBED_BATCH_SIZE):
+        response = client.embeddings.create(
+            model=settings.EMBEDDING_MODEL, input=texts[start : start + EMBED_BATCH_SIZE]
+        )
+        rows.extend(item.embedding for item in response.data)
+    return normalise_rows(np.asarray(rows, dtype=np.float32))
+
+
+def normalise_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def descriptor_document(descriptor: dict, elaborations: list[str]) -> str:
+    return "\n".join([descriptor["text"], *elaborations])
+
+
+@dataclass
+class EmbeddingMatch:
+    candidates: list[dict]  # best first
+    scores: list[float]
+    margin: float  # best score minus runner-up
+    bypass: bool  # confident enough to skip the LLM
+
+
+class DescriptorEmbeddings:
+    """Normalised descriptor embedding matrix with vectorised cosine top-k."""
+
+    def __init__(
+        self, descriptors: list[dict], matrix: np.ndarray, year_codes: dict[str, frozenset[str]] | None = None
+    ):
+        self.descriptors = descriptors
+        self.matrix = matrix
+        self.year_codes = year_codes or {}
+        self._year = np.array([d["year_level_code"] for d in descriptors])
+        self._strand = np.array([d["strand_title"].lower() for d in descriptors])
+
+    def scores(self, query_vector: np.ndarray, year_level: str | None = None, strand: str | None = None) -> np.ndarray:
+        """Cosine similarity of every descriptor, plus the year level/strand boosts."""
+        scores = self.matrix @ query_vector
+        year_codes = requested_year_codes(self.year_codes, year_level)
+        if year_codes:
+            scores = scores + settings.CAG_EMBEDDING_YEAR_BOOST * np.isin(self._year, list(year_codes))
+        if strand:
+            scores = scores + settings.CAG_EMBEDDING_STRAND_BOOST * (self._strand == strand.lower())
+        return scores
+
+    def top_k(
+        self, query_vector: np.ndarray, k: int, year_level: str | None = None, strand: str | None = None
+    ) -> list[tuple[dict, float]]:
+        scores = self.scores(query_vector, year_level, strand)
+        k = min(k, len(scores))
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return [(self.descriptors[i], float(scores[i])) for i in top]
+
+    def match(
+        self, query_vector: np.ndarray, k: int, year_level: str | None = None, strand: str | None = None
+    ) -> EmbeddingMatch:
+        ranked = self.top_k(query_vector, max(k, 2), year_level, strand)
+        scores = [score for _, score in ranked]
+        margin = scores[0] - scores[1] if len(scores) > 1 else (scores[0] if scores else 0.0)
+        bypass = bool(scores) and (
+            scores[0] >= settings.CAG_BYPASS_MIN_SCORE and margin >= settings.CAG_BYPASS_MARGIN
+        )
+        return EmbeddingMatch([d for d, _ in ranked[:k]], scores[:k], margin, bypass)
+
+
+def to_matches(result: EmbeddingMatch, limit: int = 5) -> list[dict]:
+    """CAG-shaped matches for a bypassed request: the best and close runners-up."""
+    best = result.scores[0]
+    matches = []
+    for descriptor, score in zip(result.candidates[:limit], result.scores[:limit]):
+        gap = best - score
+        if gap > 2 * settings.CAG_BYPASS_MARGIN and matches:
+            break
+        matches.append({
+            "code": descriptor["code"],
+            "text": descriptor["text"],
+            "year_level": descriptor["year_level_code"],
+            "strand": descriptor["strand_title"],
+            "confidence": "high" if gap == 0 else ("medium" if gap < settings.CAG_BYPASS_MARGIN else "low"),
+            "reason": f"Embedding similarity {score:.2f}",
+        })
+    return matches
+
+
+_embeddings: DescriptorEmbeddings | None = None
+_embeddings_version: str | None = None
+_lock = threading.Lock()
+
+
+def _cache_path(version: str) -> Path:
+    model = settings.EMBEDDING_MODEL.replace("/", "_")
+    return Path(settings.CAG_EMBEDDINGS_CACHE_DIR) / f"descriptors-{version}-{model}.npy"
+
+
+def _load_matrix(db: Session, descriptors: list[dict], version: str) -> np.ndarray:
+    path = _cache_path(version)
+    if path.exists():
+        matrix = np.load(path)
+        if matrix.shape[0] == len(descriptors):
+            return matrix
+    start = time.perf_counter()
+    elaborations = load_elaborations(db)
+    matrix = embed_texts([descriptor_document(d, elaborations.get(d["code"], [])) for d in descriptors])
+    metrics.observe("cag_embedding.build_ms", (time.perf_counter() - start) * 1000)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".npy")
+        with os.fdopen(fd, "wb") as f:
+            np.save(f, matrix)
+        os.replace(tmp, path)
+    except OSError:
+        logger.warning("Could not cache descriptor embeddings at %s", path, exc_info=True)
+    return matrix
+
+
+def get_descriptor_embeddings(db: Session) -> DescriptorEmbeddings:
+    """Process-wide embedding matrix, rebuilt when the curriculum data changes."""
+    global _embeddings, _embeddings_version
+    version = curriculum_hash(db)
+    if _embeddings is None or _embeddings_version != version:
+        with _lock:
+            if _embeddings is None or _embeddings_version != version:
+                descriptors = load_all_descriptors(db)
+                matrix = _load_matrix(db, descriptors, version)
+                _embeddings = DescriptorEmbeddings(descriptors, matrix, year_level_codes(db))
+                _embeddings_version = version
+    return _embeddings
+
+
+def reset_descriptor_embeddings() -> None:
+    global _embeddings, _embeddings_version
+    _embeddings = _embeddings_version = None
+
+
+def warm_descriptor_embeddings() -> None:
+    """Load or build the matrix at startup when hybrid matching is enabled."""
+    if settings.CAG_MATCH_MODE != "hybrid":
+        return
+    db = SessionLocal()
+    try:
+        embeddings = get_descriptor_embeddings(db)
+        logger.info("Descriptor embeddings ready: %s", embeddings.matrix.shape)
+    except Exception:
+        logger.warning("Could not load descriptor embeddings at startup", exc_info=True)
+    finally:
+        db.close()
+
+
+def embedding_report() -> dict:
+    """Bypass rate, agreement with the LLM and scoring latency for the metrics endpoint."""
+    return {
+        "requests": metrics.count("cag_embedding.requests"),
+        "bypass_rate": metrics.ratio("cag_embedding.bypassed", "cag_embedding.requests"),
+        "llm_top1_agreement": metrics.ratio("cag_embedding.llm_agree", "cag_embedding.llm_compared"),
+        "latency_ms": {
+            "p50": metrics.percentile("cag_embedding.match_ms", 50),
+            "p90": metrics.percentile("cag_embedding.match_ms", 90),
+        },
+    }
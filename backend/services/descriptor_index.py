@@ -0,0 +1,172 @@
+"""In-memory BM25 index over content descriptors and their elaborations.
+
+Used to shortlist CAG candidates: instead of sending every descriptor to the
+matcher LLM, only the top-K lexical matches for the topic go into the
+prompt. Descriptors from the requested year level and strand get a boost
+expressed as a fraction of the best lexical score, so they stay in the
+shortlist even when the topic wording is sparse; the year levels either side
+of the requested one get a smaller boost.
+"""
+
+import heapq
+import logging
+import math
+import threading
+from collections import Counter
+
+from sqlalchemy.orm import Session
+
+from backend.config import settings
+from backend.db.models import YearLevel
+from backend.db.session import SessionLocal
+from backend.services.cag_service import curriculum_hash, load_all_descriptors, load_elaborations
+from backend.services.curriculum_graph import decode_code, year_ordinal
+from backend.services.input_analysis import content_words, normalise
+
+logger = logging.getLogger(__name__)
+
+K1 = 1.2
+B = 0.75
+
+
+def terms(text: str) -> list[str]:
+    return [normalise(w) for w in content_words(text)]
+
+
+class DescriptorIndex:
+    """BM25 over descriptor text plus elaborations, one document per descriptor."""
+
+    def __init__(
+        self,
+        descriptors: list[dict],
+        elaborations: dict[str, list[str]] | None = None,
+        year_codes: dict[str, frozenset[str]] | None = None,
+    ):
+        self.descriptors = descriptors
+        self.year_codes = year_codes or {}  # year level title -> its code in each subject
+        elaborations = elaborations or {}
+
+        self._years = [_descriptor_year(d) for d in descriptors]
+        self._lengths: list[int] = []
+        self._postings: dict[str, list[tuple[int, int]]] = {}  # term -> [(doc, term frequency)]
+        for i, d in enumerate(descriptors):
+            doc_terms = terms(d["text"])
+            for text in elaborations.get(d["code"], []):
+                doc_terms += terms(text)
+            for t, f in Counter(doc_terms).items():
+                self._postings.setdefault(t, []).append((i, f))
+            self._lengths.append(len(doc_terms))
+
+        n = len(descriptors)
+        self._avg_length = (sum(self._lengths) / n) if n else 0.0
+        self._idf = {t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for t, p in self._postings.items()}
+
+    def scores(self, query: str) -> list[float]:
+        """Plain BM25 score of every descriptor for ``query``."""
+        result = [0.0] * len(self.descriptors)
+        for t in dict.fromkeys(terms(query)):
+            idf = self._idf.get(t)
+            if idf is None:
+                continue
+            for i, f in self._postings[t]:
+                norm = K1 * (1 - B + B * self._lengths[i] / self._avg_length)
+                result[i] += idf * f * (K1 + 1) / (f + norm)
+        return result
+
+    def shortlist(
+        self,
+        query: str,
+        k: int,
+        year_level: str | None = None,
+        strand: str | None = None,
+        year_boost: float | None = None,
+        strand_boost: float | None = None,
+        within: set[str] | None = None,
+        adjacent_boost: float | None = None,
+    ) -> list[dict]:
+        """Top-``k`` descriptors for ``query``, boosted for year level and strand.
+
+        ``within`` restricts the candidates to the given descriptor codes.
+        """
+        year_boost = settings.CAG_SHORTLIST_YEAR_BOOST if year_boost is None else year_boost
+        strand_boost = settings.CAG_SHORTLIST_STRAND_BOOST if strand_boost is None else strand_boost
+        adjacent_boost = settings.CAG_SHORTLIST_ADJACENT_YEAR_BOOST if adjacent_boost is None else adjacent_boost
+        year_codes = requested_year_codes(self.year_codes, year_level)
+        year = year_ordinal(year_level)
+
+        lexical = self.scores(query)
+        candidates = [
+            i for i, d in enumerate(self.descriptors) if within is None or d["code"] in within
+        ]
+        scale = max((lexical[i] for i in candidates), default=0.0) or 1.0
+        ranked = []
+        for i in candidates:
+            d = self.descriptors[i]
+            boost = 0.0
+            if d["year_level_code"] in year_codes:
+                boost += year_boost
+            elif year is not None and self._years[i] is not None and abs(self._years[i] - year) == 1:
+                boost += adjacent_boost
+            if strand and d["strand_title"].lower() == strand.lower():
+                boost += strand_boost
+            ranked.append((lexical[i] + scale * boost, i))
+        top = heapq.nsmallest(k, ranked, key=lambda item: (-item[0], item[1]))
+        return [self.descriptors[i] for _, i in top]
+
+
+def _descriptor_year(d: dict) -> int | None:
+    decoded = decode_code(d["code"])
+    return decoded.year if decoded else year_ordinal(d["year_level_code"])
+
+
+_index: DescriptorIndex | None = None
+_index_version: str | None = None
+_index_lock = threading.Lock()
+
+
+def year_level_codes(db: Session) -> dict[str, frozenset[str]]:
+    """Year level title -> its code in every subject, e.g. "Year 5" -> {"MATMATY5", "SCISCIY5"}."""
+    codes: dict[str, set[str]] = {}
+    for row in db.query(YearLevel.title, YearLevel.code):
+        codes.setdefault(row.title, set()).add(row.code)
+    return {title: frozenset(found) for title, found in codes.items()}
+
+
+def requested_year_codes(year_codes: dict[str, frozenset[str]], year_level: str | None) -> frozenset[str]:
+    """Year level codes matching a requested title (in any subject) or code."""
+    if not year_level:
+        return frozenset()
+    return year_codes.get(year_level) or frozenset({year_level})
+
+
+def build_index(db: Session) -> DescriptorIndex:
+    return DescriptorIndex(load_all_descriptors(db), load_elaborations(db), year_level_codes(db))
+
+
+def get_descriptor_index(db: Session) -> DescriptorIndex:
+    """Process-wide index, rebuilt when the curriculum data changes."""
+    global _index, _index_version
+    version = curriculum_hash(db)
+    if _index is None or _index_version != version:
+        with _index_lock:
+            if _index is None or _index_version != version:
+                _index = build_index(db)
+                _index_version = version
+    return _index
+
+
+def reset_descriptor_index() -> None:
+    global _index, _index_version
+    _index = _index_version = None
+
+
+def warm_descriptor_index() -> None:
+    """Build the index at startup so the first request doesn't pay for it."""
+    db = SessionLocal()
+    try:
+        index = get_descriptor_index(db)
+        logger.info("Descriptor index ready: %d descriptors", len(index.descriptors))
+    except Exception:
+        logger.warning("Could not build the descriptor index at startup", exc_info=True)
+    finally:
+        db.close()
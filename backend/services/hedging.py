@@ -0,0 +1,122 @@
+"""Request hedging for latency-sensitive LLM calls.
+
+If a call has not answered within a tracked latency percentile for its step,
+a duplicate is sent; the first successful response wins and the other task
+is cancelled. Hedges draw from a global budget so the extra traffic stays
+within ``LLM_HEDGE_BUDGET_RATIO`` of primary calls.
+
+Callers hedge inside the rate governor's call, not around it: the latency
+samples are then the provider round trip alone, without queueing or 429
+backoff, and a hedge is never sent while the primary is still waiting for
+rate-limit headroom.
+
+Per-call latency is recorded as ``llm_latency.<step>`` (what a single,
+unhedged request costs) and the effective latency as
+``hedged_latency.<step>``, so the metrics snapshot shows p50/p99 before and
+after hedging side by side. A primary that loses to its hedge is recorded
+at the time it was cancelled: only a lower bound, but dropping the slow
+calls would pull the tracked percentile, and so the hedge delay, down.
+"""
+
+import asyncio
+import threading
+import time
+from typing import Awaitable, Callable, TypeVar
+
+from backend.config import settings
+from backend.services.metrics import metrics
+
+T = TypeVar("T")
+
+
+class HedgeBudget:
+    """Token bucket: each primary call earns ``ratio`` hedges, capped at ``burst``."""
+
+    def __init__(self, ratio: float, burst: float):
+        self._lock = threading.Lock()
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = 0.0
+
+    def earn(self) -> None:
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def try_spend(self) -> bool:
+        with self._lock:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+_budget = HedgeBudget(settings.LLM_HEDGE_BUDGET_RATIO, settings.LLM_HEDGE_BURST)
+
+
+def hedge_delay_ms(step: str) -> float | None:
+    """Delay before hedging ``step``, or None until enough latency samples exist."""
+    samples = metrics.samples(f"llm_latency.{step}")
+    if len(samples) < settings.LLM_HEDGE_MIN_SAMPLES:
+        return None
+    delay = metrics.percentile(f"llm_latency.{step}", settings.LLM_HEDGE_PERCENTILE)
+    return max(delay, settings.LLM_HEDGE_MIN_DELAY_MS)
+
+
+async def _timed(step: str, call: Callable[[], Awaitable[T]], record_cancelled: bool = False) -> T:
+    start = time.perf_counter()
+    try:
+        result = await call()
+    except asyncio.CancelledError:
+        if record_cancelled:
+            metrics.observe(f"llm_latency.{step}", (time.perf_counter() - start) * 1000)
+        raise
+    metrics.observe(f"llm_latency.{step}", (time.perf_counter() - start) * 1000)
+    return result
+
+
+async def hedged_call(step: str, call: Callable[[], Awaitable[T]]) -> T:
+    """Await ``call()``, sending one duplicate if it is slower than usual."""
+    start = time.perf_counter()
+    metrics.incr(f"hedge.{step}.calls")
+    _budget.earn()
+
+    primary = asyncio.ensure_future(_timed(step, call, record_cancelled=True))
+    pending = {primary}
+    error: BaseException | None = None
+    try:
+        delay = hedge_delay_ms(step) if settings.LLM_HEDGING_ENABLED else None
+        if delay is not None:
+            await asyncio.wait(pending, timeout=delay / 1000)
+            if not primary.done() and _budget.try_spend():
+                metrics.incr(f"hedge.{step}.sent")
+                pending.add(asyncio.ensure_future(_timed(step, call)))
+
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not primary:
+                        metrics.incr(f"hedge.{step}.won")
+                    metrics.observe(f"hedged_latency.{step}", (time.perf_counter() - start) * 1000)
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def hedge_report(steps: list[str]) -> dict:
+    """p50/p99 of single-call versus hedged latency for each step."""
+    report = {}
+    for step in steps:
+        report[step] = {
+            "calls": metrics.count(f"hedge.{step}.calls"),
+            "hedges_sent": metrics.count(f"hedge.{step}.sent"),
+            "hedges_won": metrics.count(f"hedge.{step}.won"),
+            "single_call_p50_ms": metrics.percentile(f"llm_latency.{step}", 50),
+            "single_call_p99_ms": metrics.percentile(f"llm_latency.{step}", 99),
+            "hedged_p50_ms": metrics.percentile(f"hedged_latency.{step}", 50),
+            "hedged_p99_ms": metrics.percentile(f"hedged_latency.{step}", 99),
+        }
+    return report
@@ -0,0 +1,215 @@
+"""Deterministic fast path for the input analyzer.
+
+Form requests already carry year level, strand, teaching focus and resource
+type as structured fields, so the only things the LLM adds are intent and
+keywords. Intent follows directly from the teaching focus, and keywords are
+the topic's terms that appear in a vocabulary built from the curriculum's
+descriptor and elaboration text. The vocabulary is built at startup and
+rebuilt when the curriculum hash changes; if it cannot be loaded, the step
+asks the LLM.
+
+``analyze`` returns ``None`` with a reason when the topic is long, ambiguous
+or overlaps too little with the curriculum vocabulary; the step then asks
+the LLM as before. Hits, fallbacks and (optionally, by shadowing a sample of
+hits with the LLM path) agreement are recorded in ``metrics``.
+"""
+
+import logging
+import re
+import threading
+from collections import Counter
+from dataclasses import dataclass
+
+from sqlalchemy.orm import Session
+
+from backend.config import settings
+from backend.db.models import ContentDescriptor, Elaboration
+from backend.db.session import SessionLocal
+from backend.services.cag_service import curriculum_hash
+from backend.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+INTENT_BY_FOCUS = {
+    "explicit_instruction": "instruction",
+    "deep_learning_inquiry": "inquiry",
+    "fluency_practice": "practice",
+    "assessment_feedback": "assessment",
+    "planning": "planning",
+}
+
+STOPWORDS = frozenset(
+    """a an and are as at be by for from how i in into is it of on or our my
+    the their them this those to using use we what with year years student
+    students teach teaching lesson lessons about some me want need help""".split()
+)
+
+_WORD_RE = re.compile(r"[a-z]+(?:-[a-z]+)*")
+_AMBIGUOUS_RE = re.compile(r"\?|/|\bor\b|\bvs\.?\b|\bversus\b|\betc\b")
+
+MAX_KEYWORDS = 5
+MIN_KEYWORDS = 3
+
+
+def normalise(word: str) -> str:
+    """Crude singular form so 'fractions' and 'fraction' share a term."""
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def content_words(text: str) -> list[str]:
+    return [w for w in _WORD_RE.findall(text.lower()) if w not in STOPWORDS and len(w) > 2]
+
+
+class TopicVocabulary:
+    """Curriculum terms with the documents (descriptors/elaborations) using them."""
+
+    def __init__(self, documents: list[str]):
+        self.num_documents = len(documents)
+        self._docs: list[set[str]] = []
+        self.doc_freq: Counter[str] = Counter()
+        self.surface: dict[str, Counter[str]] = {}
+        for text in documents:
+            terms = set()
+            for word in content_words(text):
+                term = normalise(word)
+                terms.add(term)
+                self.surface.setdefault(term, Counter())[word] += 1
+            self._docs.append(terms)
+            self.doc_freq.update(terms)
+
+    def __contains__(self, term: str) -> bool:
+        return term in self.doc_freq
+
+    def display(self, term: str) -> str:
+        forms = self.surface.get(term)
+        return forms.most_common(1)[0][0] if forms else term
+
+    def related(self, terms: list[str], exclude: set[str], limit: int) -> list[str]:
+        """Terms most often used alongside ``terms`` but not common everywhere."""
+        together: Counter[str] = Counter()
+        for doc in self._docs:
+            if all(t in doc for t in terms):
+                together.update(doc)
+        common = self.num_documents * 0.2
+        ranked = [
+            t for t, _ in together.most_common()
+            if t not in exclude and self.doc_freq[t] <= common
+        ]
+        return ranked[:limit]
+
+
+@dataclass
+class FastPathResult:
+    parsed: dict | None
+    reason: str  # "hit" or why the LLM is needed
+
+
+_vocabulary: TopicVocabulary | None = None
+_vocabulary_version: str | None = None
+_vocabulary_lock = threading.Lock()
+
+
+def get_vocabulary(db: Session) -> TopicVocabulary:
+    """Process-wide vocabulary, rebuilt when the curriculum data changes."""
+    global _vocabulary, _vocabulary_version
+    version = curriculum_hash(db)
+    if _vocabulary is None or _vocabulary_version != version:
+        with _vocabulary_lock:
+            if _vocabulary is None or _vocabulary_version != version:
+                texts = [r.text for r in db.query(ContentDescriptor.text)]
+                texts += [r.text for r in db.query(Elaboration.text)]
+                _vocabulary = TopicVocabulary(texts)
+                _vocabulary_version = version
+    return _vocabulary
+
+
+def load_vocabulary() -> TopicVocabulary:
+    """``get_vocabulary`` with its own session (for worker threads)."""
+    db = SessionLocal()
+    try:
+        return get_vocabulary(db)
+    finally:
+        db.close()
+
+
+def reset_vocabulary() -> None:
+    global _vocabulary, _vocabulary_version
+    _vocabulary = _vocabulary_version = None
+
+
+def warm_vocabulary() -> None:
+    """Build the vocabulary at startup so the first request doesn't pay for it."""
+    if not settings.INPUT_FASTPATH_ENABLED:
+        return
+    try:
+        vocabulary = load_vocabulary()
+        logger.info("Topic vocabulary ready: %d terms", len(vocabulary.doc_freq))
+    except Exception:
+        logger.warning("Could not build the topic vocabulary at startup", exc_info=True)
+
+
+def analyze(params: dict, vocabulary: TopicVocabulary) -> FastPathResult:
+    """Derive the parsed input locally, or say why the LLM is needed."""
+    topic = " ".join(params["topic"].split())
+    words = content_words(topic)
+
+    if not words:
+        return FastPathResult(None, "no_terms")
+    if len(topic.split()) > settings.INPUT_FASTPATH_MAX_TOPIC_WORDS:
+        return FastPathResult(None, "long_topic")
+    if _AMBIGUOUS_RE.search(topic.lower()):
+        return FastPathResult(None, "ambiguous")
+    if params.get("teaching_focus") not in INTENT_BY_FOCUS:
+        return FastPathResult(None, "unknown_focus")
+
+    terms = list(dict.fromkeys(normalise(w) for w in words))
+    known = [t for t in terms if t in vocabulary]
+    if len(known) / len(terms) < settings.INPUT_FASTPATH_MIN_OVERLAP:
+        return FastPathResult(None, "low_overlap")
+
+    keywords = [vocabulary.display(t) for t in known[:MAX_KEYWORDS]]
+    if len(keywords) < MIN_KEYWORDS:
+        extra = vocabulary.related(known, set(known), MIN_KEYWORDS - len(keywords))
+        keywords += [vocabulary.display(t) for t in extra]
+
+    return FastPathResult(
+        {
+            "topic": topic,
+            "year_level": params["year_level"],
+            "strand": params["strand"],
+            "intent": INTENT_BY_FOCUS[params["teaching_focus"]],
+            "keywords": keywords,
+        },
+        "hit",
+    )
+
+
+def record_agreement(fast: dict, llm: dict) -> None:
+    """Compare a fast-path result with the LLM's answer for the same request."""
+    metrics.incr("input_fastpath.shadow.compared")
+    if fast.get("intent") == str(llm.get("intent", "")).lower():
+        metrics.incr("input_fastpath.shadow.intent_agree")
+    fast_terms = {normalise(w) for k in fast.get("keywords", []) for w in content_words(k)}
+    llm_terms = {normalise(w) for k in llm.get("keywords", []) or [] for w in content_words(str(k))}
+    if fast_terms & llm_terms:
+        metrics.incr("input_fastpath.shadow.keywords_overlap")
+
+
+def fastpath_report() -> dict:
+    """Hit rate, fallback reasons and LLM agreement for the metrics endpoint."""
+    counters = metrics.snapshot()["counters"]
+    prefix = "input_fastpath.fallback."
+    return {
+        "requests": metrics.count("input_fastpath.requests"),
+        "hit_rate": metrics.ratio("input_fastpath.hits", "input_fastpath.requests"),
+        "fallbacks": {k[len(prefix):]: v for k, v in counters.items() if k.startswith(prefix)},
+        "shadow_compared": metrics.count("input_fastpath.shadow.compared"),
+        "intent_agreement": metrics.ratio("input_fastpath.shadow.intent_agree", "input_fastpath.shadow.compared"),
+        "keyword_agreement": metrics.ratio(
+            "input_fastpath.shadow.keywords_overlap", "input_fastpath.shadow.compared"
+        ),
+    }
@@ -0,0 +1,122 @@
+"""Process-wide pooled HTTP and OpenAI clients.
+
+Every agent shares one keep-alive connection pool per transport (sync and
+async), so TLS handshakes and connection setup are paid once per process
+rather than once per workflow step. Connection reuse is tracked from the
+response's network stream and recorded in ``metrics``.
+"""
+
+import threading
+import time
+import weakref
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+from backend.config import settings
+from backend.services.metrics import metrics
+
+_lock = threading.RLock()
+_streams_lock = threading.Lock()
+_clients: dict[str, object] = {}
+_seen_streams: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def _pool_limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=settings.LLM_POOL_SIZE,
+        max_keepalive_connections=settings.LLM_POOL_SIZE,
+        keepalive_expiry=settings.LLM_KEEPALIVE_EXPIRY_S,
+    )
+
+
+def _record_connection(response: httpx.Response) -> None:
+    """Count whether the response travelled over a new or a reused connection."""
+    metrics.incr("llm_http.requests")
+    stream = response.extensions.get("network_stream")
+    if stream is None:
+        return
+    with _streams_lock:
+        reused = stream in _seen_streams
+        if not reused:
+            _seen_streams.add(stream)
+    metrics.incr("llm_http.connections_reused" if reused else "llm_http.connections_opened")
+
+
+async def _arecord_connection(response: httpx.Response) -> None:
+    _record_connection(response)
+
+
+def _get_or_create(key: str, factory):
+    client = _clients.get(key)
+    if client is not None:
+        return client
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            start = time.perf_counter()
+            client = _clients[key] = factory()
+            metrics.observe(f"llm_setup_ms.{key}", (time.perf_counter() - start) * 1000)
+    return client
+
+
+def get_http_client() -> httpx.Client:
+    return _get_or_create(
+        "http_sync",
+        lambda: httpx.Client(
+            limits=_pool_limits(),
+            timeout=settings.LLM_TIMEOUT_S,
+            event_hooks={"response": [_record_connection]},
+        ),
+    )
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    return _get_or_create(
+        "http_async",
+        lambda: httpx.AsyncClient(
+            limits=_pool_limits(),
+            timeout=settings.LLM_TIMEOUT_S,
+            event_hooks={"response": [_arecord_connection]},
+        ),
+    )
+
+
+def get_openai_client() -> OpenAI:
+    return _get_or_create(
+        "openai_sync",
+        lambda: OpenAI(api_key=settings.OPENAI_API_KEY, http_client=get_http_client()),
+    )
+
+
+def get_async_openai_client() -> AsyncOpenAI:
+    return _get_or_create(
+        "openai_async",
+        lambda: AsyncOpenAI(api_key=settings.OPENAI_API_KEY, http_client=get_async_http_client()),
+    )
+
+
+def pool_stats() -> dict:
+    """Connection reuse summary for the metrics endpoint."""
+    opened = metrics.count("llm_http.connections_opened")
+    reused = metrics.count("llm_http.connections_reused")
+    total = opened + reused
+    return {
+        "pool_size": settings.LLM_POOL_SIZE,
+        "requests": metrics.count("llm_http.requests"),
+        "connections_opened": opened,
+        "connections_reused": reused,
+        "reuse_rate": reused / total if total else None,
+    }
+
+
+async def close_clients() -> None:
+    """Close the pooled clients (application shutdown)."""
+    with _lock:
+        clients = dict(_clients)
+        _clients.clear()
+    for key, client in clients.items():
+        if key == "http_async":
+            await client.aclose()
+        elif key == "http_sync":
+            client.close()
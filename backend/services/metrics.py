@@ -0,0 +1,78 @@
+"""Process-wide performance counters and latency samples.
+
+Steps and services record into the shared ``metrics`` registry; the
+``/api/metrics`` endpoint exposes a snapshot with counters and p50/p90/p99
+summaries of every sampled series.
+"""
+
+import threading
+from collections import deque
+
+SAMPLE_WINDOW = 1000
+
+
+def percentile(values: list[float], q: float) -> float | None:
+    """Nearest-rank percentile (q in 0-100) of a list of values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1)))))
+    return ordered[rank]
+
+
+class Metrics:
+    def __init__(self, window: int = SAMPLE_WINDOW):
+        self._lock = threading.Lock()
+        self._window = window
+        self._counters: dict[str, float] = {}
+        self._samples: dict[str, deque] = {}
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float) -> None:
+        with self._lock:
+            series = self._samples.get(name)
+            if series is None:
+                series = self._samples[name] = deque(maxlen=self._window)
+            series.append(value)
+
+    def count(self, name: str) -> float:
+        with self._lock:
+            return self._counters.get(name, 0)
+
+    def samples(self, name: str) -> list[float]:
+        with self._lock:
+            return list(self._samples.get(name, ()))
+
+    def percentile(self, name: str, q: float) -> float | None:
+        return percentile(self.samples(name), q)
+
+    def ratio(self, numerator: str, denominator: str) -> float | None:
+        with self._lock:
+            den = self._counters.get(denominator, 0)
+            return self._counters.get(numerator, 0) / den if den else None
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            samples = {k: list(v) for k, v in self._samples.items()}
+        summaries = {
+            name: {
+                "count": len(values),
+                "p50": percentile(values, 50),
+                "p90": percentile(values, 90),
+                "p99": percentile(values, 99),
+            }
+            for name, values in samples.items()
+        }
+        return {"counters": counters, "latency_ms": summaries}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._samples.clear()
+
+
+metrics = Metrics()
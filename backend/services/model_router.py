@@ -0,0 +1,90 @@
+"""Model routing table: (step, resource type, year band, load level) -> model.
+
+Rules are matched most-specific first; a ``None`` field matches anything.
+``model`` may be a raw model id or one of the aliases ``"fast"`` /
+``"generation"``, which resolve to ``OPENAI_MODEL_FAST`` and
+``OPENAI_MODEL_GENERATION``. The table can be replaced wholesale with the
+``MODEL_ROUTING_TABLE`` setting (a JSON list of rule objects).
+
+The load level is ``"high"`` while the number of in-flight generations or
+the recent p90 generation latency passes its threshold, letting rules
+degrade to a faster model under pressure.
+"""
+
+from dataclasses import dataclass
+
+from backend.config import settings
+from backend.services.metrics import metrics
+
+NORMAL = "normal"
+HIGH = "high"
+
+DEFAULT_ROUTING_TABLE: list[dict] = [
+    {"step": "input_analyzer", "model": "fast", "max_tokens": 400},
+    {"step": "curriculum_matcher", "model": "fast", "max_tokens": 1200},
+    # Short resources don't need the generation-class model's latency
+    {"step": "resource_generator", "resource_type": "exit_ticket", "model": "fast", "max_tokens": 1500},
+    {"step": "resource_generator", "load_level": HIGH, "model": "fast", "max_tokens": 3000},
+    {"step": "resource_generator", "model": "generation", "max_tokens": 4000},
+]
+
+_MATCH_FIELDS = ("step", "resource_type", "year_band", "load_level")
+
+
+@dataclass(frozen=True)
+class ModelRoute:
+    model: str
+    max_tokens: int | None = None
+    load_level: str = NORMAL
+
+
+def _resolve_alias(model: str) -> str:
+    return {
+        "fast": settings.OPENAI_MODEL_FAST,
+        "generation": settings.OPENAI_MODEL_GENERATION,
+    }.get(model, model)
+
+
+def routing_table() -> list[dict]:
+    return settings.MODEL_ROUTING_TABLE or DEFAULT_ROUTING_TABLE
+
+
+def current_load_level() -> str:
+    """``"high"`` when queue depth or observed generation latency passes its threshold."""
+    if metrics.count("generations.in_flight") >= settings.MODEL_ROUTING_QUEUE_THRESHOLD:
+        return HIGH
+    latencies = metrics.samples("llm_latency.resource_generator")[-50:]
+    if len(latencies) >= 10:
+        latencies.sort()
+        if latencies[int(0.9 * (len(latencies) - 1))] >= settings.MODEL_ROUTING_LATENCY_THRESHOLD_MS:
+            return HIGH
+    return NORMAL
+
+
+def select_route(
+    step: str,
+    resource_type: str | None = None,
+    year_band: str | None = None,
+    load_level: str | None = None,
+) -> ModelRoute:
+    """Pick the most specific rule matching the request context."""
+    context = {
+        "step": step,
+        "resource_type": resource_type,
+        "year_band": year_band,
+        "load_level": load_level or current_load_level(),
+    }
+    best = None
+    best_specificity = -1
+    for rule in routing_table():
+        if any(rule.get(f) is not None and rule[f] != context[f] for f in _MATCH_FIELDS):
+            continue
+        specificity = sum(rule.get(f) is not None for f in _MATCH_FIELDS)
+        if specificity > best_specificity:
+            best, best_specificity = rule, specificity
+
+    if best is None:
+        default = "generation" if step == "resource_generator" else "fast"
+        return ModelRoute(_resolve_alias(default), None, context["load_level"])
+    metrics.incr(f"model_route.{step}.{_resolve_alias(best['model'])}")
+    return ModelRoute(_resolve_alias(best["model"]), best.get("max_tokens"), context["load_level"])
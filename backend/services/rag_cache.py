@@ -0,0 +1,203 @@
+"""Caches in front of the pedagogy RAG search.
+
+Two levels:
+
+- Query embeddings, keyed by a hash of (model, dimensions, query text), in an
+  in-process LRU over the ``rag_query_embeddings`` table. A hit saves the
+  embedding round trip to OpenAI; the table keeps them across restarts.
+  ``memory_embedding_cache`` is the LRU alone, for the NumPy backend, which
+  must not depend on the database.
+- Search results, keyed by (knowledge-base version, search mode, metadata
+  scope, result count, query hash), in-process with a short TTL. The version
+  is the row count and the latest write time of the vector table, re-read at
+  most every ``KB_VERSION_TTL_S``, so re-seeding the knowledge base
+  invalidates results. With the NumPy backend it is the snapshot searched.
+"""
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.exc import SQLAlchemyError
+
+from backend.config import settings
+from backend.db.models import RagQueryEmbedding
+from backend.db.session import SessionLocal
+from backend.services.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+KB_VERSION_TTL_S = 30.0
+
+
+def query_hash(*parts) -> str:
+    return hashlib.sha256("|".join(map(str, parts)).encode()).hexdigest()
+
+
+class EmbeddingCache:
+    """In-process LRU over a Postgres table of query embeddings (none without ``session_factory``)."""
+
+    def __init__(self, size: int, session_factory=SessionLocal):
+        self.size = size
+        self._session_factory = session_factory
+        self._memory: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, text: str, model: str, dimensions: int) -> list[float] | None:
+        key = query_hash(model, dimensions, text)
+        with self._lock:
+            embedding = self._memory.get(key)
+            if embedding is not None:
+                self._memory.move_to_end(key)
+        if embedding is not None:
+            metrics.incr("rag_cache.embedding.hits.memory")
+            return embedding
+        if self._session_factory is None:
+            metrics.incr("rag_cache.embedding.misses")
+            return None
+
+        row = None
+        db = self._session_factory()
+        try:
+            row = db.get(RagQueryEmbedding, key)
+        except SQLAlchemyError:
+            logger.warning("Query embedding lookup failed", exc_info=True)
+        finally:
+            db.close()
+        if row is None:
+            metrics.incr("rag_cache.embedding.misses")
+            return None
+        embedding = np.frombuffer(row.embedding, dtype=np.float32).tolist()
+        self._remember(key, embedding)
+        metrics.incr("rag_cache.embedding.hits.db")
+        return embedding
+
+    def put(self, text: str, model: str, dimensions: int, embedding: list[float]) -> None:
+        key = query_hash(model, dimensions, text)
+        self._remember(key, embedding)
+        if self._session_factory is None:
+            return
+        db = self._session_factory()
+        try:
+            db.merge(RagQueryEmbedding(
+                key=key,
+                model=model,
+                dimensions=dimensions,
+                embedding=np.asarray(embedding, dtype=np.float32).tobytes(),
+            ))
+            db.commit()
+        except SQLAlchemyError:
+            db.rollback()
+            logger.warning("Query embedding write failed", exc_info=True)
+        finally:
+            db.close()
+
+    def clear_memory(self) -> None:
+        with self._lock:
+            self._memory.clear()
+
+    def _remember(self, key: str, embedding: list[float]) -> None:
+        with self._lock:
+            self._memory[key] = embedding
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.size:
+                self._memory.popitem(last=False)
+
+
+class ResultCache:
+    """Search results per knowledge-base version, expiring after ``ttl_s``."""
+
+    def __init__(self, size: int, ttl_s: float):
+        self.size = size
+        self.ttl_s = ttl_s
+        self._entries: OrderedDict[str, tuple[float, list]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, version: str, query: str, max_results: int, mode: str, scope=None) -> list | None:
+        key = query_hash(version, mode, scope, max_results, query)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= now:
+                del self._entries[key]
+                entry = None
+        if entry is None:
+            metrics.incr("rag_cache.results.misses")
+            return None
+        metrics.incr("rag_cache.results.hits")
+        return entry[1]
+
+    def put(self, version: str, query: str, max_results: int, mode: str, results: list, scope=None) -> None:
+        key = query_hash(version, mode, scope, max_results, query)
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_s, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_version: str | None = None
+_version_read_at = 0.0
+_version_lock = threading.Lock()
+
+
+def knowledge_base_version(vector_db) -> str:
+    """Row count and latest write of the vector table; changes when it is re-seeded."""
+    global _version, _version_read_at
+    now = time.monotonic()
+    if _version is not None and now - _version_read_at < KB_VERSION_TTL_S:
+        return _version
+    with _version_lock:
+        if _version is None or now - _version_read_at >= KB_VERSION_TTL_S:
+            table = vector_db.table
+            with vector_db.db_engine.connect() as conn:
+                count, latest = conn.execute(
+                    select(func.count(), func.max(func.coalesce(table.c.updated_at, table.c.created_at)))
+                ).one()
+            version = f"{count}:{latest.isoformat() if latest else '-'}"
+            if _version is not None and version != _version:
+                result_cache.clear()
+            _version, _version_read_at = version, now
+    return _version
+
+
+def reset_knowledge_base_version() -> None:
+    global _version, _version_read_at
+    _version, _version_read_at = None, 0.0
+
+
+def rag_cache_report() -> dict:
+    """Hit rates and embedding round trips saved, for the metrics endpoint."""
+    memory = metrics.count("rag_cache.embedding.hits.memory")
+    database = metrics.count("rag_cache.embedding.hits.db")
+    embedding_lookups = memory + database + metrics.count("rag_cache.embedding.misses")
+    result_hits = metrics.count("rag_cache.results.hits")
+    result_lookups = result_hits + metrics.count("rag_cache.results.misses")
+    return {
+        "embeddings": {
+            "lookups": embedding_lookups,
+            "hit_rate": (memory + database) / embedding_lookups if embedding_lookups else None,
+            "memory_hits": memory,
+            "db_hits": database,
+            # A result hit skips the search, and so the query embedding, entirely
+            "round_trips_saved": memory + database + result_hits,
+        },
+        "results": {
+            "lookups": result_lookups,
+            "hit_rate": result_hits / result_lookups if result_lookups else None,
+            "entries": len(result_cache._entries),
+        },
+    }
+
+
+embedding_cache = EmbeddingCache(settings.RAG_EMBEDDING_CACHE_SIZE)
+memory_embedding_cache = EmbeddingCache(settings.RAG_EMBEDDING_CACHE_SIZE, session_factory=None)
+result_cache = ResultCache(settings.RAG_RESULT_CACHE_SIZE, settings.RAG_RESULT_CACHE_TTL_S)
@@ -0,0 +1,147 @@
+"""Early start for the pedagogy RAG search.
+
+The RAG query only needs the topic, teaching focus and the first few CAG
+matches, so the curriculum matcher starts the search in a worker thread as
+soon as those matches have streamed in. The pedagogy retriever then takes
+the prefetched results, provided its own query is the same, instead of
+searching again.
+
+With ``RAG_MULTI_QUERY`` the search is a set of focused queries, one per
+matched descriptor plus one for the teaching path, instead of one query that
+blends them all (see ``pedagogy_search.multi_search``).
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from backend.config import settings
+from backend.knowledge import numpy_store, pedagogy_search
+from backend.knowledge.chunk_metadata import focus_filter
+from backend.knowledge.pedagogy_kb import get_knowledge_base
+from backend.knowledge.pedagogy_search import Scope
+from backend.services.curriculum_graph import decode_code, year_ordinal
+from backend.services.metrics import metrics
+from backend.services.rag_cache import knowledge_base_version, result_cache
+
+logger = logging.getLogger(__name__)
+
+RAG_QUERY_MATCHES = 3  # matched descriptors included in the RAG query
+MAX_PENDING = 64
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rag-prefetch")
+_pending: OrderedDict[str, tuple[tuple, Future]] = OrderedDict()
+_lock = threading.Lock()
+
+
+def build_rag_query(parsed: dict, matches: list[dict], teaching_path: str) -> str:
+    """Semantic query from matched descriptors + teaching focus + year level."""
+    match_texts = [m.get("text", "") for m in matches[:RAG_QUERY_MATCHES]]
+    return (
+        f"{parsed['topic']} {parsed.get('strand', '')} "
+        f"{' '.join(match_texts)} "
+        f"{teaching_path} {parsed.get('year_level', '')}"
+    )
+
+
+def build_rag_queries(parsed: dict, matches: list[dict], teaching_path: str) -> tuple[str, ...]:
+    """The search's queries: ``build_rag_query`` alone, or one per descriptor and the teaching path."""
+    texts = [m.get("text", "") for m in matches[:RAG_QUERY_MATCHES] if m.get("text")]
+    if not settings.RAG_MULTI_QUERY or not texts:
+        return (build_rag_query(parsed, matches, teaching_path),)
+    topic, year_level = parsed["topic"], parsed.get("year_level", "")
+    queries = [f"{topic} {text} {year_level}" for text in texts]
+    queries.append(f"{topic} {parsed.get('strand', '')} {teaching_path} {year_level}")
+    return tuple(dict.fromkeys(queries))
+
+
+def build_rag_scope(parsed: dict, matches: list[dict], teaching_path: str) -> Scope | None:
+    """Matched descriptors, their strands and the years around them, plus the teaching focus.
+
+    Uses the same matches as ``build_rag_query``, so the prefetch and the
+    retriever agree on the scope.
+    """
+    if not settings.RAG_SCOPE_ENABLED:
+        return None
+    matches = matches[:RAG_QUERY_MATCHES]
+    codes = [m["code"] for m in matches if m.get("code")]
+    centres = {year_ordinal(parsed.get("year_level"))}
+    centres.update(d.year for d in map(decode_code, codes) if d)
+    radius = settings.RAG_SCOPE_YEAR_RADIUS
+    years = {y for c in centres if c is not None for y in range(c - radius, c + radius + 1) if 0 <= y <= 10}
+    strands = {s.strip().lower() for s in [parsed.get("strand"), *(m.get("strand") for m in matches)] if s}
+    return Scope(tuple(codes), tuple(sorted(years)), tuple(sorted(strands)), focus_filter(teaching_path))
+
+
+def _results_version() -> str:
+    """What cached results are valid for: the snapshot being searched, or the vector table's version."""
+    if settings.RAG_VECTOR_BACKEND == pedagogy_search.NUMPY:
+        store = numpy_store.get_store()
+        return f"snapshot:{store.name}:{store.version}"
+    return knowledge_base_version(get_knowledge_base().vector_db)
+
+
+def search_pedagogy(
+    query: str | tuple[str, ...], max_results: int = 5, mode: str | None = None, scope: Scope | None = None
+) -> list:
+    """Pedagogy search for one query or several (see ``build_rag_queries``).
+
+    Served from the result cache when the same search ran recently.
+    """
+    mode = mode or settings.RAG_SEARCH_MODE
+    queries = (query,) if isinstance(query, str) else tuple(query)
+    start = time.perf_counter()
+    try:
+        version = _results_version()
+        key = "\n".join(queries)
+        results = result_cache.get(version, key, max_results, mode, scope)
+        if results is None:
+            if len(queries) == 1:
+                results = pedagogy_search.search(queries[0], limit=max_results, mode=mode, scope=scope)
+            else:
+                results = pedagogy_search.multi_search(list(queries), limit=max_results, mode=mode, scope=scope)
+            if results:
+                result_cache.put(version, key, max_results, mode, results, scope)
+    except Exception:
+        logger.warning("Pedagogy search failed", exc_info=True)
+        return []
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    metrics.observe("rag.search_ms", elapsed_ms)
+    metrics.observe(f"rag.search_ms.{mode}", elapsed_ms)
+    return results
+
+
+def prefetch(key: str, query: str | tuple[str, ...], mode: str | None = None, scope: Scope | None = None) -> None:
+    """Start the search for ``query`` in the background for generation ``key``."""
+    with _lock:
+        if key in _pending:
+            return
+        _pending[key] = ((query, mode, scope), _executor.submit(search_pedagogy, query, mode=mode, scope=scope))
+        # Generations that failed before retrieval never collect theirs
+        while len(_pending) > MAX_PENDING:
+            _pending.popitem(last=False)
+    metrics.incr("rag_prefetch.started")
+
+
+def take(
+    key: str, query: str | tuple[str, ...], mode: str | None = None, scope: Scope | None = None, timeout: float = 30.0
+) -> list | None:
+    """Prefetched results for ``key`` if they were for the same search, else ``None``."""
+    with _lock:
+        entry = _pending.pop(key, None)
+    if entry is None:
+        return None
+    prefetched, future = entry
+    if prefetched != (query, mode, scope):
+        future.cancel()
+        metrics.incr("rag_prefetch.stale")
+        return None
+    try:
+        results = future.result(timeout=timeout)
+    except Exception:
+        logger.warning("RAG prefetch failed; searching again", exc_info=True)
+        return None
+    metrics.incr("rag_prefetch.used")
+    return results
@@ -0,0 +1,323 @@
+"""Process-wide token-per-minute / request-per-minute governor for LLM calls.
+
+Every LLM call reserves its estimated tokens before it is sent and settles
+the reservation with the provider-reported usage afterwards. Calls that
+would push a model over its configured TPM/RPM limit wait until the
+rolling one-minute window has room. Batch work may only use
+``LLM_GOVERNOR_BATCH_SHARE`` of a model's budget and always yields to
+waiting interactive calls.
+
+Agno agents don't raise provider errors: ``Agent.arun`` returns a run with
+``RunStatus.error`` (or streams a ``RunErrorEvent``) carrying only the
+message. The pooled model records the provider error it raised in a context
+variable that ``run`` sets up, and ``run_error`` turns a failed run back
+into an ``AgentRunError`` with the provider's status code, so a 429 is
+retried here and reported as ``rate_limited`` to the client.
+
+With ``LLM_GOVERNOR_DB_COORDINATION`` enabled, reservations are also
+counted in the ``llm_rate_windows`` table (one row per model and minute),
+so several workers share one budget.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from collections import deque
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, TypeVar
+
+from agno.run.base import RunStatus
+from sqlalchemy import text
+
+from backend.config import settings
+from backend.db.session import SessionLocal
+from backend.services.metrics import metrics
+from backend.services.token_budget import count_tokens
+
+T = TypeVar("T")
+
+WINDOW_S = 60.0
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+# Provider errors raised inside the current governed call (see ``note_provider_error``)
+_provider_errors: ContextVar[list | None] = ContextVar("llm_provider_errors", default=None)
+
+
+class AgentRunError(RuntimeError):
+    """An agent run that ended in error, with the provider's HTTP status if known."""
+
+    def __init__(self, message: str, status_code: int | None = None):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+@dataclass
+class ModelLimits:
+    tpm: int = 0  # 0 = unlimited
+    rpm: int = 0
+
+
+@dataclass
+class Reservation:
+    model: str
+    estimated_tokens: int
+    wait_ms: int = 0
+    window_start: datetime | None = None
+    _entry: list = field(default_factory=list, repr=False)
+
+
+def estimate_call_tokens(prompt: str, model: str, max_tokens: int | None = None) -> int:
+    """Estimated prompt plus expected completion tokens for one call."""
+    expected_output = (
+        settings.LLM_EXPECTED_OUTPUT_TOKENS_GENERATION
+        if model == settings.OPENAI_MODEL_GENERATION
+        else settings.LLM_EXPECTED_OUTPUT_TOKENS_FAST
+    )
+    if max_tokens:
+        expected_output = min(expected_output, max_tokens)
+    return count_tokens(prompt) + expected_output
+
+
+def configured_limits() -> dict[str, ModelLimits]:
+    return {
+        settings.OPENAI_MODEL_FAST: ModelLimits(settings.OPENAI_FAST_TPM, settings.OPENAI_FAST_RPM),
+        settings.OPENAI_MODEL_GENERATION: ModelLimits(
+            settings.OPENAI_GENERATION_TPM, settings.OPENAI_GENERATION_RPM
+        ),
+    }
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    return getattr(exc, "status_code", None) == 429
+
+
+def track_provider_errors() -> None:
+    """Start recording provider errors for a call made outside ``run`` (the streamed generation)."""
+    _provider_errors.set([])
+
+
+def note_provider_error(exc: BaseException) -> None:
+    """Remember a model provider error for the governed call in progress."""
+    errors = _provider_errors.get()
+    if errors is not None:
+        errors.append(exc)
+
+
+def run_error(message: str | None) -> AgentRunError:
+    """The exception for a failed agent run, carrying the provider error's status code."""
+    errors = _provider_errors.get() or []
+    cause = errors[-1] if errors else None
+    error = AgentRunError(message or str(cause or "Agent run failed"), getattr(cause, "status_code", None))
+    error.__cause__ = cause
+    return error
+
+
+def raise_for_run_error(result) -> None:
+    """Raise if ``result`` is an agent run that ended with ``RunStatus.error``."""
+    if getattr(result, "status", None) == RunStatus.error:
+        raise run_error(getattr(result, "content", None))
+
+
+class RateGovernor:
+    def __init__(self, limits: dict[str, ModelLimits], batch_share: float = 0.5, db_coordination: bool = False):
+        self.limits = limits
+        self.batch_share = batch_share
+        self.db_coordination = db_coordination
+        self._lock = threading.Lock()
+        # model -> deque of [timestamp, tokens] entries within the window
+        self._windows: dict[str, deque] = {}
+        self._interactive_waiting = 0
+
+    # -- local rolling window -------------------------------------------------
+
+    def _usage(self, model: str, now: float) -> tuple[int, int, float | None]:
+        """(requests, tokens, oldest timestamp) in the current window."""
+        window = self._windows.setdefault(model, deque())
+        while window and now - window[0][0] >= WINDOW_S:
+            window.popleft()
+        tokens = sum(entry[1] for entry in window)
+        return len(window), tokens, window[0][0] if window else None
+
+    def _try_reserve(self, model: str, tokens: int, lane: str) -> tuple[list | None, float]:
+        """Reserve capacity, or return the seconds to wait before retrying."""
+        limits = self.limits.get(model, ModelLimits())
+        share = self.batch_share if lane == BATCH else 1.0
+        with self._lock:
+            if lane == BATCH and self._interactive_waiting:
+                return None, 0.1
+            now = time.monotonic()
+            requests, used, oldest = self._usage(model, now)
+            over_rpm = limits.rpm and requests + 1 > limits.rpm * share
+            # A single call larger than the whole budget is let through on an empty window
+            over_tpm = limits.tpm and used and used + tokens > limits.tpm * share
+            if over_rpm or over_tpm:
+                retry_in = WINDOW_S - (now - oldest) if oldest is not None else 0.1
+                return None, max(0.05, retry_in)
+            entry = [now, tokens]
+            self._windows[model].append(entry)
+            return entry, 0.0
+
+    # -- optional cross-worker coordination -----------------------------------
+
+    def _db_reserve(self, model: str, tokens: int, lane: str) -> tuple[datetime | None, float]:
+        limits = self.limits.get(model, ModelLimits())
+        share = self.batch_share if lane == BATCH else 1.0
+        now = datetime.now(timezone.utc)
+        window_start = now.replace(second=0, microsecond=0)
+        db = SessionLocal()
+        try:
+            row = db.execute(
+                text(
+                    "INSERT INTO llm_rate_windows (model, window_start, requests, tokens) "
+                    "VALUES (:model, :window_start, 1, :tokens) "
+                    "ON CONFLICT (model, window_start) DO UPDATE SET "
+                    "requests = llm_rate_windows.requests + 1, "
+                    "tokens = llm_rate_windows.tokens + EXCLUDED.tokens "
+                    "RETURNING requests, tokens"
+                ),
+                {"model": model, "window_start": window_start, "tokens": tokens},
+            ).one()
+            over_rpm = limits.rpm and row.requests > limits.rpm * share
+            over_tpm = limits.tpm and row.requests > 1 and row.tokens > limits.tpm * share
+            if over_rpm or over_tpm:
+                db.rollback()
+                return None, max(0.05, WINDOW_S - now.second - now.microsecond / 1e6)
+            db.commit()
+            return window_start, 0.0
+        finally:
+            db.close()
+
+    def _db_settle(self, reservation: Reservation, actual_tokens: int) -> None:
+        db = SessionLocal()
+        try:
+            db.execute(
+                text(
+                    "UPDATE llm_rate_windows SET tokens = tokens + :delta "
+                    "WHERE model = :model AND window_start = :window_start"
+                ),
+                {
+                    "delta": actual_tokens - reservation.estimated_tokens,
+                    "model": reservation.model,
+                    "window_start": reservation.window_start,
+                },
+            )
+            db.commit()
+        finally:
+            db.close()
+
+    # -- public API -----------------------------------------------------------
+
+    async def acquire(self, model: str, estimated_tokens: int, lane: str = INTERACTIVE) -> Reservation:
+        """Wait until ``model`` has room for the call, then reserve it."""
+        start = time.perf_counter()
+        if lane == INTERACTIVE:
+            with self._lock:
+                self._interactive_waiting += 1
+        try:
+            while True:
+                entry, retry_in = self._try_reserve(model, estimated_tokens, lane)
+                if entry is not None:
+                    window_start = None
+                    if self.db_coordination:
+                        window_start, retry_in = await asyncio.to_thread(
+                            self._db_reserve, model, estimated_tokens, lane
+                        )
+                        if window_start is None:
+                            with self._lock:
+                                self._windows[model].remove(entry)
+                            await asyncio.sleep(retry_in)
+                            continue
+                    break
+                await asyncio.sleep(retry_in)
+        finally:
+            if lane == INTERACTIVE:
+                with self._lock:
+                    self._interactive_waiting -= 1
+
+        wait_ms = int((time.perf_counter() - start) * 1000)
+        metrics.observe(f"governor_wait_ms.{model}", wait_ms)
+        metrics.incr(f"governor.{model}.requests")
+        metrics.incr(f"governor.{model}.estimated_tokens", estimated_tokens)
+        return Reservation(model, estimated_tokens, wait_ms, window_start, entry)
+
+    async def settle(self, reservation: Reservation, actual_tokens: int | None) -> None:
+        """Replace the estimate with the provider-reported token count."""
+        if actual_tokens is None:
+            return
+        metrics.incr(f"governor.{reservation.model}.actual_tokens", actual_tokens)
+        with self._lock:
+            if reservation._entry:
+                reservation._entry[1] = actual_tokens
+        if self.db_coordination and reservation.window_start is not None:
+            await asyncio.to_thread(self._db_settle, reservation, actual_tokens)
+
+    async def run(
+        self,
+        model: str,
+        estimated_tokens: int,
+        call: Callable[[], Awaitable[T]],
+        lane: str = INTERACTIVE,
+    ) -> tuple[T, int]:
+        """Run ``call`` under the governor, retrying 429s with jittered backoff.
+
+        An agent run returned with ``RunStatus.error`` counts as a failure.
+        Returns (result, total governor wait in ms).
+        """
+        waited = 0
+        for attempt in range(settings.LLM_GOVERNOR_MAX_RETRIES + 1):
+            reservation = await self.acquire(model, estimated_tokens, lane)
+            waited += reservation.wait_ms
+            token = _provider_errors.set([])
+            try:
+                result = await call()
+                raise_for_run_error(result)
+            except Exception as exc:
+                if not is_rate_limit_error(exc) or attempt == settings.LLM_GOVERNOR_MAX_RETRIES:
+                    raise
+                metrics.incr(f"governor.{model}.rate_limited")
+                backoff = settings.LLM_GOVERNOR_RETRY_BASE_S * (2**attempt)
+                delay = random.uniform(backoff / 2, backoff)
+                await asyncio.sleep(delay)
+                waited += int(delay * 1000)
+                continue
+            finally:
+                _provider_errors.reset(token)
+            await self.settle(reservation, _total_tokens(result))
+            return result, waited
+        raise RuntimeError("unreachable")
+
+    def usage(self) -> dict:
+        """Current one-minute usage per model for the metrics endpoint."""
+        report = {}
+        with self._lock:
+            now = time.monotonic()
+            for model in set(self.limits) | set(self._windows):
+                requests, tokens, _ = self._usage(model, now)
+                limits = self.limits.get(model, ModelLimits())
+                report[model] = {
+                    "requests_last_minute": requests,
+                    "tokens_last_minute": tokens,
+                    "rpm_limit": limits.rpm,
+                    "tpm_limit": limits.tpm,
+                }
+        for model, entry in report.items():
+            entry["estimated_tokens"] = metrics.count(f"governor.{model}.estimated_tokens")
+            entry["actual_tokens"] = metrics.count(f"governor.{model}.actual_tokens")
+            entry["rate_limited"] = metrics.count(f"governor.{model}.rate_limited")
+        return report
+
+
+def _total_tokens(result) -> int | None:
+    m = getattr(result, "metrics", None)
+    return (m.total_tokens or None) if m is not None else None
+
+
+governor = RateGovernor(
+    configured_limits(),
+    batch_share=settings.LLM_GOVERNOR_BATCH_SHARE,
+    db_coordination=settings.LLM_GOVERNOR_DB_COORDINATION,
+)
@@ -12,6 +12,7 @@ from backend.db.models import (
     TeachingFocus,
     YearLevel,
 )
+from backend.services.token_budget import TokenBudget
 
 
 def select_template(
@@ -52,9 +53,16 @@ def resolve_template(
     teaching_focus_slug: str,
     rag_context: str,
     additional_context: str,
+    budget: TokenBudget | None = None,
+    guidance: str = "",
 ) -> tuple[str, dict]:
     """Resolve all {variable} placeholders in a template from DB lookups.
 
+    If a ``budget`` is given, variables are trimmed to fit it and its report
+    records the per-variable decisions. ``guidance`` (routing pedagogy notes)
+    is placed between the template scaffolding and the request details; see
+    ``render_template``.
+
     Returns (resolved_prompt, variables_dict).
     """
     variables = {}
@@ -89,9 +97,30 @@ def resolve_template(
     variables["rag_context"] = rag_context or "No additional pedagogical context retrieved."
     variables["additional_context"] = additional_context or "No additional context provided."
 
-    # Resolve
-    resolved = template.template_body
-    for key, value in variables.items():
-        resolved = resolved.replace(f"{{{key}}}", str(value))
+    if budget is not None:
+        variables = budget.fit(template.template_body, variables)
+
+    return render_template(template.template_body, variables, guidance), variables
+
 
-    return resolved, variables
+def render_template(template_body: str, variables: dict, guidance: str = "") -> str:
+    """Render a template with a prefix-cache-friendly layout.
+
+    Placeholders in the body become ``<name>`` references and their values are
+    listed in a Request Details section at the end. The scaffolding (and the
+    routing guidance, which only varies by teaching focus and year band) is
+    then byte-identical for every request using the template, so provider-side
+    prompt caching can serve it.
+    """
+    used = [key for key in variables if f"{{{key}}}" in template_body]
+    scaffold = template_body
+    for key in used:
+        scaffold = scaffold.replace(f"{{{key}}}", f"<{key}>")
+
+    parts = [scaffold]
+    if guidance:
+        parts.append(f"**Pedagogical Guidance:**\n{guidance}")
+    details = "\n\n".join(f"<{key}>:\n{variables[key]}" for key in used)
+    if details:
+        parts.append(f"## Request Details\nValues for the <placeholders> referenced above:\n\n{details}")
+    return "\n\n".join(parts)
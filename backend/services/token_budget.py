@@ -0,0 +1,191 @@
+"""Offline token counting and per-template prompt budgets.
+
+``count_tokens`` is a BPE-shaped estimator (words, digit groups, punctuation
+runs, line breaks) scaled by a factor that self-calibrates against the
+input-token counts the provider reports for real prompts, so no tokenizer
+files are needed at runtime.
+
+``TokenBudget`` fits resolved template variables into a per-template token
+limit: each variable is capped at its maximum share, then lower-priority
+context is trimmed or dropped until the prompt fits. Every decision is kept
+in ``TokenBudget.report`` for the generation's debug log.
+"""
+
+import logging
+import math
+import re
+import threading
+from dataclasses import dataclass, field
+
+logger = logging.getLogger(__name__)
+
+_PIECE_RE = re.compile(r"[A-Za-z]+|\d+|\s+|([^\sA-Za-z\d])\1*")
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+
+_scale_lock = threading.Lock()
+_scale = 1.0
+
+
+def _raw_count(text: str) -> int:
+    tokens = 0
+    for match in _PIECE_RE.finditer(text):
+        piece = match.group(0)
+        if piece[0].isalpha():
+            tokens += 1 + (len(piece) - 1) // 9
+        elif piece[0].isdigit():
+            tokens += math.ceil(len(piece) / 3)
+        elif piece.isspace():
+            # Single spaces merge into the following word
+            tokens += 1 if ("\n" in piece or len(piece) > 1) else 0
+        else:
+            tokens += math.ceil(len(piece) / 4)
+    return tokens
+
+
+def count_tokens(text: str) -> int:
+    """Estimated token count of ``text``."""
+    if not text:
+        return 0
+    return max(1, round(_raw_count(text) * _scale))
+
+
+def calibrate(text: str, actual_tokens: int, overhead: int = 0) -> None:
+    """Nudge the estimator towards a provider-reported prompt token count.
+
+    ``overhead`` is the part of ``actual_tokens`` that is not ``text``: the
+    agent's system message and the chat framing (see
+    ``agents.prompt_overhead_tokens``).
+    """
+    global _scale
+    raw = _raw_count(text)
+    if raw < 50 or actual_tokens <= overhead:
+        return
+    observed = (actual_tokens - overhead) / raw
+    with _scale_lock:
+        _scale = min(2.0, max(0.5, 0.9 * _scale + 0.1 * observed))
+
+
+def estimator_scale() -> float:
+    return _scale
+
+
+@dataclass(frozen=True)
+class VariablePolicy:
+    priority: int  # higher is kept longer
+    max_share: float  # fraction of the variable budget this one may use
+    unit: str = "words"  # trim granularity: lines, paragraphs, sentences, words
+
+
+VARIABLE_POLICIES: dict[str, VariablePolicy] = {
+    "content_descriptor": VariablePolicy(100, 1.0, "words"),
+    "year_level": VariablePolicy(100, 1.0),
+    "strand": VariablePolicy(100, 1.0),
+    "resource_type_name": VariablePolicy(100, 1.0),
+    "teaching_focus": VariablePolicy(100, 1.0),
+    "resource_type_description": VariablePolicy(80, 0.10, "sentences"),
+    "additional_context": VariablePolicy(70, 0.15, "sentences"),
+    "elaborations": VariablePolicy(60, 0.25, "lines"),
+    "achievement_standard": VariablePolicy(40, 0.20, "sentences"),
+    "rag_context": VariablePolicy(30, 0.40, "paragraphs"),
+}
+DEFAULT_POLICY = VariablePolicy(50, 0.20)
+DROPPED_TEXT = "Omitted for length."
+
+
+def _split_units(text: str, unit: str) -> tuple[list[str], str]:
+    if unit == "lines":
+        return text.split("\n"), "\n"
+    if unit == "paragraphs":
+        return text.split("\n\n"), "\n\n"
+    if unit == "sentences":
+        return _SENTENCE_RE.split(text), " "
+    return text.split(" "), " "
+
+
+def trim_to_tokens(text: str, limit: int, unit: str = "words") -> str:
+    """Keep whole leading units of ``text`` that fit in ``limit`` tokens."""
+    if count_tokens(text) <= limit:
+        return text
+    units, joiner = _split_units(text, unit)
+    kept: list[str] = []
+    used = 0
+    for piece in units:
+        cost = count_tokens(piece + joiner)
+        if used + cost > limit:
+            break
+        kept.append(piece)
+        used += cost
+    if not kept and unit != "words":
+        return trim_to_tokens(units[0], limit, "words")
+    return joiner.join(kept)
+
+
+@dataclass
+class TokenBudget:
+    """Token limit for one resolved prompt, collecting its trimming decisions."""
+
+    limit: int
+    reserved: int = 0  # tokens spent outside the template (e.g. pedagogy notes)
+    report: list[dict] = field(default_factory=list)
+
+    def fit(self, template_body: str, variables: dict[str, str]) -> dict[str, str]:
+        """Return ``variables`` trimmed so the rendered template fits the limit."""
+        scaffolding = template_body
+        for key in variables:
+            scaffolding = scaffolding.replace(f"{{{key}}}", "")
+        used_names = [k for k in variables if f"{{{k}}}" in template_body]
+        available = max(0, self.limit - self.reserved - count_tokens(scaffolding))
+
+        fitted = dict(variables)
+        sizes = {k: count_tokens(str(v)) for k, v in variables.items()}
+        actions = {k: "kept" for k in variables}
+
+        # 1. Cap each variable at its maximum share
+        for name in used_names:
+            policy = VARIABLE_POLICIES.get(name, DEFAULT_POLICY)
+            cap = int(available * policy.max_share)
+            if sizes[name] > cap and policy.priority < 100:
+                fitted[name] = trim_to_tokens(str(fitted[name]), cap, policy.unit)
+                actions[name] = "trimmed"
+
+        # 2. Trim or drop from the lowest priority until the whole prompt fits
+        current = {k: count_tokens(str(fitted[k])) for k in used_names}
+        overflow = sum(current.values()) - available
+        for name in sorted(used_names, key=lambda k: VARIABLE_POLICIES.get(k, DEFAULT_POLICY).priority):
+            if overflow <= 0:
+                break
+            policy = VARIABLE_POLICIES.get(name, DEFAULT_POLICY)
+            if policy.priority >= 100:
+                continue
+            target = current[name] - overflow
+            trimmed = trim_to_tokens(str(fitted[name]), target, policy.unit) if target > 0 else ""
+            if not trimmed.strip():
+                fitted[name] = DROPPED_TEXT
+                actions[name] = "dropped"
+            else:
+                fitted[name] = trimmed
+                actions[name] = "trimmed"
+            new_size = count_tokens(str(fitted[name]))
+            overflow -= current[name] - new_size
+            current[name] = new_size
+
+        self.report = [
+            {
+                "variable": name,
+                "tokens": sizes[name],
+                "tokens_after": count_tokens(str(fitted[name])),
+                "action": actions[name],
+            }
+            for name in used_names
+        ]
+        for entry in self.report:
+            logger.debug("prompt budget: %s", entry)
+        return fitted
+
+    def summary(self) -> dict:
+        return {
+            "limit": self.limit,
+            "reserved": self.reserved,
+            "variables": self.report,
+            "estimator_scale": round(estimator_scale(), 3),
+        }
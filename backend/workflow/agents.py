@@ -1,48 +1,197 @@
-"""Agno Agent definitions for the lesson workflow."""
+"""Agno Agent definitions for the lesson workflow.
+
+Each factory consults the model routing table for its step, then returns
+the shared agent for the chosen (model, max_tokens). Agents are stateless
+configurations, so one instance per route is built lazily and reused by
+every generation in the process. Their models talk to OpenAI through the
+pooled clients in ``backend.services.llm_pool``.
+"""
+
+import logging
+import threading
+import time
 
 from agno.agent import Agent
+from agno.exceptions import ModelProviderError
 from agno.models.openai import OpenAIChat
+from agno.session import AgentSession
+
+from backend.services.llm_pool import get_async_openai_client, get_openai_client
+from backend.services.metrics import metrics
+from backend.services.model_router import ModelRoute, select_route
+from backend.services.rate_governor import note_provider_error
+from backend.services.token_budget import count_tokens
+
+logger = logging.getLogger(__name__)
+
+# Chat framing the provider counts as prompt tokens: per message, and once
+# to prime the reply
+MESSAGE_FRAMING_TOKENS = 4
+REPLY_PRIMING_TOKENS = 3
+
+_registry: dict[tuple[str, str, int | None], Agent] = {}
+_registry_lock = threading.Lock()
+_system_texts: dict[int, str] = {}  # id(agent) -> its system message
+
+
+class PooledOpenAIChat(OpenAIChat):
+    """OpenAIChat that sends every request through the process-wide pooled clients.
+
+    Provider errors are noted for the rate governor before agno turns them
+    into an errored run, so their status code (429) is not lost.
+    """
+
+    def get_client(self):
+        return get_openai_client()
+
+    def get_async_client(self):
+        return get_async_openai_client()
+
+    async def ainvoke(self, *args, **kwargs):
+        try:
+            return await super().ainvoke(*args, **kwargs)
+        except ModelProviderError as exc:
+            note_provider_error(exc)
+            raise
+
+    async def ainvoke_stream(self, *args, **kwargs):
+        try:
+            async for chunk in super().ainvoke_stream(*args, **kwargs):
+                yield chunk
+        except ModelProviderError as exc:
+            note_provider_error(exc)
+            raise
 
-from backend.config import settings
+
+def _model(route: ModelRoute) -> OpenAIChat:
+    return PooledOpenAIChat(id=route.model, max_tokens=route.max_tokens)
+
+
+def _shared_agent(name: str, route: ModelRoute, build) -> Agent:
+    """Return the process-wide agent for ``name`` on ``route``, building it once."""
+    start = time.perf_counter()
+    key = (name, route.model, route.max_tokens)
+    agent = _registry.get(key)
+    if agent is None:
+        with _registry_lock:
+            agent = _registry.get(key)
+            if agent is None:
+                agent = _registry[key] = build(_model(route))
+                metrics.incr("agent_registry.built")
+    metrics.incr("agent_registry.lookups")
+    metrics.observe(f"agent_setup_ms.{name}", (time.perf_counter() - start) * 1000)
+    return agent
+
+
+def prompt_overhead_tokens(agent: Agent) -> int:
+    """Estimated prompt tokens an agent run adds to the text it is given.
+
+    That is the system message built from the agent's instructions plus the
+    chat framing of it and the user message, so ``calibrate`` can compare the
+    provider's input-token count with the prompt text alone.
+    """
+    text = _system_texts.get(id(agent))
+    if text is None:
+        try:
+            system = agent.get_system_message(session=AgentSession(session_id="prompt-overhead"))
+        except Exception:
+            logger.debug("Could not build the system message of %s", agent.name, exc_info=True)
+            system = None
+        text = _system_texts[id(agent)] = str(system.content or "") if system is not None else ""
+    messages = 2 if text else 1
+    return count_tokens(text) + messages * MESSAGE_FRAMING_TOKENS + REPLY_PRIMING_TOKENS
+
+
+def run_token_usage(step: str, run_metrics, model: str) -> dict | None:
+    """Token usage dict for a run, recording prompt-cache hits for ``step``.
+
+    ``cached_tokens`` is the part of the prompt served from the provider's
+    prompt cache (the shared prefix of the catalogue or template).
+    """
+    if not run_metrics or not (run_metrics.input_tokens or run_metrics.output_tokens):
+        return None
+    usage = {
+        "input_tokens": run_metrics.input_tokens or 0,
+        "output_tokens": run_metrics.output_tokens or 0,
+        "total_tokens": run_metrics.total_tokens or 0,
+        "cached_tokens": getattr(run_metrics, "cache_read_tokens", 0) or 0,
+        "model": model,
+    }
+    metrics.incr(f"prompt_cache.{step}.input_tokens", usage["input_tokens"])
+    metrics.incr(f"prompt_cache.{step}.cached_tokens", usage["cached_tokens"])
+    return usage
+
+
+def prompt_cache_report(steps: list[str]) -> dict:
+    """Share of prompt tokens served from the provider cache, per step."""
+    return {
+        step: {
+            "input_tokens": metrics.count(f"prompt_cache.{step}.input_tokens"),
+            "cached_tokens": metrics.count(f"prompt_cache.{step}.cached_tokens"),
+            "cached_ratio": metrics.ratio(
+                f"prompt_cache.{step}.cached_tokens", f"prompt_cache.{step}.input_tokens"
+            ),
+        }
+        for step in steps
+    }
 
 
 def get_input_analyzer() -> Agent:
-    return Agent(
-        name="Input Analyzer",
-        model=OpenAIChat(id=settings.OPENAI_MODEL_FAST),
-        instructions=[
-            "You are an educational request parser for the Australian Mathematics Curriculum.",
-            "Parse the teacher's request and extract: topic, year_level, strand, intent, and keywords.",
-            "Intent should be one of: instruction, practice, assessment, inquiry, planning.",
-            "Keywords should be 3-5 key mathematical terms from the request.",
-        ],
-        markdown=False,
+    return _shared_agent(
+        "input_analyzer",
+        select_route("input_analyzer"),
+        lambda model: Agent(
+            name="Input Analyzer",
+            model=model,
+            instructions=[
+                "You are an educational request parser for the Australian Mathematics Curriculum.",
+                "Parse the teacher's request and extract: topic, year_level, strand, intent, and keywords.",
+                "Intent should be one of: instruction, practice, assessment, inquiry, planning.",
+                "Keywords should be 3-5 key mathematical terms from the request.",
+            ],
+            markdown=False,
+        ),
     )
 
 
 def get_cag_matcher() -> Agent:
-    return Agent(
-        name="Curriculum Matcher",
-        model=OpenAIChat(id=settings.OPENAI_MODEL_FAST),
-        instructions=[
-            "You are a curriculum matching expert.",
-            "Given a teacher's topic and ALL content descriptors, find the best matches.",
-            "Return valid JSON only.",
-        ],
-        markdown=False,
+    return _shared_agent(
+        "cag_matcher",
+        select_route("curriculum_matcher"),
+        lambda model: Agent(
+            name="Curriculum Matcher",
+            model=model,
+            instructions=[
+                "You are a curriculum matching expert.",
+                "Given a teacher's topic and ALL content descriptors, find the best matches.",
+                "Return valid JSON only.",
+            ],
+            markdown=False,
+        ),
     )
 
 
-def get_resource_generator() -> Agent:
-    return Agent(
-        name="Resource Generator",
-        model=OpenAIChat(id=settings.OPENAI_MODEL_GENERATION),
-        instructions=[
-            "You are an expert Australian Mathematics educator.",
-            "Generate high-quality, classroom-ready educational resources.",
-            "Use Australian English spelling and terminology.",
-            "Format output in clean Markdown with clear headings and structure.",
-            "Include practical, specific content - not generic placeholders.",
-        ],
-        markdown=True,
+def get_resource_generator(resource_type: str | None = None, year_band: str | None = None) -> Agent:
+    return _shared_agent(
+        "resource_generator",
+        select_route("resource_generator", resource_type=resource_type, year_band=year_band),
+        lambda model: Agent(
+            name="Resource Generator",
+            model=model,
+            instructions=[
+                "You are an expert Australian Mathematics educator.",
+                "Generate high-quality, classroom-ready educational resources.",
+                "Use Australian English spelling and terminology.",
+                "Format output in clean Markdown with clear headings and structure.",
+                "Include practical, specific content - not generic placeholders.",
+            ],
+            markdown=True,
+        ),
     )
+
+
+def reset_agents() -> None:
+    """Drop all shared agents (tests and configuration reloads)."""
+    with _registry_lock:
+        _registry.clear()
+        _system_texts.clear()
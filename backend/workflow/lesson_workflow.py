@@ -13,6 +13,7 @@ from typing import List
 
 from agno.workflow.router import Router
 from agno.workflow.step import Step, StepInput
+from agno.workflow.types import HumanReview, OnError
 from agno.workflow.workflow import Workflow
 
 from backend.workflow.steps.input_analyzer import input_analyzer_step
@@ -22,6 +23,10 @@ from backend.workflow.steps.resource_generator import resource_generator_step
 from backend.workflow.steps.teaching_router import teaching_router_step
 from backend.workflow.steps.template_resolver import template_resolver_step
 
+# LLM steps: the rate governor already retries 429s, and a failure ends the run
+# with an error event (code ``rate_limited`` for a 429) instead of being skipped
+LLM_STEP_POLICY = {"max_retries": 0, "human_review": HumanReview(on_error=OnError.fail)}
+
 # Define the 5 teaching focus processing steps for the Router
 explicit_instruction_step = Step(
     name="explicit_instruction_enrichment",
@@ -84,11 +89,13 @@ def create_lesson_workflow(shared_state: dict) -> Workflow:
                 name="input_analyzer",
                 description="Parse teacher's request into structured fields",
                 executor=input_analyzer_step,
+                **LLM_STEP_POLICY,
             ),
             Step(
                 name="curriculum_matcher",
-                description="CAG: Match topic against all 240 content descriptors",
+                description="CAG: Match topic against the curriculum content descriptors",
                 executor=curriculum_matcher_step,
+                **LLM_STEP_POLICY,
             ),
             Router(
                 name="teaching_focus_router",
@@ -116,6 +123,7 @@ def create_lesson_workflow(shared_state: dict) -> Workflow:
                 name="resource_generator",
                 description="Generate the final lesson resource with streaming",
                 executor=resource_generator_step,
+                **LLM_STEP_POLICY,
             ),
         ],
         session_state=shared_state,
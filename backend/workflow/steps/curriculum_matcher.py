@@ -1,63 +1,343 @@
 """Step 2: CAG - Match topic against all content descriptors."""
 
+import asyncio
 import json
+import logging
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Callable, Union
 
 from agno.run import RunContext
+from agno.run.agent import RunCompletedEvent, RunContentEvent, RunErrorEvent
 from agno.workflow.step import StepInput, StepOutput
+from agno.workflow.types import StepProgress
+from sqlalchemy.exc import SQLAlchemyError
 
 from backend.config import settings
 from backend.db.session import SessionLocal
-from backend.services.cag_service import build_cag_prompt, load_all_descriptors, parse_cag_response
-from backend.workflow.agents import get_cag_matcher
+from backend.services import rag_prefetch
+from backend.services.cag_cache import CachedMatches, cag_cache
+from backend.services.cag_service import (
+    MatchStreamParser,
+    build_cag_prompt,
+    catalogue_lookup,
+    curriculum_hash,
+    parse_cag_response,
+    resolve_match,
+    resolve_matches,
+)
+from backend.services.curriculum_groups import (
+    CurriculumGroups,
+    build_group_prompt,
+    get_curriculum_groups,
+    parse_group_selection,
+)
+from backend.services.descriptor_embeddings import (
+    EmbeddingMatch,
+    embed_texts,
+    get_descriptor_embeddings,
+    to_matches,
+)
+from backend.services.descriptor_index import get_descriptor_index
+from backend.services.hedging import hedged_call
+from backend.services.metrics import metrics
+from backend.services.rate_governor import INTERACTIVE, estimate_call_tokens, governor, run_error
+from backend.services.token_budget import calibrate
+from backend.workflow.agents import get_cag_matcher, prompt_overhead_tokens, run_token_usage
 
+logger = logging.getLogger(__name__)
 
-def curriculum_matcher_step(step_input: StepInput, run_context: RunContext) -> StepOutput:
-    """Load ALL 240 content descriptors into LLM context and match semantically."""
+_DONE = object()
+
+
+@dataclass
+class StreamedMatches:
+    """Result of one streamed CAG call."""
+
+    content: str = ""
+    matches: list[dict] = field(default_factory=list)
+    metrics: object = None
+
+
+async def _stream_matches(
+    agent, prompt: str, lookup: dict[str, dict], on_match: Callable[[dict], None]
+) -> StreamedMatches:
+    """Run the CAG agent with streaming, reporting each match as it completes."""
+    parser = MatchStreamParser()
+    result = StreamedMatches()
+    chunks = []
+    async for event in agent.arun(prompt, stream=True, stream_events=True):
+        if isinstance(event, RunContentEvent) and isinstance(event.content, str):
+            chunks.append(event.content)
+            for raw in parser.feed(event.content):
+                match = resolve_match(raw, lookup)
+                if match is not None:
+                    result.matches.append(match)
+                    on_match(match)
+        elif isinstance(event, RunCompletedEvent):
+            result.metrics = event.metrics
+        elif isinstance(event, RunErrorEvent):
+            raise run_error(event.content)
+    result.content = "".join(chunks)
+    return result
+
+
+async def curriculum_matcher_step(
+    step_input: StepInput, run_context: RunContext
+) -> AsyncIterator[Union[StepProgress, StepOutput]]:
+    """Match the topic semantically against the content descriptors in LLM context.
+
+    With ``CAG_SHORTLIST_K`` set, only the BM25 shortlist of candidates is sent
+    rather than every descriptor. Above ``CAG_HIERARCHICAL_THRESHOLD``
+    descriptors, a first call picks the curriculum groups to shortlist from.
+    In ``hybrid`` mode the embedding top-k is sent instead, and a clear
+    embedding match skips the LLM altogether.
+
+    The response is streamed: each match is emitted as a progress event as
+    soon as its JSON object is complete, and the RAG search is started once
+    the matches it needs have arrived.
+    """
     state = run_context.session_state
     parsed = state["parsed_input"]
+    query = " ".join([parsed["topic"], *map(str, parsed.get("keywords") or [])])
+    agent = get_cag_matcher()
+    model = agent.model.id
 
-    db = SessionLocal()
+    version = None
+    if settings.CAG_CACHE_ENABLED:
+        version, cached = await asyncio.to_thread(_cached_matches, parsed, model)
+        if cached:
+            state["cag_matches"] = cached.matches
+            state["primary_descriptor_code"] = cached.matches[0]["code"]
+            _prefetch_rag(state, cached.matches)
+            yield StepOutput(content=json.dumps({"matches": cached.matches, "_cag_cache": cached.source}))
+            return
+
+    embedded = None
+    if settings.CAG_MATCH_MODE == "hybrid":
+        embedded = await asyncio.to_thread(_embedding_match, query, parsed)
+        if embedded and embedded.bypass:
+            metrics.incr("cag_embedding.bypassed")
+            matches = to_matches(embedded)
+            state["cag_matches"] = matches
+            state["primary_descriptor_code"] = matches[0]["code"]
+            _prefetch_rag(state, matches)
+            if version:
+                await asyncio.to_thread(_store_matches, parsed, version, model, matches)
+            yield StepOutput(content=json.dumps({"matches": matches, "_cag_bypass": True}))
+            return
+
+    lane = state.get("llm_lane", INTERACTIVE)
+    stage1 = None
+    if embedded:
+        # Only the embedding top-k goes into the prompt
+        descriptors = embedded.candidates
+    else:
+        db = SessionLocal()
+        try:
+            index = get_descriptor_index(db)
+            groups = None
+            if len(index.descriptors) > settings.CAG_HIERARCHICAL_THRESHOLD:
+                groups = get_curriculum_groups(db)
+        finally:
+            db.close()
+        descriptors = index.descriptors
+        within = None
+        if groups is not None:
+            # Stage 1: narrow the curriculum to a few (subject, year, strand) groups
+            stage1 = await _select_groups(agent, groups, parsed, query, lane)
+            if stage1.descriptors:
+                descriptors = stage1.descriptors
+                within = {d["code"] for d in descriptors}
+        k = settings.CAG_SHORTLIST_K
+        if k and len(descriptors) > k:
+            # Only the lexical shortlist goes into the prompt
+            descriptors = index.shortlist(
+                query, k, year_level=parsed.get("year_level"), strand=parsed.get("strand"), within=within
+            )
+    prompt = build_cag_prompt(
+        topic=parsed["topic"],
+        year_level=parsed["year_level"],
+        strand=parsed["strand"],
+        descriptors=descriptors,
+    )
+
+    lookup = catalogue_lookup(descriptors)
+    estimated = estimate_call_tokens(prompt, model, agent.model.max_tokens)
+
+    # Early matches come from whichever attempt (primary or hedge) streams first
+    queue: asyncio.Queue = asyncio.Queue()
+    attempts = {"started": 0, "owner": None}
+
+    def attempt():
+        attempts["started"] += 1
+        attempt_id = attempts["started"]
+
+        def on_match(match: dict) -> None:
+            if attempts["owner"] is None:
+                attempts["owner"] = attempt_id
+            if attempts["owner"] == attempt_id:
+                queue.put_nowait(match)
+
+        return _stream_matches(agent, prompt, lookup, on_match)
+
+    # The hedge duplicates only the provider call, once the governor has admitted it
+    task = asyncio.create_task(
+        governor.run(model, estimated, lambda: hedged_call("curriculum_matcher", attempt), lane=lane)
+    )
+    task.add_done_callback(lambda _: queue.put_nowait(_DONE))
+
+    early: list[dict] = []
     try:
-        descriptors = load_all_descriptors(db)
-        prompt = build_cag_prompt(
-            topic=parsed["topic"],
-            year_level=parsed["year_level"],
-            strand=parsed["strand"],
-            descriptors=descriptors,
-        )
+        while (match := await queue.get()) is not _DONE:
+            early.append(match)
+            if len(early) == 1:
+                metrics.incr("cag_stream.early_emits")
+            if len(early) == rag_prefetch.RAG_QUERY_MATCHES:
+                _prefetch_rag(state, early)
+            yield StepProgress(data={"cag_partial_matches": list(early)})
+    finally:
+        # The client went away mid-stream
+        if not task.done():
+            task.cancel()
+
+    response, governor_wait_ms = task.result()
+    matches = response.matches or resolve_matches(parse_cag_response(response.content), descriptors)
+
+    if embedded and matches:
+        metrics.incr("cag_embedding.llm_compared")
+        if embedded.candidates[0]["code"] == matches[0].get("code"):
+            metrics.incr("cag_embedding.llm_agree")
+
+    # Extract token usage metrics
+    token_usage = run_token_usage("curriculum_matcher", response.metrics, model)
+    if token_usage:
+        calibrate(prompt, token_usage["input_tokens"], overhead=prompt_overhead_tokens(agent))
+    if stage1 and stage1.token_usage:
+        token_usage = _merge_usage(token_usage, stage1.token_usage)
+
+    if matches and version:
+        await asyncio.to_thread(_store_matches, parsed, version, model, matches)
 
-        agent = get_cag_matcher()
-        response = agent.run(prompt)
-        matches = parse_cag_response(response.content)
-
-        # Extract token usage metrics
-        token_usage = None
-        if response.metrics:
-            token_usage = {
-                "input_tokens": response.metrics.input_tokens or 0,
-                "output_tokens": response.metrics.output_tokens or 0,
-                "total_tokens": response.metrics.total_tokens or 0,
-                "model": settings.OPENAI_MODEL_FAST,
+    # Ensure we have at least one match
+    if not matches:
+        matches = [
+            {
+                "code": descriptors[0]["code"],
+                "text": descriptors[0]["text"],
+                "year_level": descriptors[0]["year_level_code"],
+                "strand": descriptors[0]["strand_title"],
+                "confidence": "low",
+                "reason": "Fallback match - no strong matches found",
             }
+        ]
 
-        # Ensure we have at least one match
-        if not matches:
-            matches = [
-                {
-                    "code": descriptors[0]["code"],
-                    "text": descriptors[0]["text"],
-                    "year_level": descriptors[0]["year_level_code"],
-                    "strand": descriptors[0]["strand_title"],
-                    "confidence": "low",
-                    "reason": "Fallback match - no strong matches found",
-                }
-            ]
-
-        state["cag_matches"] = matches
-        state["primary_descriptor_code"] = matches[0]["code"]
-        output = {"matches": matches}
-        if token_usage:
-            output["_token_usage"] = token_usage
-        return StepOutput(content=json.dumps(output))
+    state["cag_matches"] = matches
+    state["primary_descriptor_code"] = matches[0]["code"]
+    output = {"matches": matches}
+    if token_usage:
+        output["_token_usage"] = token_usage
+    output["_timings"] = {"governor_wait_ms": governor_wait_ms}
+    if stage1:
+        output["_timings"]["stage1_ms"] = stage1.elapsed_ms
+        output["_timings"]["governor_wait_ms"] += stage1.governor_wait_ms
+    yield StepOutput(content=json.dumps(output))
+
+
+@dataclass
+class GroupSelection:
+    """Outcome of the stage 1 (group selection) call."""
+
+    descriptors: list[dict] = field(default_factory=list)  # empty: fall back to the whole curriculum
+    token_usage: dict | None = None
+    elapsed_ms: int = 0
+    governor_wait_ms: int = 0
+
+
+async def _select_groups(agent, groups: CurriculumGroups, parsed: dict, query: str, lane: str) -> GroupSelection:
+    """Ask the matcher which curriculum groups the topic belongs to."""
+    start = time.perf_counter()
+    offered = groups.shortlist(
+        query, settings.CAG_STAGE1_GROUPS, year_level=parsed.get("year_level"), strand=parsed.get("strand")
+    )
+    prompt = build_group_prompt(
+        parsed["topic"], parsed["year_level"], parsed["strand"], offered, settings.CAG_STAGE1_PICKS
+    )
+    model = agent.model.id
+    selection = GroupSelection()
+    try:
+        estimated = estimate_call_tokens(prompt, model, agent.model.max_tokens)
+        response, selection.governor_wait_ms = await governor.run(
+            model, estimated, lambda: agent.arun(prompt), lane=lane
+        )
+    except Exception:
+        logger.warning("Stage 1 group selection failed; matching against the whole curriculum", exc_info=True)
+        metrics.incr("cag_hierarchical.fallbacks")
+    else:
+        selection.token_usage = run_token_usage("curriculum_matcher_stage1", response.metrics, model)
+        picks = parse_group_selection(str(response.content or ""), offered, settings.CAG_STAGE1_PICKS)
+        selection.descriptors = groups.descriptors_in(picks)
+        metrics.incr("cag_hierarchical.requests")
+        if not selection.descriptors:
+            metrics.incr("cag_hierarchical.fallbacks")
+    selection.elapsed_ms = int((time.perf_counter() - start) * 1000)
+    return selection
+
+
+def _merge_usage(usage: dict | None, extra: dict) -> dict:
+    if not usage:
+        return dict(extra)
+    merged = dict(usage)
+    for key in ("input_tokens", "output_tokens", "total_tokens", "cached_tokens"):
+        merged[key] = merged.get(key, 0) + extra.get(key, 0)
+    return merged
+
+
+def _cached_matches(parsed: dict, model: str) -> tuple[str | None, CachedMatches | None]:
+    """(curriculum version, cached matches) for the request; no version if the DB is unreachable."""
+    db = SessionLocal()
+    try:
+        version = curriculum_hash(db)
+    except SQLAlchemyError:
+        logger.warning("Could not read the curriculum hash; skipping the CAG cache", exc_info=True)
+        return None, None
+    finally:
+        db.close()
+    cached = cag_cache.get(parsed["topic"], parsed.get("year_level", ""), parsed.get("strand", ""), version, model)
+    return version, cached if cached and cached.matches else None
+
+
+def _store_matches(parsed: dict, version: str, model: str, matches: list[dict]) -> None:
+    cag_cache.put(parsed["topic"], parsed.get("year_level", ""), parsed.get("strand", ""), version, model, matches)
+
+
+def _embedding_match(query: str, parsed: dict) -> EmbeddingMatch | None:
+    """Embedding top-k for the request, or ``None`` if embeddings are unavailable."""
+    start = time.perf_counter()
+    db = SessionLocal()
+    try:
+        embeddings = get_descriptor_embeddings(db)
+        result = embeddings.match(
+            embed_texts([query])[0],
+            settings.CAG_EMBEDDING_TOP_K,
+            year_level=parsed.get("year_level"),
+            strand=parsed.get("strand"),
+        )
+    except Exception:
+        logger.warning("Embedding match failed; using the LLM matcher", exc_info=True)
+        return None
     finally:
         db.close()
+    metrics.incr("cag_embedding.requests")
+    metrics.observe("cag_embedding.match_ms", (time.perf_counter() - start) * 1000)
+    return result
+
+
+def _prefetch_rag(state: dict, matches: list[dict]) -> None:
+    """Start the pedagogy search; the teaching path is the requested focus."""
+    if not state.get("generation_id"):
+        return
+    parsed, focus = state["parsed_input"], state["params"]["teaching_focus"]
+    query = rag_prefetch.build_rag_queries(parsed, matches, focus)
+    scope = rag_prefetch.build_rag_scope(parsed, matches, focus)
+    rag_prefetch.prefetch(state["generation_id"], query, state["params"].get("rag_mode"), scope)
@@ -1,19 +1,61 @@
-"""Step 1: Parse teacher's free-text request using an LLM agent."""
+"""Step 1: Parse teacher's request, locally when possible, else with an LLM agent."""
 
+import asyncio
 import json
+import logging
+import random
 
 from agno.run import RunContext
 from agno.workflow.step import StepInput, StepOutput
+from sqlalchemy.exc import SQLAlchemyError
 
 from backend.config import settings
-from backend.workflow.agents import get_input_analyzer
+from backend.services.hedging import hedged_call
+from backend.services.input_analysis import FastPathResult, analyze, load_vocabulary, record_agreement
+from backend.services.metrics import metrics
+from backend.services.rate_governor import BATCH, INTERACTIVE, estimate_call_tokens, governor, raise_for_run_error
+from backend.workflow.agents import get_input_analyzer, run_token_usage
 
+logger = logging.getLogger(__name__)
 
-def input_analyzer_step(step_input: StepInput, run_context: RunContext) -> StepOutput:
+# Shadow LLM comparisons in flight (kept referenced until done)
+_shadow_tasks: set[asyncio.Task] = set()
+
+
+async def input_analyzer_step(step_input: StepInput, run_context: RunContext) -> StepOutput:
     """Parse the teacher's request into structured fields."""
     state = run_context.session_state
     params = state["params"]
 
+    if settings.INPUT_FASTPATH_ENABLED:
+        metrics.incr("input_fastpath.requests")
+        try:
+            result = analyze(params, await asyncio.to_thread(load_vocabulary))
+        except SQLAlchemyError:
+            logger.warning("Could not load the topic vocabulary; asking the LLM", exc_info=True)
+            result = FastPathResult(None, "error")
+        if result.parsed is not None:
+            metrics.incr("input_fastpath.hits")
+            if random.random() < settings.INPUT_FASTPATH_SHADOW_RATE:
+                task = asyncio.create_task(_shadow_compare(params, result.parsed))
+                _shadow_tasks.add(task)
+                task.add_done_callback(_shadow_tasks.discard)
+            state["parsed_input"] = result.parsed
+            return StepOutput(content=json.dumps({**result.parsed, "_fast_path": True}))
+        metrics.incr(f"input_fastpath.fallback.{result.reason}")
+
+    parsed, token_usage, governor_wait_ms = await _llm_analyze(params, state.get("llm_lane", INTERACTIVE))
+
+    state["parsed_input"] = parsed
+    output = dict(parsed)
+    if token_usage:
+        output["_token_usage"] = token_usage
+    output["_timings"] = {"governor_wait_ms": governor_wait_ms}
+    return StepOutput(content=json.dumps(output))
+
+
+async def _llm_analyze(params: dict, lane: str) -> tuple[dict, dict | None, int]:
+    """Ask the input analyzer agent. Returns (parsed, token usage, governor wait ms)."""
     prompt = f"""Parse this teacher's resource request:
 
 Topic: {params["topic"]}
@@ -33,18 +75,26 @@ Return a JSON object with:
 Return ONLY valid JSON."""
 
     agent = get_input_analyzer()
-    response = agent.run(prompt)
+    model = agent.model.id
+    estimated = estimate_call_tokens(prompt, model, agent.model.max_tokens)
+
+    async def call():
+        response = await agent.arun(prompt)
+        raise_for_run_error(response)
+        return response
+
+    # Only the provider round trip is hedged, after the governor has admitted
+    # the call; shadow comparisons on the batch lane are never hedged
+    response, governor_wait_ms = await governor.run(
+        model,
+        estimated,
+        (lambda: hedged_call("input_analyzer", call)) if lane == INTERACTIVE else call,
+        lane=lane,
+    )
     content = response.content
 
     # Extract token usage metrics
-    token_usage = None
-    if response.metrics:
-        token_usage = {
-            "input_tokens": response.metrics.input_tokens or 0,
-            "output_tokens": response.metrics.output_tokens or 0,
-            "total_tokens": response.metrics.total_tokens or 0,
-            "model": settings.OPENAI_MODEL_FAST,
-        }
+    token_usage = run_token_usage("input_analyzer", response.metrics, model)
 
     # Parse the JSON response
     try:
@@ -63,9 +113,14 @@ Return ONLY valid JSON."""
             "intent": "instruction",
             "keywords": [params["topic"]],
         }
+    return parsed, token_usage, governor_wait_ms
 
-    state["parsed_input"] = parsed
-    output = dict(parsed)
-    if token_usage:
-        output["_token_usage"] = token_usage
-    return StepOutput(content=json.dumps(output))
+
+async def _shadow_compare(params: dict, fast: dict) -> None:
+    """Run the LLM path off the request path and record agreement with the fast path."""
+    try:
+        llm, _, _ = await _llm_analyze(params, BATCH)
+    except Exception:
+        logger.debug("Shadow input analysis failed", exc_info=True)
+        return
+    record_agreement(fast, llm)
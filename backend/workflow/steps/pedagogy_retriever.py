@@ -5,7 +5,7 @@ import json
 from agno.run import RunContext
 from agno.workflow.step import StepInput, StepOutput
 
-from backend.knowledge.pedagogy_kb import get_knowledge_base
+from backend.services import rag_prefetch
 
 
 def pedagogy_retriever_step(step_input: StepInput, run_context: RunContext) -> StepOutput:
@@ -15,19 +15,16 @@ def pedagogy_retriever_step(step_input: StepInput, run_context: RunContext) -> S
     routing = state["routing_decision"]
     cag_matches = state.get("cag_matches", [])
 
-    # Build semantic query from matched descriptors + teaching focus + year level
-    match_texts = [m.get("text", "") for m in cag_matches[:3]]
-    query = (
-        f"{parsed['topic']} {parsed.get('strand', '')} "
-        f"{' '.join(match_texts)} "
-        f"{routing['teaching_path']} {parsed.get('year_level', '')}"
-    )
+    # Build semantic query from matched descriptors + teaching focus + year level,
+    # searched only among chunks for those descriptors, nearby years and that focus
+    query = rag_prefetch.build_rag_queries(parsed, cag_matches, routing["teaching_path"])
+    scope = rag_prefetch.build_rag_scope(parsed, cag_matches, routing["teaching_path"])
 
-    try:
-        kb = get_knowledge_base()
-        results = kb.search(query, max_results=5)
-    except Exception:
-        results = []
+    # The curriculum matcher may already have started this search
+    mode = state["params"].get("rag_mode")
+    results = rag_prefetch.take(state.get("generation_id", ""), query, mode, scope)
+    if results is None:
+        results = rag_prefetch.search_pedagogy(query, max_results=5, mode=mode, scope=scope)
 
     rag_results = []
     rag_context_parts = []
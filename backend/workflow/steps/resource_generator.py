@@ -1,69 +1,86 @@
 """Step 6: Generate the lesson resource with streaming output."""
 
 import json
+import time
+import uuid
 from typing import AsyncIterator, Union
 
 from agno.run import RunContext
+from agno.run.agent import RunErrorEvent
 from agno.run.workflow import WorkflowRunOutputEvent
 from agno.workflow.step import StepInput, StepOutput
 
-from backend.config import settings
-from backend.workflow.agents import get_resource_generator
+from backend.services.metrics import metrics
+from backend.services.rate_governor import (
+    INTERACTIVE,
+    estimate_call_tokens,
+    governor,
+    run_error,
+    track_provider_errors,
+)
+from backend.services.token_budget import calibrate
+from backend.workflow.agents import get_resource_generator, prompt_overhead_tokens, run_token_usage
 
 
 async def resource_generator_step(
     step_input: StepInput, run_context: RunContext
 ) -> AsyncIterator[Union[WorkflowRunOutputEvent, StepOutput]]:
-    """Generate the final resource using GPT-4o with streaming."""
+    """Generate the final resource with the routed generation model, streaming."""
     state = run_context.session_state
     resolved_prompt = state.get("resolved_prompt", "Generate a mathematics resource.")
 
-    agent = get_resource_generator()
+    # The agent is shared across generations, so each call gets its own session
+    agent = get_resource_generator(
+        resource_type=state["params"].get("resource_type"),
+        year_band=state.get("year_band"),
+    )
+    session_id = str(uuid.uuid4())
+
+    # Wait for TPM/RPM headroom before opening the stream
+    model = agent.model.id
+    reservation = await governor.acquire(
+        model,
+        estimate_call_tokens(resolved_prompt, model, agent.model.max_tokens),
+        state.get("llm_lane", INTERACTIVE),
+    )
 
     # Stream the agent response
-    response_iter = agent.arun(resolved_prompt, stream=True, stream_events=True)
+    start = time.perf_counter()
+    track_provider_errors()
+    response_iter = agent.arun(resolved_prompt, stream=True, stream_events=True, session_id=session_id)
     full_content = []
     token_usage = None
 
     async for event in response_iter:
+        # A provider error (e.g. 429) fails the step, so the client gets an error event
+        if isinstance(event, RunErrorEvent):
+            raise run_error(event.content)
         yield event
         # Collect content for storage
         if hasattr(event, "content") and event.content:
             full_content.append(event.content)
         # Capture metrics from RunCompletedEvent (carries .metrics after streaming)
         if hasattr(event, "metrics") and event.metrics and not token_usage:
-            m = event.metrics
-            if m.input_tokens or m.output_tokens:
-                token_usage = {
-                    "input_tokens": m.input_tokens or 0,
-                    "output_tokens": m.output_tokens or 0,
-                    "total_tokens": m.total_tokens or 0,
-                    "model": settings.OPENAI_MODEL_GENERATION,
-                }
+            token_usage = run_token_usage("resource_generator", event.metrics, model)
+
+    # Observed latency feeds the router's load level
+    metrics.observe("llm_latency.resource_generator", (time.perf_counter() - start) * 1000)
 
-    # Fallback: try run output or session metrics
+    # Fallback: this call's run output
     if not token_usage:
-        response = agent.get_last_run_output()
-        if response and response.metrics:
-            token_usage = {
-                "input_tokens": response.metrics.input_tokens or 0,
-                "output_tokens": response.metrics.output_tokens or 0,
-                "total_tokens": response.metrics.total_tokens or 0,
-                "model": settings.OPENAI_MODEL_GENERATION,
-            }
-    if not token_usage and hasattr(agent, "session") and agent.session:
-        m = getattr(agent.session, "session_metrics", None)
-        if m and (m.input_tokens or m.output_tokens):
-            token_usage = {
-                "input_tokens": m.input_tokens or 0,
-                "output_tokens": m.output_tokens or 0,
-                "total_tokens": m.total_tokens or 0,
-                "model": settings.OPENAI_MODEL_GENERATION,
-            }
+        response = agent.get_last_run_output(session_id=session_id)
+        if response:
+            token_usage = run_token_usage("resource_generator", response.metrics, model)
+
+    await governor.settle(reservation, token_usage["total_tokens"] if token_usage else None)
+    if token_usage:
+        calibrate(resolved_prompt, token_usage["input_tokens"], overhead=prompt_overhead_tokens(agent))
 
     final_content = "".join(full_content)
     state["generated_resource"] = final_content
     yield StepOutput(content=final_content)
-    # Emit token usage as a separate small event after the content
-    if token_usage:
-        yield StepOutput(content=json.dumps({"_generator_token_usage": token_usage}))
+    # Emit token usage and governor wait as a separate small event after the content
+    yield StepOutput(content=json.dumps({
+        "_generator_token_usage": token_usage,
+        "_timings": {"governor_wait_ms": reservation.wait_ms},
+    }))
@@ -4,7 +4,7 @@ from agno.run import RunContext
 from agno.workflow.step import StepInput, StepOutput
 
 from backend.db.session import SessionLocal
-from backend.db.models import YearLevel
+from backend.services.curriculum_graph import CurriculumGraph, get_curriculum_graph
 
 
 TEACHING_FOCUS_NOTES = {
@@ -60,6 +60,21 @@ YEAR_BAND_NOTES = {
 }
 
 
+def progression_for(graph: CurriculumGraph, code: str) -> dict:
+    """Codes of the descriptors before and after ``code`` in its learning progression."""
+    return {"prior": [p.code for p in graph.prior(code)], "next": [p.code for p in graph.next(code)]}
+
+
+def progression_notes(graph: CurriculumGraph, progression: dict) -> str:
+    lines = ["LEARNING PROGRESSION:"]
+    for label, codes in (("Builds on", progression["prior"]), ("Leads to", progression["next"])):
+        for code in codes:
+            d = graph.descriptor(code)
+            if d:
+                lines.append(f"- {label} {code} ({d['year_level_code']}): {d['text']}")
+    return "\n".join(lines)
+
+
 def teaching_router_step(step_input: StepInput, run_context: RunContext) -> StepOutput:
     """Route processing based on teaching focus and year band."""
     state = run_context.session_state
@@ -69,40 +84,34 @@ def teaching_router_step(step_input: StepInput, run_context: RunContext) -> Step
     teaching_focus = params["teaching_focus"]
     year_level_title = parsed.get("year_level", params.get("year_level", "Year 5"))
 
-    # Determine year band from DB
+    # Determine year band from the curriculum graph
     db = SessionLocal()
     try:
-        yl = db.query(YearLevel).filter(
-            YearLevel.title == year_level_title
-        ).first()
-        if not yl:
-            # Try matching by code
-            code_map = {
-                "Foundation Year": "MATMATFY",
-                "Year 1": "MATMATY1", "Year 2": "MATMATY2",
-                "Year 3": "MATMATY3", "Year 4": "MATMATY4",
-                "Year 5": "MATMATY5", "Year 6": "MATMATY6",
-                "Year 7": "MATMATY7", "Year 8": "MATMATY8",
-                "Year 9": "MATMATY9", "Year 10": "MATMATY10",
-            }
-            code = code_map.get(year_level_title)
-            if code:
-                yl = db.query(YearLevel).filter_by(code=code).first()
-
-        year_band = yl.band if yl else "primary"
-        year_level_code = yl.code if yl else "MATMATY5"
+        graph = get_curriculum_graph(db)
     finally:
         db.close()
+    primary_code = state.get("primary_descriptor_code")
+    primary = graph.descriptor(primary_code) if primary_code else None
+    yl = graph.year_level(year_level_title, subject_code=primary.get("subject_code") if primary else None)
+
+    year_band = yl.band if yl else "primary"
+    year_level_code = yl.code if yl else "MATMATY5"
 
     # Get teaching focus and year band specific notes
     focus_notes = TEACHING_FOCUS_NOTES.get(teaching_focus, TEACHING_FOCUS_NOTES["explicit_instruction"])
     band_notes = YEAR_BAND_NOTES.get(year_band, YEAR_BAND_NOTES["primary"])
 
+    pedagogy_notes = f"{focus_notes}\n\n{band_notes}"
+    progression = progression_for(graph, primary_code) if primary_code else {"prior": [], "next": []}
+    if teaching_focus == "planning" and (progression["prior"] or progression["next"]):
+        pedagogy_notes += "\n\n" + progression_notes(graph, progression)
+
     routing_decision = {
         "teaching_path": teaching_focus,
         "year_band": year_band,
         "year_level_code": year_level_code,
-        "pedagogy_notes": f"{focus_notes}\n\n{band_notes}",
+        "pedagogy_notes": pedagogy_notes,
+        "progression": progression,
     }
 
     state["routing_decision"] = routing_decision
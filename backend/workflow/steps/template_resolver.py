@@ -5,8 +5,10 @@ import json
 from agno.run import RunContext
 from agno.workflow.step import StepInput, StepOutput
 
+from backend.config import settings
 from backend.db.session import SessionLocal
 from backend.services.template_service import resolve_template, select_template
+from backend.services.token_budget import TokenBudget, count_tokens
 
 
 def template_resolver_step(step_input: StepInput, run_context: RunContext) -> StepOutput:
@@ -30,6 +32,10 @@ def template_resolver_step(step_input: StepInput, run_context: RunContext) -> St
             state["template_variables"] = {}
             return StepOutput(content=json.dumps({"name": "none", "error": "No template found"}))
 
+        pedagogy_notes = routing.get("pedagogy_notes", "")
+        limit = settings.PROMPT_TOKEN_BUDGETS.get(template.name, settings.PROMPT_TOKEN_BUDGET)
+        budget = TokenBudget(limit=limit, reserved=count_tokens(pedagogy_notes)) if limit else None
+
         resolved_prompt, variables = resolve_template(
             db=db,
             template=template,
@@ -39,13 +45,10 @@ def template_resolver_step(step_input: StepInput, run_context: RunContext) -> St
             teaching_focus_slug=params["teaching_focus"],
             rag_context=state.get("rag_context", ""),
             additional_context=params.get("additional_context", ""),
+            budget=budget,
+            guidance=pedagogy_notes,
         )
 
-        # Prepend routing pedagogy notes
-        pedagogy_notes = routing.get("pedagogy_notes", "")
-        if pedagogy_notes:
-            resolved_prompt = f"**Pedagogical Guidance:**\n{pedagogy_notes}\n\n{resolved_prompt}"
-
         state["resolved_prompt"] = resolved_prompt
         state["selected_template"] = template.name
         state["template_variables"] = {k: v[:100] for k, v in variables.items()}
@@ -56,6 +59,8 @@ def template_resolver_step(step_input: StepInput, run_context: RunContext) -> St
                 "priority": template.priority,
                 "variables_resolved": len(variables),
                 "resolved_prompt": resolved_prompt[:5000],
+                "prompt_tokens": count_tokens(resolved_prompt),
+                "token_budget": budget.summary() if budget else None,
             })
         )
     finally:
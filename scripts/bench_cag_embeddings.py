@@ -0,0 +1,80 @@
+"""Accuracy, bypass rate and latency of embedding-based CAG matching.
+
+Replays logged generations (whose matches came from the LLM) and, for a
+range of bypass margins, reports how often hybrid mode would skip the LLM
+and how often its top match agrees with the LLM's.
+
+Usage: python -m scripts.bench_cag_embeddings [--margins 0.02,0.04,0.06,0.08] [--limit 200]
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from backend.config import settings
+from backend.db.models import GenerationLog
+from backend.db.session import SessionLocal
+from backend.services.descriptor_embeddings import embed_texts, get_descriptor_embeddings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--margins", default="0.02,0.04,0.06,0.08")
+    parser.add_argument("--limit", type=int, default=200)
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        embeddings = get_descriptor_embeddings(db)
+        logs = (
+            db.query(GenerationLog)
+            .filter(GenerationLog.matched_descriptors.isnot(None))
+            .order_by(GenerationLog.created_at.desc())
+            .limit(args.limit)
+            .all()
+        )
+    finally:
+        db.close()
+
+    cases = []
+    for log in logs:
+        payload = log.request_payload or {}
+        codes = [m.get("code") for m in log.matched_descriptors or [] if m.get("code")]
+        if payload.get("topic") and codes:
+            cases.append((payload, codes))
+    if not cases:
+        print("No logged generations with matches to replay.")
+        return
+
+    start = time.perf_counter()
+    vectors = embed_texts([payload["topic"] for payload, _ in cases])
+    embed_ms = (time.perf_counter() - start) * 1000 / len(cases)
+
+    results = []
+    start = time.perf_counter()
+    for (payload, codes), vector in zip(cases, vectors):
+        result = embeddings.match(vector, settings.CAG_EMBEDDING_TOP_K, payload.get("year_level"), payload.get("strand"))
+        results.append((result, codes))
+    score_ms = (time.perf_counter() - start) * 1000 / len(cases)
+
+    recall = np.mean([len({d["code"] for d in r.candidates} & set(c)) / len(c) for r, c in results])
+    print(f"{len(cases)} generations, {embeddings.matrix.shape[0]} descriptors x {embeddings.matrix.shape[1]} dims")
+    print(f"query embedding {embed_ms:.1f} ms/request, top-k scoring {score_ms:.3f} ms/request")
+    print(f"top-{settings.CAG_EMBEDDING_TOP_K} recall of LLM matches: {recall:.1%}\n")
+    print(f"{'margin':>7} {'bypass':>8} {'top-1 = LLM top-1':>18} {'top-1 in LLM set':>17}")
+    for margin in (float(m) for m in args.margins.split(",")):
+        bypassed = [
+            (r, c) for r, c in results
+            if r.scores[0] >= settings.CAG_BYPASS_MIN_SCORE and r.margin >= margin
+        ]
+        if not bypassed:
+            print(f"{margin:>7.2f} {0:>8.1%} {'-':>18} {'-':>17}")
+            continue
+        exact = np.mean([r.candidates[0]["code"] == c[0] for r, c in bypassed])
+        in_set = np.mean([r.candidates[0]["code"] in c for r, c in bypassed])
+        print(f"{margin:>7.2f} {len(bypassed) / len(results):>8.1%} {exact:>18.1%} {in_set:>17.1%}")
+
+
+if __name__ == "__main__":
+    main()
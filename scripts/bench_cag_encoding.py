@@ -0,0 +1,82 @@
+"""Compare the compact and verbose CAG prompt encodings.
+
+Reports estimated prompt tokens for both encodings over the full catalogue.
+With ``--live N`` it also sends the N most recent logged topics to the
+matcher model with each prompt and reports how often the two agree.
+
+Usage: python -m scripts.bench_cag_encoding [--live 20]
+"""
+
+import argparse
+
+from backend.db.models import GenerationLog
+from backend.db.session import SessionLocal
+from backend.services.cag_service import (
+    build_cag_prompt,
+    load_all_descriptors,
+    parse_cag_response,
+    resolve_matches,
+)
+from backend.services.token_budget import count_tokens
+from backend.workflow.agents import get_cag_matcher
+
+
+def _codes(agent, prompt: str, descriptors: list[dict]) -> tuple[list[str], int, int]:
+    response = agent.run(prompt)
+    matches = resolve_matches(parse_cag_response(response.content or ""), descriptors)
+    m = response.metrics
+    return [match["code"] for match in matches], (m.input_tokens or 0) if m else 0, (m.output_tokens or 0) if m else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--live", type=int, default=0, help="logged topics to match with both prompts")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        descriptors = load_all_descriptors(db)
+        logs = []
+        if args.live:
+            logs = (
+                db.query(GenerationLog)
+                .order_by(GenerationLog.created_at.desc())
+                .limit(args.live)
+                .all()
+            )
+    finally:
+        db.close()
+
+    verbose = count_tokens(build_cag_prompt("", "", "", descriptors, compact=False))
+    compact = count_tokens(build_cag_prompt("", "", "", descriptors, compact=True))
+    print(f"{len(descriptors)} descriptors")
+    print(f"verbose prompt ~{verbose} tokens, compact prompt ~{compact} tokens ({1 - compact / verbose:.1%} smaller)")
+
+    if not logs:
+        return
+    agent = get_cag_matcher()
+    top1 = overlap = 0
+    totals = {"verbose": [0, 0], "compact": [0, 0]}
+    cases = [(log.request_payload or {}) for log in logs]
+    cases = [p for p in cases if p.get("topic")]
+    for payload in cases:
+        args_ = (payload["topic"], payload.get("year_level", ""), payload.get("strand", ""), descriptors)
+        v_codes, v_in, v_out = _codes(agent, build_cag_prompt(*args_, compact=False), descriptors)
+        c_codes, c_in, c_out = _codes(agent, build_cag_prompt(*args_, compact=True), descriptors)
+        totals["verbose"][0] += v_in
+        totals["verbose"][1] += v_out
+        totals["compact"][0] += c_in
+        totals["compact"][1] += c_out
+        top1 += bool(v_codes and c_codes and v_codes[0] == c_codes[0])
+        union = set(v_codes) | set(c_codes)
+        overlap += len(set(v_codes) & set(c_codes)) / len(union) if union else 1.0
+
+    n = len(cases)
+    print(f"\n{n} live topics")
+    for name, (tokens_in, tokens_out) in totals.items():
+        print(f"  {name:>8}: {tokens_in / n:.0f} input / {tokens_out / n:.0f} output tokens per call")
+    print(f"  top-1 agreement {top1 / n:.1%}, mean match-set Jaccard {overlap / n:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""Recall benchmark for the BM25 CAG shortlist.
+
+Replays the topics of logged generations. The reference matches come from
+the matcher model run against the full catalogue, not from the logged
+matches, which were already limited to whatever shortlist was on at the
+time. For each K it reports how many reference matches survive the
+shortlist built for that request, and the mean prompt tokens of those
+per-request shortlist prompts against the full prompt. Needs
+``OPENAI_API_KEY``; one matcher call per topic.
+
+Usage: python -m scripts.bench_cag_shortlist [--k 20,40,60] [--limit 100]
+"""
+
+import argparse
+import statistics
+
+from backend.db.models import GenerationLog
+from backend.db.session import SessionLocal
+from backend.services.cag_service import build_cag_prompt, parse_cag_response, resolve_matches
+from backend.services.descriptor_index import build_index
+from backend.services.token_budget import count_tokens
+from backend.workflow.agents import get_cag_matcher
+
+
+def full_catalogue_codes(agent, payload: dict, descriptors: list[dict]) -> list[str]:
+    """Codes the matcher picks for ``payload`` with every descriptor in the prompt."""
+    prompt = build_cag_prompt(payload["topic"], payload.get("year_level", ""), payload.get("strand", ""), descriptors)
+    response = agent.run(prompt)
+    return [m["code"] for m in resolve_matches(parse_cag_response(response.content or ""), descriptors)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--k", default="20,40,60", help="comma-separated shortlist sizes")
+    parser.add_argument("--limit", type=int, default=100, help="most recent generations to replay")
+    args = parser.parse_args()
+    ks = [int(k) for k in args.k.split(",")]
+
+    db = SessionLocal()
+    try:
+        index = build_index(db)
+        logs = db.query(GenerationLog).order_by(GenerationLog.created_at.desc()).limit(args.limit).all()
+    finally:
+        db.close()
+
+    agent = get_cag_matcher()
+    cases = []
+    for payload in (log.request_payload or {} for log in logs):
+        if payload.get("topic"):
+            codes = full_catalogue_codes(agent, payload, index.descriptors)
+            if codes:
+                cases.append((payload, codes))
+    if not cases:
+        print("No logged topics with full-catalogue matches to replay.")
+        return
+
+    full_tokens = count_tokens(build_cag_prompt("", "", "", index.descriptors))
+    print(f"{len(cases)} topics, {len(index.descriptors)} descriptors, full prompt ~{full_tokens} tokens\n")
+    print(f"{'K':>4} {'recall':>8} {'all kept':>9} {'top-1 kept':>11} {'prompt tokens':>14}")
+    for k in ks:
+        kept = total = all_kept = top_kept = 0
+        tokens = []
+        for payload, codes in cases:
+            shortlist = index.shortlist(payload["topic"], k, payload.get("year_level"), payload.get("strand"))
+            candidates = {d["code"] for d in shortlist}
+            hits = sum(code in candidates for code in codes)
+            kept += hits
+            total += len(codes)
+            all_kept += hits == len(codes)
+            top_kept += codes[0] in candidates
+            tokens.append(count_tokens(build_cag_prompt(payload["topic"], "", "", shortlist)))
+        print(
+            f"{k:>4} {kept / total:>8.1%} {all_kept / len(cases):>9.1%} "
+            f"{top_kept / len(cases):>11.1%} {statistics.mean(tokens):>14.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
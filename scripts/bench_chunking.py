@@ -0,0 +1,113 @@
+"""Prompt tokens and retrieval quality of pedagogy chunking strategies.
+
+Chunks the guides in ``data/pedagogy/`` with agno's default markdown reader
+(what seeding used before) and with the heading-aware chunker at a few
+token windows, embeds the chunks and a set of labelled teaching questions,
+and ranks in memory by cosine similarity, so no database is needed. For
+each strategy it reports the chunk count and size, hit@k (a top-k chunk
+contains the passage the question is about), MRR, and the tokens the top k
+would add to a prompt as ``rag_context``. The default reader makes one chunk
+per guide, so its hit@5 is trivially complete; compare MRR and context
+tokens. Needs ``OPENAI_API_KEY``.
+
+Usage: python -m scripts.bench_chunking [--k 5] [--windows 120,200,300]
+       [--overlap 30]
+"""
+
+import argparse
+import statistics
+
+import numpy as np
+from agno.knowledge.reader.markdown_reader import MarkdownReader
+
+from backend.knowledge.kb_sync import embed_batches, openai_batch_embedder
+from backend.knowledge.markdown_chunker import chunk_markdown
+from backend.knowledge.pedagogy_kb import build_vector_db
+from backend.services.token_budget import count_tokens
+from scripts.seed_knowledge import DATA_DIR
+
+# (question, passage a relevant chunk contains)
+QUESTIONS = [
+    ("How can I check understanding at the end of a lesson?", "Exit tickets are rapid end-of-lesson checks"),
+    ("Which misconceptions do students have about comparing decimals?", "1.25 > 1.3"),
+    ("How should feedback on a maths task be worded?", "Points forward"),
+    ("Support for students who cannot start the task", "Simplify the numbers"),
+    ("Challenge questions for students who finish early", "Can you write a rule that always works?"),
+    ("Tasks that every student can start but that stretch the strongest", "Low Floor, High Ceiling"),
+    ("Teacher modelling with a think-aloud", "Think-aloud strategy"),
+    ("How to run guided practice with mini-whiteboards", "mini-whiteboards"),
+    ("Why interleave different problem types?", "**Interleaving**"),
+    ("A visible thinking routine that starts from an image", "See-Think-Wonder"),
+    ("Questions that push students to justify their reasoning", "Socratic"),
+    ("What does fluency look like in the classroom?", "Calculate answers efficiently"),
+    ("What reasoning should Year 7 to 10 students show?", "Years 7-10"),
+    ("Proficiencies in the early years of school", "Foundation to Year 2"),
+    ("How to group students for differentiation", "Groups should be fluid"),
+]
+
+
+def default_chunks() -> list[str]:
+    reader = MarkdownReader()
+    return [doc.content for path in sorted((DATA_DIR / "pedagogy").glob("*.md")) for doc in reader.read(path)]
+
+
+def heading_chunks(max_tokens: int, overlap: int) -> list[str]:
+    return [
+        chunk.content
+        for path in sorted((DATA_DIR / "pedagogy").glob("*.md"))
+        for chunk in chunk_markdown(path.read_text(encoding="utf-8"), max_tokens, overlap)
+    ]
+
+
+def _normalised(vectors) -> np.ndarray:
+    matrix = np.asarray(vectors, dtype=np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def evaluate(chunks: list[str], questions: np.ndarray, embed, k: int) -> dict:
+    embeddings, _ = embed_batches(chunks, embed, batch_size=256, concurrency=4)
+    scores = questions @ _normalised(embeddings).T
+    hits, reciprocal, context = 0, [], []
+    for (_, passage), row in zip(QUESTIONS, scores):
+        top = np.argsort(-row)[:k]
+        context.append(count_tokens("\n\n".join(chunks[i] for i in top)))
+        ranks = [rank for rank, i in enumerate(top, 1) if passage in chunks[i]]
+        hits += bool(ranks)
+        reciprocal.append(1 / ranks[0] if ranks else 0.0)
+    sizes = [count_tokens(c) for c in chunks]
+    return {
+        "chunks": len(chunks),
+        "mean_tokens": statistics.mean(sizes),
+        "max_tokens": max(sizes),
+        "hit": hits / len(QUESTIONS),
+        "mrr": statistics.mean(reciprocal),
+        "context_tokens": statistics.mean(context),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--windows", default="120,200,300", help="comma-separated KB_CHUNK_MAX_TOKENS values")
+    parser.add_argument("--overlap", type=int, default=30)
+    args = parser.parse_args()
+
+    embed = openai_batch_embedder(build_vector_db().embedder)
+    questions = _normalised(embed([q for q, _ in QUESTIONS]))
+
+    strategies = [("default reader", default_chunks())]
+    for window in (int(w) for w in args.windows.split(",")):
+        strategies.append((f"headings/{window}", heading_chunks(window, args.overlap)))
+
+    print(f"{len(QUESTIONS)} questions, top {args.k}\n")
+    print(f"{'strategy':<16} {'chunks':>6} {'mean':>6} {'max':>6} {'hit@k':>7} {'MRR':>6} {'context':>8}")
+    for label, chunks in strategies:
+        r = evaluate(chunks, questions, embed, args.k)
+        print(
+            f"{label:<16} {r['chunks']:>6} {r['mean_tokens']:>6.0f} {r['max_tokens']:>6} "
+            f"{r['hit']:>7.1%} {r['mrr']:>6.2f} {r['context_tokens']:>8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
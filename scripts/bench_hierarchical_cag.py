@@ -0,0 +1,133 @@
+"""Prompt size and latency of two-stage CAG matching on growing curricula.
+
+The seeded curriculum has ~240 descriptors; this builds synthetic curricula
+at 1x, 10x and 100x that size (several subjects, year levels and strands,
+seeded random wording) and compares, per scale:
+
+- single stage: the full catalogue, and the BM25 shortlist of K, in one prompt
+- two stage: the group-selection prompt plus the stage 2 shortlist prompt
+- local cost: building the index and groups, and shortlisting per request
+
+With ``--live N`` it also sends N synthetic topics through both stages with
+the matcher model and reports the wall-clock latency of each stage.
+
+Usage: python -m scripts.bench_hierarchical_cag [--scales 1,10,100] [--live 5]
+"""
+
+import argparse
+import random
+import statistics
+import time
+
+from backend.config import settings
+from backend.services.cag_service import build_cag_prompt
+from backend.services.curriculum_groups import CurriculumGroups, build_group_prompt, parse_group_selection
+from backend.services.descriptor_index import DescriptorIndex
+from backend.services.token_budget import count_tokens
+from backend.workflow.agents import get_cag_matcher
+
+BASE_DESCRIPTORS = 240
+YEARS = ["F", *map(str, range(1, 11))]
+VERBS = ["describe", "investigate", "compare", "explain", "represent", "solve", "create", "analyse", "identify"]
+
+
+def synthetic_curriculum(scale: int, seed: int = 42) -> list[dict]:
+    """Descriptors spread over ``2 * scale`` subjects, 11 year levels and 4 strands each."""
+    rng = random.Random(seed)
+    n = BASE_DESCRIPTORS * scale
+    subjects = [f"SUB{s}" for s in range(2 * scale)]
+    vocab = {s: [f"{s.lower()}term{i}" for i in range(60)] for s in subjects}
+    descriptors = []
+    for i in range(n):
+        subject = subjects[i % len(subjects)]
+        year = YEARS[(i // len(subjects)) % len(YEARS)]
+        strand = f"Strand {(i // (len(subjects) * len(YEARS))) % 4 + 1}"
+        words = [rng.choice(VERBS), *rng.sample(vocab[subject], 6)]
+        descriptors.append({
+            "code": f"AC9{subject}{year}{i:05d}",
+            "text": " ".join(words),
+            "year_level_code": f"{subject}Y{year}",
+            "strand_title": strand,
+            "subject_code": subject,
+        })
+    return descriptors
+
+
+def _ms(start: float) -> float:
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", default="1,10,100", help="comma-separated multiples of 240 descriptors")
+    parser.add_argument("--queries", type=int, default=50, help="synthetic topics for the local latency")
+    parser.add_argument("--live", type=int, default=0, help="topics to send through both stages")
+    args = parser.parse_args()
+    k = settings.CAG_SHORTLIST_K
+    group_k = settings.CAG_STAGE1_GROUPS
+    picks = settings.CAG_STAGE1_PICKS
+
+    print(f"K={k}, stage 1 groups={group_k}, picks={picks}\n")
+    print(
+        f"{'descriptors':>11} {'groups':>7} {'full':>9} {'single K':>9} {'stage 1':>8} {'2 stages':>9} "
+        f"{'build ms':>9} {'p50 ms':>7} {'p90 ms':>7}"
+    )
+    agent = get_cag_matcher() if args.live else None
+    for scale in (int(s) for s in args.scales.split(",")):
+        descriptors = synthetic_curriculum(scale)
+        start = time.perf_counter()
+        index = DescriptorIndex(descriptors)
+        groups = CurriculumGroups(descriptors)
+        build_ms = _ms(start)
+
+        rng = random.Random(scale)
+        topics = [rng.choice(descriptors) for _ in range(args.queries)]
+        latencies = []
+        for d in topics:
+            query = " ".join(d["text"].split()[1:4])
+            start = time.perf_counter()
+            offered = groups.shortlist(query, group_k, d["year_level_code"], d["strand_title"])
+            chosen = groups.descriptors_in([g.id for g in offered[:picks]])
+            index.shortlist(query, k, d["year_level_code"], d["strand_title"], within={c["code"] for c in chosen})
+            latencies.append(_ms(start))
+
+        sample = topics[0]
+        query = " ".join(sample["text"].split()[1:4])
+        offered = groups.shortlist(query, group_k)
+        full = count_tokens(build_cag_prompt(query, "", "", descriptors))
+        single = count_tokens(build_cag_prompt(query, "", "", descriptors[:k]))
+        stage1 = count_tokens(build_group_prompt(query, "", "", offered, picks))
+        print(
+            f"{len(descriptors):>11} {len(groups.groups):>7} {full:>9} {single:>9} {stage1:>8} {stage1 + single:>9} "
+            f"{build_ms:>9.0f} {statistics.median(latencies):>7.2f} "
+            f"{statistics.quantiles(latencies, n=10)[-1]:>7.2f}"
+        )
+
+        if agent:
+            _live(agent, index, groups, rng.sample(descriptors, args.live), k, group_k, picks)
+
+
+def _live(agent, index, groups, targets, k, group_k, picks):
+    stage1_ms, stage2_ms, found = [], [], 0
+    for d in targets:
+        query = " ".join(d["text"].split()[1:4])
+        offered = groups.shortlist(query, group_k, d["year_level_code"], d["strand_title"])
+        start = time.perf_counter()
+        response = agent.run(build_group_prompt(query, d["year_level_code"], d["strand_title"], offered, picks))
+        stage1_ms.append(_ms(start))
+        chosen = groups.descriptors_in(parse_group_selection(response.content or "", offered, picks))
+        candidates = index.shortlist(
+            query, k, d["year_level_code"], d["strand_title"], within={c["code"] for c in chosen} or None
+        )
+        found += d["code"] in {c["code"] for c in candidates}
+        start = time.perf_counter()
+        agent.run(build_cag_prompt(query, d["year_level_code"], d["strand_title"], candidates))
+        stage2_ms.append(_ms(start))
+    print(
+        f"  live: stage 1 p50 {statistics.median(stage1_ms):.0f} ms, stage 2 p50 {statistics.median(stage2_ms):.0f} ms, "
+        f"source descriptor kept for stage 2 in {found}/{len(targets)}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Recall and latency of vector, keyword and hybrid pedagogy search.
+
+Replays logged generations: the RAG query is rebuilt from the logged request
+and matches as the pipeline would, and a retrieved chunk counts as relevant
+when its name or content carries one of the matched descriptor codes (the
+elaboration chunks are named by code). Per mode it reports recall@k (share
+of generations with at least one relevant chunk), MRR and p50/p90 latency.
+
+It then runs a few exact-term probes (``--probes``) through each mode and
+reports how often the top k contain the term verbatim, which is where
+embeddings alone tend to miss.
+
+Usage: python -m scripts.bench_hybrid_search [--k 5] [--limit 200]
+       [--probes denominator,Pythagoras,"place value"]
+"""
+
+import argparse
+import statistics
+import time
+
+from backend.db.models import GenerationLog
+from backend.db.session import SessionLocal
+from backend.knowledge.pedagogy_search import MODES, search
+from backend.services.rag_prefetch import build_rag_query
+
+PROBES = "denominator,Pythagoras,place value,equivalent fractions,number line,array"
+
+
+def _relevant(doc, codes: set[str]) -> bool:
+    return any(code in (doc.name or "") or code in doc.content for code in codes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=200, help="most recent generations to replay")
+    parser.add_argument("--probes", default=PROBES, help="comma-separated exact terms")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        logs = (
+            db.query(GenerationLog)
+            .filter(GenerationLog.matched_descriptors.isnot(None))
+            .order_by(GenerationLog.created_at.desc())
+            .limit(args.limit)
+            .all()
+        )
+    finally:
+        db.close()
+
+    cases = []
+    for log in logs:
+        payload = log.request_payload or {}
+        matches = log.matched_descriptors or []
+        codes = {m["code"] for m in matches if m.get("code")}
+        if payload.get("topic") and codes:
+            path = (log.routing_decision or {}).get("teaching_path") or payload.get("teaching_focus", "")
+            cases.append((build_rag_query(payload, matches, path), codes))
+
+    # Embed every query once up front so the timings compare the searches only
+    for query, _ in cases:
+        search(query, limit=1, mode="vector")
+
+    if cases:
+        print(f"{len(cases)} generations, k={args.k}\n")
+        print(f"{'mode':>8} {'recall@k':>9} {'MRR':>6} {'p50 ms':>8} {'p90 ms':>8}")
+        for mode in MODES:
+            hits, reciprocal, latencies = 0, 0.0, []
+            for query, codes in cases:
+                start = time.perf_counter()
+                docs = search(query, limit=args.k, mode=mode)
+                latencies.append((time.perf_counter() - start) * 1000)
+                ranks = [i for i, doc in enumerate(docs, 1) if _relevant(doc, codes)]
+                hits += bool(ranks)
+                reciprocal += 1 / ranks[0] if ranks else 0.0
+            p90 = statistics.quantiles(latencies, n=10)[-1] if len(latencies) > 1 else latencies[0]
+            print(
+                f"{mode:>8} {hits / len(cases):>9.1%} {reciprocal / len(cases):>6.3f} "
+                f"{statistics.median(latencies):>8.1f} {p90:>8.1f}"
+            )
+    else:
+        print("No logged generations with matches to replay.")
+
+    probes = [p.strip() for p in args.probes.split(",") if p.strip()]
+    print(f"\nExact-term probes ({len(probes)}): share of top {args.k} containing the term")
+    for mode in MODES:
+        shares = []
+        for term in probes:
+            docs = search(term, limit=args.k, mode=mode)
+            shares.append(sum(term.lower() in doc.content.lower() for doc in docs) / args.k)
+        print(f"{mode:>8} {statistics.mean(shares):>6.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Per-query latency of pedagogy retrieval: fresh vs shared knowledge base.
+
+"fresh" builds a knowledge base with its own engine and OpenAI client for
+every query, as the pedagogy retriever used to; "shared" uses the warmed
+process-wide instance. Each query is timed end to end (setup + embedding +
+vector search), and the setup share is reported separately.
+
+Usage: python -m scripts.bench_knowledge_base [--queries 20]
+"""
+
+import argparse
+import statistics
+import time
+
+from backend.knowledge.pedagogy_kb import build_knowledge_base, get_knowledge_base, warm_knowledge_base
+
+QUERIES = [
+    "equivalent fractions Year 4 explicit instruction",
+    "area and perimeter of rectangles Year 5 inquiry",
+    "solving linear equations Year 7 fluency practice",
+    "probability experiments Year 6 assessment",
+    "place value to tens of thousands Year 3 planning",
+]
+
+
+def _report(name: str, totals: list[float], setups: list[float]) -> None:
+    print(
+        f"{name:>7}: p50 {statistics.median(totals):7.1f} ms, "
+        f"p90 {statistics.quantiles(totals, n=10)[-1]:7.1f} ms, "
+        f"setup p50 {statistics.median(setups):6.1f} ms"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=20, help="queries per mode")
+    args = parser.parse_args()
+    queries = [QUERIES[i % len(QUERIES)] for i in range(args.queries)]
+
+    totals, setups = [], []
+    for query in queries:
+        start = time.perf_counter()
+        kb = build_knowledge_base()
+        setups.append((time.perf_counter() - start) * 1000)
+        kb.search(query, max_results=5)
+        totals.append((time.perf_counter() - start) * 1000)
+        kb.vector_db.db_engine.dispose()
+    _report("fresh", totals, setups)
+
+    start = time.perf_counter()
+    warm_knowledge_base()
+    print(f"warm-up {(time.perf_counter() - start) * 1000:.0f} ms")
+    totals, setups = [], []
+    for query in queries:
+        start = time.perf_counter()
+        kb = get_knowledge_base()
+        setups.append((time.perf_counter() - start) * 1000)
+        kb.search(query, max_results=5)
+        totals.append((time.perf_counter() - start) * 1000)
+    _report("shared", totals, setups)
+
+
+if __name__ == "__main__":
+    main()
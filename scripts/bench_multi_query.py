@@ -0,0 +1,91 @@
+"""Coverage and latency of single-query against multi-query pedagogy retrieval.
+
+Replays logged generations: the RAG queries are rebuilt from the logged
+request and matches as the pipeline would, once as the single blended query
+and once as one query per matched descriptor plus the teaching path
+(``RAG_MULTI_QUERY``). A retrieved chunk is relevant to a descriptor when
+its name or content carries the descriptor's code. Per strategy it reports
+recall@k (generations with at least one relevant chunk), descriptor coverage
+(share of the matched descriptors with a relevant chunk in the top k) and
+p50/p90 latency.
+
+The embedding cache is off unless ``--warm``, so every search pays its
+embedding round trip; the multi-query path makes one batched call.
+
+Usage: python -m scripts.bench_multi_query [--k 5] [--limit 200] [--warm]
+"""
+
+import argparse
+import statistics
+import time
+
+from backend.config import settings
+from backend.db.models import GenerationLog
+from backend.db.session import SessionLocal
+from backend.knowledge.pedagogy_search import multi_search, search
+from backend.services.rag_prefetch import RAG_QUERY_MATCHES, build_rag_queries, build_rag_scope
+
+
+def _covered(docs, codes: list[str]) -> set[str]:
+    return {code for code in codes for doc in docs if code in (doc.name or "") or code in doc.content}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=200, help="most recent generations to replay")
+    parser.add_argument("--warm", action="store_true", help="keep the query embedding cache on")
+    args = parser.parse_args()
+    settings.RAG_EMBEDDING_CACHE_ENABLED = args.warm
+
+    db = SessionLocal()
+    try:
+        logs = (
+            db.query(GenerationLog)
+            .filter(GenerationLog.matched_descriptors.isnot(None))
+            .order_by(GenerationLog.created_at.desc())
+            .limit(args.limit)
+            .all()
+        )
+    finally:
+        db.close()
+
+    cases = []
+    for log in logs:
+        payload = log.request_payload or {}
+        matches = log.matched_descriptors or []
+        codes = [m["code"] for m in matches[:RAG_QUERY_MATCHES] if m.get("code")]
+        if payload.get("topic") and codes:
+            path = (log.routing_decision or {}).get("teaching_path") or payload.get("teaching_focus", "")
+            cases.append((payload, matches, path, codes))
+    if not cases:
+        print("No logged generations with matches to replay.")
+        return
+
+    print(f"{len(cases)} generations, k={args.k}, embedding cache {'on' if args.warm else 'off'}\n")
+    print(f"{'strategy':>8} {'queries':>8} {'recall@k':>9} {'coverage':>9} {'p50 ms':>8} {'p90 ms':>8}")
+    for label, multi in (("single", False), ("multi", True)):
+        settings.RAG_MULTI_QUERY = multi
+        hits, coverage, latencies, counts = 0, [], [], []
+        for payload, matches, path, codes in cases:
+            queries = build_rag_queries(payload, matches, path)
+            scope = build_rag_scope(payload, matches, path)
+            start = time.perf_counter()
+            if len(queries) == 1:
+                docs = search(queries[0], limit=args.k, scope=scope)
+            else:
+                docs = multi_search(list(queries), limit=args.k, scope=scope)
+            latencies.append((time.perf_counter() - start) * 1000)
+            covered = _covered(docs, codes)
+            hits += bool(covered)
+            coverage.append(len(covered) / len(codes))
+            counts.append(len(queries))
+        p90 = statistics.quantiles(latencies, n=10)[-1] if len(latencies) > 1 else latencies[0]
+        print(
+            f"{label:>8} {statistics.mean(counts):>8.1f} {hits / len(cases):>9.1%} "
+            f"{statistics.mean(coverage):>9.1%} {statistics.median(latencies):>8.1f} {p90:>8.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
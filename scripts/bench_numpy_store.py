@@ -0,0 +1,72 @@
+"""Search latency of the NumPy snapshot backend against pgvector.
+
+Exports the current knowledge base to a scratch snapshot, then runs the same
+queries through ``pedagogy_search.vector_search`` (pgvector, over the pooled
+engine) and ``NumpyVectorStore.search`` (in-process, memory-mapped), with and
+without a metadata scope. The queries are stored chunk embeddings with some
+noise, so no embedding calls are made. Reports p50/p99 latency and how often
+both backends return the same top k.
+
+Usage: python -m scripts.bench_numpy_store [--queries 500] [--k 5]
+"""
+
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from backend.knowledge.numpy_store import NumpyVectorStore, export_snapshot
+from backend.knowledge.pedagogy_kb import get_knowledge_base
+from backend.knowledge.pedagogy_search import Scope, vector_search
+from backend.services.rag_cache import knowledge_base_version
+
+
+def _summary(latencies: list[float]) -> str:
+    p99 = statistics.quantiles(latencies, n=100)[-1] if len(latencies) > 1 else latencies[0]
+    return f"p50 {statistics.median(latencies):7.3f} ms  p99 {p99:7.3f} ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+    rng = np.random.default_rng(7)
+
+    vector_db = get_knowledge_base().vector_db
+    with tempfile.TemporaryDirectory(prefix="bench_vectors_") as tmp:
+        start = time.perf_counter()
+        name = export_snapshot(vector_db, knowledge_base_version(vector_db), Path(tmp))
+        export_ms = (time.perf_counter() - start) * 1000
+        store = NumpyVectorStore(Path(tmp) / name)
+        if not len(store):
+            print("The knowledge base is empty; seed it first.")
+            return
+        print(f"{len(store)} chunks x {store.embeddings.shape[1]}, exported in {export_ms:.0f} ms\n")
+
+        picks = rng.integers(0, len(store), args.queries)
+        queries = store.embeddings[picks] + 0.02 * rng.normal(size=(args.queries, store.embeddings.shape[1]))
+        scope = Scope(years=(4, 5, 6), teaching_focus="explicit_instruction")
+
+        for label, scoped in (("unscoped", None), ("scoped", scope)):
+            pg, local, same = [], [], 0
+            for query in queries:
+                embedding = query.tolist()
+                start = time.perf_counter()
+                expected = vector_search(vector_db, embedding, args.k, scope=scoped)
+                pg.append((time.perf_counter() - start) * 1000)
+                start = time.perf_counter()
+                found = store.search(embedding, [], args.k, "vector", scope=scoped)
+                local.append((time.perf_counter() - start) * 1000)
+                same += [d.id for d in expected] == [d.id for d in found]
+            print(f"{label}:")
+            print(f"  pgvector  {_summary(pg)}")
+            print(f"  numpy     {_summary(local)}")
+            print(f"  same top {args.k}: {same / len(queries):.1%}\n")
+
+
+if __name__ == "__main__":
+    main()
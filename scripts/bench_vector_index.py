@@ -0,0 +1,133 @@
+"""Recall@k and latency of the pedagogy ANN index against exact search.
+
+Loads synthetic clustered, L2-normalised vectors into a scratch table
+(``bench.vectors``) at several corpus sizes. For each size and index type it
+reports the build time, then recall@k against an exact scan and the p50/p90
+query latency for each ``ef_search`` (HNSW) or ``probes`` (IVFFlat) value.
+The scratch schema is dropped at the end.
+
+Usage: python -m scripts.bench_vector_index [--sizes 10000,50000,200000]
+       [--dim 1536] [--queries 50] [--k 5] [--index hnsw,ivfflat]
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+from sqlalchemy import text
+
+from backend.config import settings
+from backend.db.session import engine
+from backend.knowledge.vector_index import HNSW, IVFFLAT, IndexSpec, apply_search_params, ivfflat_lists
+
+TABLE = "bench.vectors"
+EF_SEARCH = [10, 20, 40, 80, 160]
+PROBES = [1, 3, 10, 30]
+
+
+def _literal(vector: np.ndarray) -> str:
+    return "[" + ",".join(f"{x:.6f}" for x in vector) + "]"
+
+
+def synthetic(n: int, dim: int, rng: np.random.Generator, clusters: int = 200) -> np.ndarray:
+    centres = rng.normal(size=(clusters, dim)).astype(np.float32)
+    points = centres[rng.integers(0, clusters, n)] + 0.6 * rng.normal(size=(n, dim)).astype(np.float32)
+    return points / np.linalg.norm(points, axis=1, keepdims=True)
+
+
+def load(vectors: np.ndarray) -> None:
+    with engine.begin() as conn:
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS vector"))
+        conn.execute(text("CREATE SCHEMA IF NOT EXISTS bench"))
+        conn.execute(text(f"DROP TABLE IF EXISTS {TABLE}"))
+        conn.execute(text(f"CREATE TABLE {TABLE} (id integer PRIMARY KEY, embedding vector({vectors.shape[1]}))"))
+    raw = engine.raw_connection()
+    try:
+        with raw.cursor() as cur:
+            with cur.copy(f"COPY {TABLE} (id, embedding) FROM STDIN") as copy:
+                for i, vector in enumerate(vectors):
+                    copy.write_row((i, _literal(vector)))
+        raw.commit()
+    finally:
+        raw.close()
+    with engine.begin() as conn:
+        conn.execute(text(f"ANALYZE {TABLE}"))
+
+
+def query(conn, vector: np.ndarray, k: int) -> list[int]:
+    rows = conn.execute(
+        text(f"SELECT id FROM {TABLE} ORDER BY embedding <=> CAST(:q AS vector) LIMIT :k"),
+        {"q": _literal(vector), "k": k},
+    )
+    return [row.id for row in rows]
+
+
+def exact(queries: np.ndarray, k: int) -> list[set[int]]:
+    truth = []
+    for vector in queries:
+        with engine.begin() as conn:
+            conn.execute(text("SET LOCAL enable_indexscan = off"))
+            truth.append(set(query(conn, vector, k)))
+    return truth
+
+
+def measure(queries: np.ndarray, truth: list[set[int]], k: int, **knobs) -> tuple[float, list[float]]:
+    recalls, latencies = [], []
+    for vector, expected in zip(queries, truth):
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            apply_search_params(conn, **knobs)
+            found = query(conn, vector, k)
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(expected & set(found)) / k)
+    return statistics.mean(recalls), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", default="10000,50000,200000", help="comma-separated corpus sizes")
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--index", default=f"{HNSW},{IVFFLAT}", help="index types to benchmark")
+    args = parser.parse_args()
+    rng = np.random.default_rng(7)
+
+    try:
+        for n in (int(s) for s in args.sizes.split(",")):
+            vectors = synthetic(n, args.dim, rng)
+            queries = vectors[rng.integers(0, n, args.queries)] + 0.05 * rng.normal(size=(args.queries, args.dim))
+            load(vectors)
+            truth = exact(queries, args.k)
+            _, scan = measure(queries, truth, args.k, ef_search=1)  # no index yet: exact scan
+            print(f"\n{n} vectors x {args.dim}: exact scan p50 {statistics.median(scan):.1f} ms")
+
+            for kind in args.index.split(","):
+                spec = (
+                    IndexSpec(HNSW, m=settings.VECTOR_HNSW_M, ef_construction=settings.VECTOR_HNSW_EF_CONSTRUCTION)
+                    if kind == HNSW
+                    else IndexSpec(IVFFLAT, lists=settings.VECTOR_IVFFLAT_LISTS or ivfflat_lists(n))
+                )
+                start = time.perf_counter()
+                with engine.begin() as conn:
+                    conn.execute(text(f"SET LOCAL maintenance_work_mem = '{settings.VECTOR_INDEX_BUILD_MEMORY}'"))
+                    conn.execute(text(spec.create_sql(TABLE, name=f"bench_{kind}")))
+                print(f"  {kind} {spec.options}: built in {time.perf_counter() - start:.1f} s")
+                knob = "ef_search" if kind == HNSW else "probes"
+                for value in EF_SEARCH if kind == HNSW else PROBES:
+                    recall, latencies = measure(queries, truth, args.k, **{knob: value})
+                    print(
+                        f"    {knob}={value:<4} recall@{args.k} {recall:6.1%}  "
+                        f"p50 {statistics.median(latencies):6.1f} ms  "
+                        f"p90 {statistics.quantiles(latencies, n=10)[-1]:6.1f} ms"
+                    )
+                with engine.begin() as conn:
+                    conn.execute(text(f'DROP INDEX bench."bench_{kind}"'))
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text("DROP SCHEMA IF EXISTS bench CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Index size, latency and recall@k of float32, halfvec and binary-quantised storage.
+
+Loads synthetic clustered vectors into the ``bench.vectors`` scratch table
+(see ``bench_vector_index``) and, for each ``VECTOR_STORAGE`` mode, builds an
+HNSW index over the matching expression. It then reports the index size and
+build time, and the recall@k against an exact scan and p50/p99 latency for
+several rescoring depths (candidates taken from the index and reranked at
+full precision). The scratch schema is dropped at the end.
+
+Usage: python -m scripts.bench_vector_storage [--size 50000] [--dim 1536]
+       [--queries 50] [--k 5] [--candidates 5,20,40,80]
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+from sqlalchemy import text
+
+from backend.config import settings
+from backend.db.session import engine
+from backend.knowledge.vector_index import BIT, HALFVEC, HNSW, VECTOR, IndexSpec, apply_search_params, index_distance
+from scripts.bench_vector_index import TABLE, _literal, exact, load, synthetic
+
+RESCORED_SQL = """
+    WITH candidates AS (
+        SELECT id FROM {table} ORDER BY {distance} LIMIT :candidates
+    )
+    SELECT v.id FROM candidates c JOIN {table} v ON v.id = c.id
+    ORDER BY v.embedding <=> CAST(:q AS vector)
+    LIMIT :k
+"""
+
+
+def measure(queries, truth, k: int, storage: str, dim: int, candidates: int) -> tuple[float, list[float]]:
+    sql = text(RESCORED_SQL.format(table=TABLE, distance=index_distance(storage, dim, "CAST(:q AS vector)")))
+    recalls, latencies = [], []
+    for vector, expected in zip(queries, truth):
+        start = time.perf_counter()
+        with engine.begin() as conn:
+            apply_search_params(conn, ef_search=max(settings.VECTOR_HNSW_EF_SEARCH, candidates))
+            found = [row.id for row in conn.execute(sql, {"q": _literal(vector), "k": k, "candidates": candidates})]
+        latencies.append((time.perf_counter() - start) * 1000)
+        recalls.append(len(expected & set(found)) / k)
+    return statistics.mean(recalls), latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=50_000)
+    parser.add_argument("--dim", type=int, default=1536)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--candidates", default="5,20,40,80", help="comma-separated rescoring depths")
+    args = parser.parse_args()
+    depths = [int(c) for c in args.candidates.split(",")]
+    rng = np.random.default_rng(7)
+
+    vectors = synthetic(args.size, args.dim, rng)
+    queries = vectors[rng.integers(0, args.size, args.queries)] + 0.05 * rng.normal(size=(args.queries, args.dim))
+    try:
+        load(vectors)
+        truth = exact(queries, args.k)
+        with engine.connect() as conn:
+            table_mb = conn.execute(text(f"SELECT pg_table_size('{TABLE}')")).scalar_one() / 2**20
+        print(f"{args.size} vectors x {args.dim}: table {table_mb:.0f} MB\n")
+
+        for storage in (VECTOR, HALFVEC, BIT):
+            spec = IndexSpec(
+                HNSW,
+                m=settings.VECTOR_HNSW_M,
+                ef_construction=settings.VECTOR_HNSW_EF_CONSTRUCTION,
+                storage=storage,
+                dimensions=args.dim,
+            )
+            name = f"bench_{storage}"
+            start = time.perf_counter()
+            with engine.begin() as conn:
+                conn.execute(text(f"SET LOCAL maintenance_work_mem = '{settings.VECTOR_INDEX_BUILD_MEMORY}'"))
+                conn.execute(text(spec.create_sql(TABLE, name=name)))
+            build_s = time.perf_counter() - start
+            with engine.connect() as conn:
+                index_mb = conn.execute(text(f"SELECT pg_relation_size('bench.\"{name}\"')")).scalar_one() / 2**20
+            print(f"{storage}: index {index_mb:.1f} MB, built in {build_s:.1f} s")
+            for candidates in depths if storage != VECTOR else [args.k]:
+                recall, latencies = measure(queries, truth, args.k, storage, args.dim, max(candidates, args.k))
+                p99 = statistics.quantiles(latencies, n=100)[-1]
+                print(
+                    f"  candidates={candidates:<4} recall@{args.k} {recall:6.1%}  "
+                    f"p50 {statistics.median(latencies):6.1f} ms  p99 {p99:6.1f} ms"
+                )
+            with engine.begin() as conn:
+                conn.execute(text(f'DROP INDEX bench."{name}"'))
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text("DROP SCHEMA IF EXISTS bench CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
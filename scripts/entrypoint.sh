@@ -8,6 +8,13 @@ alembic upgrade head
 echo "=== Seeding reference data ==="
 python -c "from scripts.seed_data import main; main()"
 
+echo "=== Loading knowledge base snapshot ==="
+# A snapshot (python -m scripts.kb_snapshot export) fills an empty knowledge
+# base without embedding calls; the seed below then only embeds what changed.
+python -m scripts.kb_snapshot import --if-empty || {
+  echo "WARNING: Could not import the knowledge base snapshot."
+}
+
 echo "=== Seeding knowledge base ==="
 # Knowledge seeding requires OPENAI_API_KEY for embeddings.
 # If it fails (e.g. missing key), continue anyway so the server still starts.
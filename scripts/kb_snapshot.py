@@ -0,0 +1,90 @@
+"""Export or import a portable snapshot of the pedagogy knowledge base.
+
+    python -m scripts.kb_snapshot export [PATH]
+    python -m scripts.kb_snapshot import [PATH] [--if-empty] [--force]
+
+PATH defaults to ``KB_SNAPSHOT_PATH``. ``export`` writes every chunk, its
+metadata and vector with the embedder model and dimensions; ``import``
+replaces the table's contents with the snapshot via COPY, making no
+embedding calls. ``--if-empty`` imports only into an empty table (the
+container entrypoint uses it), and ``--force`` accepts a snapshot made with
+a different embedding model.
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+from backend.config import settings
+from backend.db.session import engine
+from backend.knowledge.kb_snapshot import (
+    SnapshotMismatch,
+    check_compatible,
+    export_snapshot,
+    import_snapshot,
+    read_snapshot,
+    table_dimensions,
+    table_rows,
+)
+
+
+def _size(n: int) -> str:
+    return f"{n / 1024 / 1024:.1f} MB" if n >= 1024 * 1024 else f"{n / 1024:.0f} KB"
+
+
+def export(path: Path) -> None:
+    start = time.perf_counter()
+    snapshot, size = export_snapshot(engine, path, settings.EMBEDDING_MODEL)
+    print(
+        f"Exported {len(snapshot.chunks)} chunks ({snapshot.model}, {snapshot.dimensions}-d) to {path}: "
+        f"{_size(size)} in {time.perf_counter() - start:.1f} s"
+    )
+
+
+def load(path: Path, if_empty: bool, force: bool) -> int:
+    if not path.exists():
+        print(f"No knowledge base snapshot at {path}")
+        return 0
+    if if_empty and table_rows(engine):
+        print("Knowledge base already has rows; not importing the snapshot.")
+        return 0
+    start = time.perf_counter()
+    snapshot = read_snapshot(path)
+    read_s = time.perf_counter() - start
+    dimensions = table_dimensions(engine)
+    try:
+        check_compatible(snapshot, settings.EMBEDDING_MODEL, dimensions)
+    except SnapshotMismatch as e:
+        # Vectors of the wrong size can't be stored at all
+        if not force or (dimensions is not None and snapshot.dimensions != dimensions):
+            print(f"ERROR: {e}", file=sys.stderr)
+            return 1
+        print(f"WARNING: {e}; importing anyway (--force)", file=sys.stderr)
+    load_ms = import_snapshot(engine, snapshot)
+    print(
+        f"Imported {len(snapshot.chunks)} chunks from {path} ({_size(path.stat().st_size)}): "
+        f"read in {read_s * 1000:.0f} ms, loaded in {load_ms:.0f} ms"
+    )
+    return 0
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_cmd = commands.add_parser("export", help="write the table to a snapshot file")
+    export_cmd.add_argument("path", nargs="?", type=Path, default=Path(settings.KB_SNAPSHOT_PATH))
+    import_cmd = commands.add_parser("import", help="replace the table with a snapshot")
+    import_cmd.add_argument("path", nargs="?", type=Path, default=Path(settings.KB_SNAPSHOT_PATH))
+    import_cmd.add_argument("--if-empty", action="store_true", help="only import into an empty table")
+    import_cmd.add_argument("--force", action="store_true", help="accept a different embedding model")
+    args = parser.parse_args(argv)
+
+    if args.command == "export":
+        export(args.path)
+        return 0
+    return load(args.path, args.if_empty, args.force)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -16,6 +16,7 @@ from backend.db.models import (
     PromptTemplate,
     ResourceType,
     Strand,
+    Subject,
     TeachingFocus,
     YearLevel,
 )
@@ -28,7 +29,7 @@ def slugify(name: str) -> str:
 
 
 def year_band(code: str, title: str) -> str:
-    if code == "MATMATFY" or title in ("Year 1", "Year 2"):
+    if code.endswith("FY") or title.startswith("Foundation") or title in ("Year 1", "Year 2"):
         return "early_years"
     if title in ("Year 7", "Year 8", "Year 9", "Year 10"):
         return "secondary"
@@ -43,36 +44,88 @@ SORT_MAP = {
 }
 
 
+# Strand codes for Mathematics; other subjects' strands use a slug of the title
+STRAND_CODE_MAP = {
+    "Number": "NUM",
+    "Algebra": "ALG",
+    "Measurement": "MEA",
+    "Space": "SPA",
+    "Statistics": "STA",
+    "Probability": "PRO",
+}
+
+
+def strand_code(title: str) -> str:
+    return STRAND_CODE_MAP.get(title) or slugify(title).upper()[:20]
+
+
 def seed_curriculum(session):
+    """Seed every learning area and subject in curriculum.json."""
     with open(DATA_DIR / "curriculum.json", encoding="utf-8") as f:
         data = json.load(f)
 
-    subject = data["learning_areas"][0]["subjects"][0]
-    levels = subject["levels"]
     content_items = data["content_items"]
+    level_subject: dict[str, str] = {}
+
+    for area in data["learning_areas"]:
+        for subject in area["subjects"]:
+            subject_code = subject.get("code") or slugify(subject["title"]).upper()[:20]
+            if not session.query(Subject).filter_by(code=subject_code).first():
+                session.add(Subject(
+                    code=subject_code,
+                    title=subject["title"],
+                    learning_area=area.get("title", subject["title"]),
+                ))
+            session.flush()
+            seed_subject(session, subject, subject_code)
+            for level in subject["levels"]:
+                level_subject[level["code"]] = subject_code
+
+    # Seed content descriptors and elaborations
+    for item in content_items:
+        loc = item["location"]
+        subject_code = level_subject.get(loc["level_code"])
+        existing = session.query(ContentDescriptor).filter_by(code=item["code"]).first()
+        if not existing:
+            session.add(
+                ContentDescriptor(
+                    code=item["code"],
+                    text=item["text"],
+                    year_level_code=loc["level_code"],
+                    strand_title=loc["strand"],
+                    subject_code=subject_code,
+                )
+            )
+        elif existing.subject_code is None:
+            existing.subject_code = subject_code
+        session.flush()
+
+        for elab in item.get("elaborations", []):
+            existing_elab = session.query(Elaboration).filter_by(code=elab["code"]).first()
+            if not existing_elab:
+                session.add(
+                    Elaboration(
+                        code=elab["code"],
+                        text=elab["text"],
+                        content_descriptor_code=item["code"],
+                    )
+                )
+    session.flush()
+    print(f"Seeded curriculum: {session.query(Subject).count()} subjects, "
+          f"{session.query(ContentDescriptor).count()} content descriptors, "
+          f"{session.query(Elaboration).count()} elaborations, "
+          f"{session.query(AchievementStandard).count()} achievement standards")
 
-    # Collect unique strands
-    strand_set = set()
-    for level in levels:
-        for s in level["strands"]:
-            strand_set.add(s["title"])
-
-    # Strand code mapping
-    strand_code_map = {
-        "Number": "NUM",
-        "Algebra": "ALG",
-        "Measurement": "MEA",
-        "Space": "SPA",
-        "Statistics": "STA",
-        "Probability": "PRO",
-    }
+
+def seed_subject(session, subject: dict, subject_code: str):
+    """Seed one subject's strands, year levels and achievement standards."""
+    levels = subject["levels"]
 
     # Seed strands
+    strand_set = {s["title"] for level in levels for s in level["strands"]}
     for title in sorted(strand_set):
-        code = strand_code_map.get(title, slugify(title).upper()[:3])
-        existing = session.query(Strand).filter_by(code=code).first()
-        if not existing:
-            session.add(Strand(code=code, title=title))
+        if not session.query(Strand).filter_by(title=title).first():
+            session.add(Strand(code=strand_code(title), title=title))
     session.flush()
 
     # Seed year levels
@@ -90,8 +143,11 @@ def seed_curriculum(session):
                     sort_order=sort_order,
                     level_description=desc,
                     band=band,
+                    subject_code=subject_code,
                 )
             )
+        elif existing.subject_code is None:
+            existing.subject_code = subject_code
     session.flush()
 
     # Seed achievement standards
@@ -108,36 +164,6 @@ def seed_curriculum(session):
                 )
     session.flush()
 
-    # Seed content descriptors and elaborations
-    for item in content_items:
-        loc = item["location"]
-        existing = session.query(ContentDescriptor).filter_by(code=item["code"]).first()
-        if not existing:
-            session.add(
-                ContentDescriptor(
-                    code=item["code"],
-                    text=item["text"],
-                    year_level_code=loc["level_code"],
-                    strand_title=loc["strand"],
-                )
-            )
-        session.flush()
-
-        for elab in item.get("elaborations", []):
-            existing_elab = session.query(Elaboration).filter_by(code=elab["code"]).first()
-            if not existing_elab:
-                session.add(
-                    Elaboration(
-                        code=elab["code"],
-                        text=elab["text"],
-                        content_descriptor_code=item["code"],
-                    )
-                )
-    session.flush()
-    print(f"Seeded curriculum: {session.query(ContentDescriptor).count()} content descriptors, "
-          f"{session.query(Elaboration).count()} elaborations, "
-          f"{session.query(AchievementStandard).count()} achievement standards")
-
 
 def parse_message_txt() -> list[dict]:
     """Parse message.txt into resource type records."""
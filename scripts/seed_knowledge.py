@@ -4,50 +4,44 @@ import json
 import sys
 from pathlib import Path
 
-from agno.knowledge.embedder.openai import OpenAIEmbedder
-from agno.knowledge.knowledge import Knowledge
-from agno.vectordb.pgvector import PgVector, SearchType
-
 from backend.config import settings
+from backend.knowledge.chunk_metadata import elaboration_metadata, pedagogy_metadata
+from backend.knowledge.kb_sync import SourceChunk, sync_knowledge_base
+from backend.knowledge.markdown_chunker import chunk_markdown
 
 DATA_DIR = Path(__file__).resolve().parent.parent / "data"
 
 
-def get_knowledge_base() -> Knowledge:
-    vector_db = PgVector(
-        table_name="pedagogy_vectors",
-        db_url=settings.DATABASE_URL,
-        search_type=SearchType.vector,
-        embedder=OpenAIEmbedder(id="text-embedding-3-small"),
-    )
-    return Knowledge(
-        name="Pedagogy Knowledge Base",
-        description="Educational pedagogy documents and curriculum elaborations",
-        vector_db=vector_db,
-    )
-
-
-def seed_pedagogy_docs(kb: Knowledge):
-    """Load markdown pedagogy documents into the knowledge base."""
-    pedagogy_dir = DATA_DIR / "pedagogy"
-    for md_file in sorted(pedagogy_dir.glob("*.md")):
-        print(f"  Loading pedagogy doc: {md_file.name}")
-        kb.insert(path=str(md_file))
-
-
-def seed_elaborations(kb: Knowledge):
-    """Load curriculum elaborations as text documents into the knowledge base.
-
-    Groups elaborations by content descriptor to create meaningful chunks.
-    """
+def pedagogy_chunks() -> list[SourceChunk]:
+    """Heading-scoped chunks of the markdown pedagogy documents."""
+    chunks = []
+    for md_file in sorted((DATA_DIR / "pedagogy").glob("*.md")):
+        sections = chunk_markdown(
+            md_file.read_text(encoding="utf-8"),
+            settings.KB_CHUNK_MAX_TOKENS,
+            settings.KB_CHUNK_OVERLAP_TOKENS,
+        )
+        for i, section in enumerate(sections, 1):
+            chunks.append(SourceChunk(
+                id=f"pedagogy:{md_file.stem}:{i}",
+                name=md_file.stem,
+                content=section.content,
+                meta_data={
+                    "chunk": i,
+                    "heading_path": list(section.heading_path),
+                    **pedagogy_metadata(md_file.stem),
+                },
+            ))
+    return chunks
+
+
+def elaboration_chunks() -> list[SourceChunk]:
+    """One chunk per content descriptor: its text and all its elaborations."""
     with open(DATA_DIR / "curriculum.json", encoding="utf-8") as f:
         data = json.load(f)
 
-    content_items = data["content_items"]
-
-    # Group elaborations by content descriptor into text chunks
     chunks = []
-    for item in content_items:
+    for item in data["content_items"]:
         loc = item["location"]
         elabs = item.get("elaborations", [])
         if not elabs:
@@ -58,78 +52,74 @@ def seed_elaborations(kb: Knowledge):
             f"Content Descriptor {item['code']} ({loc['level']} - {loc['strand']}): "
             f"{item['text']}\n\nElaborations:\n{elab_texts}"
         )
-        chunks.append((item["code"], chunk_text))
-
-    print(f"  Loading {len(chunks)} elaboration chunks into knowledge base...")
-
-    # Write chunks to temporary files for Knowledge.insert() to process
-    import tempfile
-    import os
+        chunks.append(SourceChunk(
+            id=f"elaboration:{item['code']}",
+            name=item["code"],
+            content=chunk_text,
+            meta_data=elaboration_metadata(item["code"], loc["level"], loc["strand"]),
+        ))
+    return chunks
+
+
+def export_vector_snapshot(force: bool = False):
+    """Refresh the NumPy snapshot when it is the search backend and the table has changed."""
+    if settings.RAG_VECTOR_BACKEND != "numpy":
+        return
+    from backend.knowledge.numpy_store import export_snapshot, snapshot_version
+    from backend.knowledge.pedagogy_kb import build_vector_db
+    from backend.services.rag_cache import knowledge_base_version
 
-    tmp_dir = tempfile.mkdtemp(prefix="lessonforge_elabs_")
     try:
-        for code, text in chunks:
-            filepath = os.path.join(tmp_dir, f"{code}.txt")
-            with open(filepath, "w", encoding="utf-8") as f:
-                f.write(text)
-
-        # Insert the directory of text files
-        kb.insert(path=tmp_dir)
-        print(f"  Inserted {len(chunks)} elaboration documents")
-    finally:
-        # Cleanup temp files
-        import shutil
-        shutil.rmtree(tmp_dir, ignore_errors=True)
-
-
-def _test_openai_access() -> bool:
-    """Quick check that we can call the OpenAI embeddings API."""
-    try:
-        from openai import OpenAI
-        client = OpenAI(api_key=settings.OPENAI_API_KEY)
-        client.embeddings.create(input="test", model="text-embedding-3-small")
-        return True
+        vector_db = build_vector_db()
+        version = knowledge_base_version(vector_db)
+        if not force and snapshot_version() == version:
+            print("Vector snapshot is up to date.")
+            return
+        name = export_snapshot(vector_db, version)
+        print(f"Exported vector snapshot {name}")
     except Exception as e:
-        print(f"OpenAI API check failed: {e}", file=sys.stderr)
-        return False
+        print(f"WARNING: Could not export the vector snapshot: {e}", file=sys.stderr)
+
 
+def build_vector_index(force: bool = False):
+    """Create the ANN index, or rebuild it if its build parameters changed."""
+    from backend.db.session import engine
+    from backend.knowledge.vector_index import ensure_vector_index
 
-def _knowledge_already_seeded() -> bool:
-    """Check if the knowledge base already has data."""
     try:
-        from sqlalchemy import create_engine, text
-        engine = create_engine(settings.DATABASE_URL)
-        with engine.connect() as conn:
-            result = conn.execute(text("SELECT COUNT(*) FROM ai.pedagogy_vectors"))
-            count = result.scalar()
-            return count is not None and count > 0
-    except Exception:
-        return False
+        result = ensure_vector_index(engine, force=force)
+        print(f"Vector index ({settings.VECTOR_INDEX_TYPE}): {result}")
+    except Exception as e:
+        print(f"WARNING: Could not build the vector index: {e}", file=sys.stderr)
 
 
 def main():
     if not settings.OPENAI_API_KEY:
-        print("WARNING: OPENAI_API_KEY not set. Skipping knowledge base seeding.", file=sys.stderr)
+        # A snapshot import may still have filled the table
+        print("WARNING: OPENAI_API_KEY not set. Skipping knowledge base sync.", file=sys.stderr)
+        build_vector_index()
+        export_vector_snapshot()
         return
 
-    if _knowledge_already_seeded():
-        print("Knowledge base already seeded. Skipping.")
-        return
-
-    if not _test_openai_access():
-        print("WARNING: OpenAI API unavailable. Skipping knowledge base seeding.", file=sys.stderr)
-        return
-
-    print("Seeding knowledge base...")
-    kb = get_knowledge_base()
+    from backend.knowledge.pedagogy_kb import build_vector_db
 
+    print("Syncing knowledge base...")
+    chunks = pedagogy_chunks() + elaboration_chunks()
+    vector_db = build_vector_db()
+    if not vector_db.table_exists():
+        vector_db.create()
     try:
-        seed_pedagogy_docs(kb)
-        seed_elaborations(kb)
-        print("Knowledge base seeded successfully.")
+        result = sync_knowledge_base(vector_db, chunks)
     except Exception as e:
         print(f"Knowledge seed failed: {e}", file=sys.stderr)
         raise
+    print(
+        f"  {len(chunks)} chunks: {result.inserted} new, {result.updated} changed, "
+        f"{result.unchanged} unchanged, {result.deleted} removed; "
+        f"{result.embed_calls} embedding calls in {result.elapsed_ms / 1000:.1f} s"
+    )
+    build_vector_index()
+    export_vector_snapshot(force=result.changed)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,73 @@
+"""Tests for memoised CAG results."""
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from backend.config import settings
+from backend.db.models import CagMatchCache
+from backend.services.cag_cache import DATABASE, MEMORY, CagCache, topic_key
+from backend.services.metrics import metrics
+
+MATCHES = [{"code": "AC9M5N06", "text": "fractions", "confidence": "high"}]
+
+
+@pytest.fixture
+def cache(db_session):
+    metrics.reset()
+    factory = sessionmaker(bind=db_session.get_bind())
+    yield CagCache(size=2, session_factory=factory)
+    metrics.reset()
+
+
+def test_topic_key_normalises_wording():
+    assert topic_key("Adding Fractions") == topic_key("fraction adding")
+    assert topic_key("the fractions for students") == topic_key("fractions")
+
+
+def test_round_trip_through_memory_and_table(cache, db_session):
+    assert cache.get("adding fractions", "Year 5", "Number", "v1", "m") is None
+    cache.put("adding fractions", "Year 5", "Number", "v1", "m", MATCHES)
+
+    hit = cache.get("Fractions adding", "Year 5", "Number", "v1", "m")
+    assert hit.matches == MATCHES and hit.source == MEMORY
+
+    cache.clear_memory()
+    hit = cache.get("adding fractions", "year 5", "number", "v1", "m")
+    assert hit.matches == MATCHES and hit.source == DATABASE
+    assert metrics.count("cag_cache.misses") == 1
+    assert len(metrics.samples("cag_cache.hit_age_s")) == 2
+
+
+def test_version_and_model_are_part_of_the_key(cache):
+    cache.put("fractions", "Year 5", "Number", "v1", "m", MATCHES)
+    assert cache.get("fractions", "Year 5", "Number", "v2", "m") is None
+    assert cache.get("fractions", "Year 5", "Number", "v1", "other-model") is None
+
+
+@pytest.mark.parametrize(
+    "setting, value",
+    [
+        ("CAG_MATCH_MODE", "hybrid"),
+        ("CAG_SHORTLIST_K", 0),
+        ("CAG_COMPACT_PROMPT", False),
+        ("CAG_HIERARCHICAL_THRESHOLD", 1),
+        ("CAG_STAGE1_GROUPS", 7),
+        ("CAG_STAGE1_PICKS", 1),
+    ],
+)
+def test_matcher_configuration_is_part_of_the_key(monkeypatch, setting, value):
+    key = CagCache.key("fractions", "Year 5", "Number", "v1", "m")
+    monkeypatch.setattr(settings, setting, value)
+    assert CagCache.key("fractions", "Year 5", "Number", "v1", "m") != key
+
+
+def test_new_curriculum_version_purges_old_rows(cache, db_session):
+    cache.put("fractions", "Year 5", "Number", "v1", "m", MATCHES)
+    cache.put("decimals", "Year 5", "Number", "v2", "m", MATCHES)
+    assert {row.curriculum_hash for row in db_session.query(CagMatchCache)} == {"v2"}
+
+
+def test_lru_evicts_oldest(cache):
+    for topic in ("fractions", "decimals", "percentages"):
+        cache.put(topic, "Year 5", "Number", "v1", "m", MATCHES)
+    assert len(cache._memory) == 2
@@ -0,0 +1,119 @@
+"""Tests for CAG response parsing."""
+
+import json
+
+from backend.config import settings
+from backend.services import cag_service
+from backend.services.cag_service import (
+    MatchStreamParser,
+    build_cag_prompt,
+    descriptor_catalogue,
+    parse_cag_response,
+    resolve_matches,
+)
+from backend.services.token_budget import count_tokens
+
+MATCHES = [
+    {"code": "AC9M5N06", "text": "solve problems {with braces}", "confidence": "high", "reason": "a \"quoted\" reason"},
+    {"code": "AC9M5N05", "text": "compare fractions", "confidence": "medium", "reason": "related"},
+    {"code": "AC9M4N03", "text": "fraction families", "confidence": "low", "reason": "prior year"},
+]
+
+
+def _chunks(text: str, size: int) -> list[str]:
+    return [text[i : i + size] for i in range(0, len(text), size)]
+
+
+def test_stream_parser_emits_each_match_when_complete():
+    text = "```json\n" + json.dumps(MATCHES, indent=2) + "\n```"
+    parser = MatchStreamParser()
+    emitted_at = []
+    for i, chunk in enumerate(_chunks(text, 7)):
+        for match in parser.feed(chunk):
+            emitted_at.append((i, match["code"]))
+
+    assert [code for _, code in emitted_at] == [m["code"] for m in MATCHES]
+    # The first match is available well before the response finishes
+    assert emitted_at[0][0] < len(_chunks(text, 7)) // 2
+    assert parser.matches == MATCHES
+
+
+def test_stream_parser_agrees_with_full_parse():
+    text = json.dumps(MATCHES)
+    parser = MatchStreamParser()
+    for chunk in _chunks(text, 1):
+        parser.feed(chunk)
+    assert parser.matches == parse_cag_response(text)
+
+
+def test_stream_parser_ignores_non_array_output():
+    parser = MatchStreamParser()
+    assert parser.feed('Sorry, {"code": "x"} is not a list') == []
+    assert parser.matches == []
+
+
+DESCRIPTORS = [
+    {"code": "AC9M5N05", "text": "compare  and order\nfractions", "year_level_code": "MATMATY5", "strand_title": "Number"},
+    {"code": "AC9M5N06", "text": "add fractions", "year_level_code": "MATMATY5", "strand_title": "Number"},
+    {"code": "AC9M5M01", "text": "measure area", "year_level_code": "MATMATY5", "strand_title": "Measurement"},
+]
+
+
+def test_compact_catalogue_groups_and_uses_local_ids():
+    block = descriptor_catalogue(DESCRIPTORS, compact=True)
+    assert block.splitlines() == [
+        "## MATMATY5 / Number",
+        "d1 compare and order fractions",
+        "d2 add fractions",
+        "## MATMATY5 / Measurement",
+        "d3 measure area",
+    ]
+    assert count_tokens(build_cag_prompt("x", "y", "z", DESCRIPTORS, compact=True)) < count_tokens(
+        build_cag_prompt("x", "y", "z", DESCRIPTORS, compact=False)
+    )
+
+
+def test_prompt_names_the_subjects_it_lists():
+    maths = [{**d, "subject_code": "MAT", "subject": "Mathematics"} for d in DESCRIPTORS]
+    prompt = build_cag_prompt("x", "y", "z", maths, compact=True)
+    assert "from the ACARA v9 Mathematics curriculum" in prompt
+    assert '"## <year level code> / <strand>"' in prompt
+
+    science = {**maths[0], "code": "AC9S5U01", "subject_code": "SCI", "subject": "Science"}
+    prompt = build_cag_prompt("x", "y", "z", [*maths, science], compact=True)
+    assert "from the ACARA v9 Mathematics and Science curriculum" in prompt
+    assert '"## <subject code> / <year level code> / <strand>"' in prompt
+    assert "## SCI / MATMATY5 / Number" in prompt
+    assert "Mathematics" not in build_cag_prompt("x", "y", "z", DESCRIPTORS, compact=True)
+
+
+def test_catalogue_is_keyed_by_subject():
+    first = [{**DESCRIPTORS[0], "subject_code": "MAT"}, {**DESCRIPTORS[1], "subject_code": "SCI"}]
+    swapped = [{**DESCRIPTORS[0], "subject_code": "SCI"}, {**DESCRIPTORS[1], "subject_code": "MAT"}]
+    assert descriptor_catalogue(first).startswith("## MAT / ")
+    assert descriptor_catalogue(swapped).startswith("## SCI / ")
+
+
+def test_catalogue_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(settings, "CAG_CATALOGUE_CACHE_SIZE", 2)
+    monkeypatch.setattr(cag_service, "_catalogue_cache", type(cag_service._catalogue_cache)())
+    full = descriptor_catalogue(DESCRIPTORS)
+    for i in range(5):
+        descriptor_catalogue([{**DESCRIPTORS[0], "code": f"AC9M5N{i}"}])
+        descriptor_catalogue(DESCRIPTORS)
+    assert len(cag_service._catalogue_cache) == 2
+    assert descriptor_catalogue(DESCRIPTORS) is full
+
+
+def test_local_ids_resolve_to_full_matches():
+    raw = [{"id": "d2", "confidence": "high", "reason": "adding"}, {"id": "d9"}, {"code": "AC9M5M01"}]
+    resolved = resolve_matches(raw, DESCRIPTORS)
+    assert [m["code"] for m in resolved] == ["AC9M5N06", "AC9M5M01"]
+    assert resolved[0] == {
+        "code": "AC9M5N06",
+        "text": "add fractions",
+        "year_level": "MATMATY5",
+        "strand": "Number",
+        "confidence": "high",
+        "reason": "adding",
+    }
@@ -0,0 +1,63 @@
+"""Tests for descriptor code decoding and the learning-progression graph."""
+
+from backend.services.curriculum_graph import CurriculumGraph, YearLevelInfo, decode_code, year_ordinal
+
+
+def _d(code, text, year, strand, subject="MAT"):
+    return {"code": code, "text": text, "year_level_code": year, "strand_title": strand, "subject_code": subject}
+
+
+DESCRIPTORS = [
+    _d("AC9M4N01", "recognise and represent place value of numbers beyond tens of thousands", "MATMATY4", "Number"),
+    _d("AC9M4N03", "recognise equivalent fractions and count by fractions", "MATMATY4", "Number"),
+    _d("AC9M5N01", "interpret and compare place value of numbers into the hundreds of thousands", "MATMATY5", "Number"),
+    _d("AC9M5N05", "compare and order fractions with related denominators", "MATMATY5", "Number"),
+    _d("AC9M6N05", "add and subtract fractions with related denominators", "MATMATY6", "Number"),
+    _d("AC9M5M03", "solve problems involving the perimeter and area of rectangles", "MATMATY5", "Measurement"),
+]
+YEAR_LEVELS = [
+    YearLevelInfo("MATMATFY", "Foundation Year", 0, "early_years", "MAT"),
+    YearLevelInfo("MATMATY4", "Year 4", 4, "primary", "MAT"),
+    YearLevelInfo("MATMATY5", "Year 5", 5, "primary", "MAT"),
+    YearLevelInfo("MATMATY6", "Year 6", 6, "primary", "MAT"),
+    YearLevelInfo("SCISCIY5", "Year 5", 5, "primary", "SCI"),
+]
+
+
+def test_decode_code():
+    assert decode_code("AC9M5N06") == decode_code("ac9m5n06")
+    d = decode_code("AC9M10SP02")
+    assert (d.learning_area, d.year, d.strand, d.number) == ("M", 10, "SP", 2)
+    assert decode_code("AC9MFN01").year == 0
+    assert decode_code("AC9HS5K01").learning_area == "HS"
+    assert decode_code("AC9LFR5C01").learning_area == "LFR"
+    assert decode_code("MATMATY5") is None
+    assert decode_code("") is None
+
+
+def test_year_ordinal():
+    assert year_ordinal("Year 5") == 5
+    assert year_ordinal("year 10") == 10
+    assert year_ordinal("Foundation Year") == 0
+    assert year_ordinal("MATMATY10") == 10
+    assert year_ordinal("MATMATFY") == 0
+    assert year_ordinal("Stage 2") is None
+
+
+def test_progressions_link_related_descriptors_in_adjacent_years():
+    graph = CurriculumGraph(DESCRIPTORS, YEAR_LEVELS)
+    assert graph.prior("AC9M5N05")[0].code == "AC9M4N03"
+    assert graph.next("AC9M5N05")[0].code == "AC9M6N05"
+    assert graph.next("AC9M4N01")[0].code == "AC9M5N01"
+    # No Year 4 or 6 Measurement descriptors to link to
+    assert graph.prior("AC9M5M03") == [] and graph.next("AC9M5M03") == []
+
+
+def test_year_level_lookup():
+    graph = CurriculumGraph(DESCRIPTORS, YEAR_LEVELS)
+    assert graph.year_level("Year 5").code == "MATMATY5"
+    assert graph.year_level("Year 5", subject_code="SCI").code == "SCISCIY5"
+    assert graph.year_level("Foundation").code == "MATMATFY"
+    assert graph.year_level("MATMATY6").title == "Year 6"
+    assert graph.year_level("Year 12") is None
+    assert [yl.code for yl in graph.adjacent_year_levels("MATMATY5")] == ["MATMATY4", "MATMATY6"]
@@ -0,0 +1,71 @@
+"""Tests for two-stage curriculum matching."""
+
+import random
+
+from backend.services.curriculum_groups import CurriculumGroups, build_group_prompt, parse_group_selection
+from backend.services.token_budget import count_tokens
+
+
+def _d(code, text, year, strand, subject="MAT"):
+    return {"code": code, "text": text, "year_level_code": year, "strand_title": strand, "subject_code": subject}
+
+
+DESCRIPTORS = [
+    _d("AC9M5N05", "compare and order fractions with related denominators", "MATMATY5", "Number"),
+    _d("AC9M5N06", "solve problems involving addition and subtraction of fractions", "MATMATY5", "Number"),
+    _d("AC9M5M03", "solve problems involving the perimeter and area of rectangles", "MATMATY5", "Measurement"),
+    _d("AC9S5U01", "examine how particular structural features help living things survive", "SCISCIY5",
+       "Biological sciences", "SCI"),
+    _d("AC9S5U02", "identify sources of light and how light travels in straight lines", "SCISCIY5",
+       "Physical sciences", "SCI"),
+]
+
+
+def test_descriptors_are_grouped_by_subject_year_and_strand():
+    groups = CurriculumGroups(DESCRIPTORS)
+    assert [g.label for g in groups.groups] == [
+        "MAT / MATMATY5 / Number",
+        "MAT / MATMATY5 / Measurement",
+        "SCI / SCISCIY5 / Biological sciences",
+        "SCI / SCISCIY5 / Physical sciences",
+    ]
+    assert [d["code"] for d in groups.descriptors_in(["g1", "g4", "missing"])] == [
+        "AC9M5N05", "AC9M5N06", "AC9S5U02",
+    ]
+
+
+def test_summaries_prefer_distinctive_terms():
+    groups = CurriculumGroups(DESCRIPTORS, {"AC9M5N05": ["fraction walls"]})
+    assert groups.groups[0].summary.startswith("fraction")
+    assert "light" in groups.groups[3].summary
+
+
+def test_group_shortlist_follows_the_topic():
+    groups = CurriculumGroups(DESCRIPTORS)
+    assert groups.shortlist("how light travels", 1)[0].label == "SCI / SCISCIY5 / Physical sciences"
+    assert groups.shortlist("adding fractions", 1, "MATMATY5", "Number")[0].id == "g1"
+
+
+def test_parse_group_selection_keeps_offered_ids_in_order():
+    groups = CurriculumGroups(DESCRIPTORS).groups[:3]
+    assert parse_group_selection('["g2", "g9", "g1", "g2", "g3"]', groups, 2) == ["g2", "g1"]
+    assert parse_group_selection('```json\n[{"id": "g3"}]\n```', groups, 3) == ["g3"]
+    assert parse_group_selection("no idea", groups, 3) == []
+
+
+def test_stage_prompts_do_not_grow_with_the_curriculum():
+    rng = random.Random(7)
+    words = ["fractions", "area", "energy", "habitats", "narrative", "timeline", "rhythm", "forces", "maps"]
+
+    def curriculum(n):
+        return [
+            _d(f"X{i}", " ".join(rng.choices(words, k=8)), f"Y{i % 11}", f"S{i % 4}", f"SUB{i % 10}")
+            for i in range(n)
+        ]
+
+    sizes = []
+    for n in (400, 4000):
+        groups = CurriculumGroups(curriculum(n))
+        offered = groups.shortlist("fractions area", 40)
+        sizes.append(count_tokens(build_group_prompt("fractions", "Year 5", "Number", offered, 3)))
+    assert sizes[1] <= sizes[0] * 1.2
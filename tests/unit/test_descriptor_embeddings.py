@@ -0,0 +1,50 @@
+"""Tests for the in-memory descriptor embedding matrix."""
+
+import numpy as np
+
+from backend.services.descriptor_embeddings import DescriptorEmbeddings, normalise_rows, to_matches
+
+
+def _d(code, year="MATMATY5", strand="Number"):
+    return {"code": code, "text": f"descriptor {code}", "year_level_code": year, "strand_title": strand}
+
+
+DESCRIPTORS = [_d("A"), _d("B"), _d("C", "MATMATY6"), _d("D", strand="Algebra")]
+MATRIX = normalise_rows(np.array([
+    [1.0, 0.0, 0.0],
+    [0.6, 0.8, 0.0],
+    [0.9, 0.1, 0.1],
+    [0.0, 0.0, 1.0],
+], dtype=np.float32))
+
+
+def test_top_k_is_sorted_cosine():
+    index = DescriptorEmbeddings(DESCRIPTORS, MATRIX)
+    ranked = index.top_k(np.array([1.0, 0.0, 0.0], dtype=np.float32), 3)
+    assert [d["code"] for d, _ in ranked] == ["A", "C", "B"]
+    assert ranked[0][1] == np.float32(1.0)
+
+
+def test_clear_winner_bypasses_llm():
+    index = DescriptorEmbeddings(DESCRIPTORS, MATRIX)
+    result = index.match(np.array([0.0, 0.0, 1.0], dtype=np.float32), 3)
+    assert result.bypass
+    assert result.candidates[0]["code"] == "D"
+    matches = to_matches(result)
+    assert matches[0]["code"] == "D" and matches[0]["confidence"] == "high"
+    # Distant runners-up are not returned as matches
+    assert len(matches) == 1
+
+
+def test_close_scores_go_to_llm():
+    index = DescriptorEmbeddings(DESCRIPTORS, MATRIX)
+    result = index.match(normalise_rows(np.array([[1.0, 0.05, 0.05]], dtype=np.float32))[0], 3)
+    assert not result.bypass
+    assert {d["code"] for d in result.candidates} == {"A", "B", "C"}
+
+
+def test_year_boost_changes_order():
+    index = DescriptorEmbeddings(DESCRIPTORS, MATRIX, {"Year 6": frozenset({"MATMATY6"})})
+    query = normalise_rows(np.array([[1.0, 0.05, 0.05]], dtype=np.float32))[0]
+    assert index.top_k(query, 1)[0][0]["code"] == "A"
+    assert index.top_k(query, 1, year_level="Year 6")[0][0]["code"] == "C"
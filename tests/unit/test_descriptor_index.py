@@ -0,0 +1,79 @@
+"""Tests for the BM25 descriptor shortlist."""
+
+from backend.db.models import YearLevel
+from backend.services.descriptor_index import DescriptorIndex, year_level_codes
+
+
+def _d(code, text, year, strand):
+    return {"code": code, "text": text, "year_level_code": year, "strand_title": strand}
+
+
+DESCRIPTORS = [
+    _d("AC9M4N03", "recognise equivalent fractions and count by fractions", "MATMATY4", "Number"),
+    _d("AC9M5N05", "compare and order fractions with related denominators", "MATMATY5", "Number"),
+    _d("AC9M5N06", "solve problems involving addition and subtraction of fractions", "MATMATY5", "Number"),
+    _d("AC9M5M03", "solve problems involving the perimeter and area of rectangles", "MATMATY5", "Measurement"),
+    _d("AC9M7A02", "solve linear equations with one variable", "MATMATY7", "Algebra"),
+    _d("AC9M5ST01", "acquire and record data in tables and column graphs", "MATMATY5", "Statistics"),
+]
+ELABORATIONS = {"AC9M5N05": ["using fraction walls to compare unit fractions"]}
+YEARS = {"Year 4": frozenset({"MATMATY4"}), "Year 5": frozenset({"MATMATY5"}), "Year 7": frozenset({"MATMATY7"})}
+
+
+def test_lexical_matches_rank_first():
+    index = DescriptorIndex(DESCRIPTORS, ELABORATIONS, YEARS)
+    codes = [d["code"] for d in index.shortlist("adding fractions problems", 3, year_boost=0, strand_boost=0)]
+    assert codes[0] == "AC9M5N06"
+    assert set(codes) <= {"AC9M5N06", "AC9M5N05", "AC9M4N03", "AC9M5M03"}
+
+
+def test_elaborations_are_indexed():
+    index = DescriptorIndex(DESCRIPTORS, ELABORATIONS, YEARS)
+    assert index.shortlist("fraction walls", 1, year_boost=0, strand_boost=0)[0]["code"] == "AC9M5N05"
+
+
+def test_year_and_strand_boosts_break_ties():
+    index = DescriptorIndex(DESCRIPTORS, ELABORATIONS, YEARS)
+    codes = [d["code"] for d in index.shortlist("equivalent fractions", 2, "Year 5", "Number", 0.5, 0.3)]
+    # The lexical winner stays; the boosted same-year fraction descriptors follow
+    assert codes[0] == "AC9M4N03"
+    assert codes[1] in ("AC9M5N05", "AC9M5N06")
+
+
+def test_unmatched_topic_falls_back_to_requested_year_and_strand():
+    index = DescriptorIndex(DESCRIPTORS, ELABORATIONS, YEARS)
+    shortlist = index.shortlist("zzz", 2, "Year 5", "Measurement", 0.5, 0.3)
+    assert shortlist[0]["code"] == "AC9M5M03"
+    assert shortlist[1]["year_level_code"] == "MATMATY5"
+
+
+def test_within_restricts_candidates():
+    index = DescriptorIndex(DESCRIPTORS, ELABORATIONS, YEARS)
+    codes = [d["code"] for d in index.shortlist("fractions", 5, within={"AC9M4N03", "AC9M7A02"})]
+    assert codes == ["AC9M4N03", "AC9M7A02"]
+
+
+def test_adjacent_years_get_a_smaller_boost():
+    index = DescriptorIndex(DESCRIPTORS, ELABORATIONS, YEARS)
+    codes = [d["code"] for d in index.shortlist("zzz", 6, "Year 5", year_boost=0.5, strand_boost=0, adjacent_boost=0.2)]
+    assert {code[:5] for code in codes[:4]} == {"AC9M5"}
+    # Year 4 is next to Year 5; Year 7 is not
+    assert codes[4:] == ["AC9M4N03", "AC9M7A02"]
+
+
+def test_year_titles_shared_by_subjects_boost_each_subject(db_session):
+    for i, (code, title) in enumerate([("MATMATY4", "Year 4"), ("MATMATY5", "Year 5"), ("SCISCIY5", "Year 5")]):
+        db_session.add(YearLevel(code=code, title=title, sort_order=i, band="primary"))
+    db_session.flush()
+    years = year_level_codes(db_session)
+    assert years["Year 5"] == {"MATMATY5", "SCISCIY5"}
+
+    descriptors = [
+        _d("AC9M4N01", "place value of numbers and fractions", "MATMATY4", "Number"),
+        _d("AC9M5N01", "place value of numbers and fractions", "MATMATY5", "Number"),
+        _d("AC9S5U01", "adaptations of living things", "SCISCIY5", "Biological sciences"),
+    ]
+    index = DescriptorIndex(descriptors, year_codes=years)
+    maths = {"AC9M4N01", "AC9M5N01"}
+    codes = [d["code"] for d in index.shortlist("fractions", 2, year_level="Year 5", within=maths)]
+    assert codes == ["AC9M5N01", "AC9M4N01"]
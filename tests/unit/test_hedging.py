@@ -0,0 +1,81 @@
+"""Tests for hedged LLM calls."""
+
+import asyncio
+
+import pytest
+
+from backend.services import hedging
+from backend.services.hedging import HedgeBudget, hedged_call
+from backend.services.metrics import metrics
+
+
+@pytest.fixture
+def hedging_on(monkeypatch):
+    metrics.reset()
+    monkeypatch.setattr(hedging.settings, "LLM_HEDGING_ENABLED", True)
+    monkeypatch.setattr(hedging.settings, "LLM_HEDGE_MIN_SAMPLES", 5)
+    monkeypatch.setattr(hedging.settings, "LLM_HEDGE_MIN_DELAY_MS", 10)
+    monkeypatch.setattr(hedging, "_budget", HedgeBudget(ratio=1.0, burst=5))
+    for _ in range(5):
+        metrics.observe("llm_latency.step", 20)
+
+
+def test_budget_caps_hedges():
+    budget = HedgeBudget(ratio=0.5, burst=1)
+    budget.earn()
+    assert not budget.try_spend()
+    budget.earn()
+    assert budget.try_spend()
+    assert not budget.try_spend()
+
+
+async def test_no_hedge_without_samples(monkeypatch):
+    metrics.reset()
+    monkeypatch.setattr(hedging.settings, "LLM_HEDGING_ENABLED", True)
+
+    async def call():
+        return "ok"
+
+    assert await hedged_call("fresh", call) == "ok"
+    assert metrics.count("hedge.fresh.sent") == 0
+    assert len(metrics.samples("llm_latency.fresh")) == 1
+
+
+async def test_slow_primary_is_hedged_and_cancelled(hedging_on):
+    calls = []
+    cancelled = []
+
+    async def call():
+        index = len(calls)
+        calls.append(index)
+        try:
+            await asyncio.sleep(1.0 if index == 0 else 0.01)
+        except asyncio.CancelledError:
+            cancelled.append(index)
+            raise
+        return index
+
+    assert await hedged_call("step", call) == 1
+    await asyncio.sleep(0)
+    assert cancelled == [0]
+    assert metrics.count("hedge.step.sent") == 1
+    assert metrics.count("hedge.step.won") == 1
+    # The cancelled primary still counts, at least as long as it ran
+    primary_ms, hedge_ms = sorted(metrics.samples("llm_latency.step")[5:], reverse=True)
+    assert primary_ms >= 20 and primary_ms > hedge_ms
+
+
+async def test_fast_primary_is_not_hedged(hedging_on):
+    async def call():
+        return "fast"
+
+    assert await hedged_call("step", call) == "fast"
+    assert metrics.count("hedge.step.sent") == 0
+
+
+async def test_errors_propagate(hedging_on):
+    async def call():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        await hedged_call("step", call)
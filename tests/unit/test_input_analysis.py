@@ -0,0 +1,132 @@
+"""Tests for the deterministic input analyzer fast path."""
+
+import json
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy.exc import OperationalError
+
+from backend.db.models import ContentDescriptor
+from backend.services import input_analysis
+from backend.services.input_analysis import TopicVocabulary, analyze, get_vocabulary, record_agreement
+from backend.services.metrics import metrics
+from backend.workflow.steps import input_analyzer
+
+DOCUMENTS = [
+    "solve problems involving addition and subtraction of fractions with the same denominator",
+    "compare and order fractions using fraction walls and number lines",
+    "recognise equivalent fractions and represent them on number lines",
+    "measure and compare the area of rectangles using square units",
+    "solve linear equations with one variable using algebraic techniques",
+    "represent data in tables and column graphs and interpret the results",
+]
+
+
+@pytest.fixture
+def vocabulary():
+    return TopicVocabulary(DOCUMENTS)
+
+
+def _params(topic, focus="fluency_practice"):
+    return {"topic": topic, "year_level": "Year 5", "strand": "Number", "teaching_focus": focus,
+            "resource_type": "task_set"}
+
+
+def test_structured_request_hits_fast_path(vocabulary):
+    result = analyze(_params("Equivalent fractions on number lines"), vocabulary)
+    assert result.reason == "hit"
+    parsed = result.parsed
+    assert parsed["intent"] == "practice"
+    assert parsed["year_level"] == "Year 5" and parsed["strand"] == "Number"
+    assert "fractions" in parsed["keywords"]
+    assert 3 <= len(parsed["keywords"]) <= 5
+
+
+def test_short_topic_is_padded_with_related_terms(vocabulary):
+    parsed = analyze(_params("fractions", "planning"), vocabulary).parsed
+    assert parsed["intent"] == "planning"
+    assert parsed["keywords"][0] == "fractions"
+    assert len(parsed["keywords"]) == 3
+
+
+@pytest.mark.parametrize("topic, reason", [
+    ("fractions or decimals?", "ambiguous"),
+    ("fractions for my kids who are struggling with the big football carnival homework sheet", "long_topic"),
+    ("quadratic parabola vertex", "low_overlap"),
+    ("the of and", "no_terms"),
+])
+def test_fallback_reasons(vocabulary, topic, reason):
+    result = analyze(_params(topic), vocabulary)
+    assert result.parsed is None
+    assert result.reason == reason
+
+
+def test_agreement_is_recorded():
+    metrics.reset()
+    fast = {"intent": "practice", "keywords": ["fractions", "number lines"]}
+    record_agreement(fast, {"intent": "Practice", "keywords": ["fraction", "equivalence"]})
+    record_agreement(fast, {"intent": "instruction", "keywords": ["area"]})
+    assert metrics.count("input_fastpath.shadow.compared") == 2
+    assert metrics.ratio("input_fastpath.shadow.intent_agree", "input_fastpath.shadow.compared") == 0.5
+    assert metrics.count("input_fastpath.shadow.keywords_overlap") == 1
+    metrics.reset()
+
+
+def test_vocabulary_is_rebuilt_when_the_curriculum_changes(db_session, monkeypatch):
+    version = {"hash": "v1"}
+    monkeypatch.setattr(input_analysis, "curriculum_hash", lambda db: version["hash"])
+    input_analysis.reset_vocabulary()
+    try:
+        db_session.add(ContentDescriptor(code="AC9M5N01", text="fractions", year_level_code="Y5", strand_title="N"))
+        db_session.flush()
+        first = get_vocabulary(db_session)
+        db_session.add(ContentDescriptor(code="AC9M5M01", text="perimeter", year_level_code="Y5", strand_title="M"))
+        db_session.flush()
+        term = input_analysis.normalise("perimeter")
+        assert get_vocabulary(db_session) is first and term not in first
+        version["hash"] = "v2"
+        assert term in get_vocabulary(db_session)
+    finally:
+        input_analysis.reset_vocabulary()
+
+
+async def test_unreachable_vocabulary_falls_back_to_the_llm(monkeypatch):
+    def unreachable():
+        raise OperationalError("SELECT", {}, Exception("could not connect"))
+
+    async def llm(params, lane):
+        return {"topic": params["topic"], "intent": "practice"}, None, 0
+
+    metrics.reset()
+    monkeypatch.setattr(input_analyzer.settings, "INPUT_FASTPATH_ENABLED", True)
+    monkeypatch.setattr(input_analyzer, "load_vocabulary", unreachable)
+    monkeypatch.setattr(input_analyzer, "_llm_analyze", llm)
+    state = {"params": _params("Equivalent fractions")}
+    output = await input_analyzer.input_analyzer_step(None, SimpleNamespace(session_state=state))
+    assert json.loads(output.content)["intent"] == "practice"
+    assert metrics.count("input_fastpath.fallback.error") == 1
+
+
+@pytest.mark.parametrize("lane, hedged", [("interactive", True), ("batch", False)])
+async def test_hedge_runs_inside_the_governor_on_the_interactive_lane_only(monkeypatch, lane, hedged):
+    order = []
+
+    async def arun(prompt):
+        order.append("provider")
+        return SimpleNamespace(content='{"topic": "fractions"}', metrics=None)
+
+    async def governed(model, estimated, call, lane):
+        order.append(f"governor:{lane}")
+        return await call(), 0
+
+    async def hedged_call(step, call):
+        order.append(f"hedge:{step}")
+        return await call()
+
+    agent = SimpleNamespace(model=SimpleNamespace(id="m", max_tokens=100), arun=arun)
+    monkeypatch.setattr(input_analyzer, "get_input_analyzer", lambda: agent)
+    monkeypatch.setattr(input_analyzer.governor, "run", governed)
+    monkeypatch.setattr(input_analyzer, "hedged_call", hedged_call)
+    parsed, _, _ = await input_analyzer._llm_analyze(_params("fractions"), lane)
+    assert parsed == {"topic": "fractions"}
+    assert order == [f"governor:{lane}", *(["hedge:input_analyzer"] if hedged else []), "provider"]
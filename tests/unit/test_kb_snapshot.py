@@ -0,0 +1,76 @@
+"""Tests for portable knowledge base snapshots."""
+
+import json
+
+import numpy as np
+import pytest
+
+from backend.knowledge.kb_snapshot import (
+    FORMAT_VERSION,
+    Snapshot,
+    SnapshotMismatch,
+    check_compatible,
+    copy_rows,
+    read_snapshot,
+    write_snapshot,
+)
+
+MODEL = "text-embedding-3-small"
+
+
+def _snapshot(rows: int = 3, dims: int = 4) -> Snapshot:
+    rng = np.random.default_rng(1)
+    return Snapshot(
+        header={"format": FORMAT_VERSION, "model": MODEL, "dimensions": dims, "rows": rows},
+        chunks=[
+            {
+                "id": f"elaboration:AC9M5N0{i}",
+                "name": f"AC9M5N0{i}",
+                "content": f"Descriptor {i} – fractions",
+                "meta_data": {"doc_type": "elaboration", "year": 5},
+                "content_hash": f"h{i}",
+            }
+            for i in range(rows)
+        ],
+        embeddings=rng.normal(size=(rows, dims)).astype(np.float32),
+    )
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "kb.snapshot"
+    original = _snapshot()
+    size = write_snapshot(path, original)
+    assert size == path.stat().st_size
+    assert [p.name for p in tmp_path.iterdir()] == ["kb.snapshot"]  # no .npz suffix, no temp file left
+    loaded = read_snapshot(path)
+    assert loaded.header == original.header
+    assert loaded.chunks == original.chunks
+    assert np.array_equal(loaded.embeddings, original.embeddings)
+
+
+def test_unknown_format_is_rejected(tmp_path):
+    snapshot = _snapshot()
+    snapshot.header["format"] = 99
+    write_snapshot(tmp_path / "kb.snapshot", snapshot)
+    with pytest.raises(ValueError):
+        read_snapshot(tmp_path / "kb.snapshot")
+
+
+def test_compatibility_checks():
+    snapshot = _snapshot(dims=4)
+    check_compatible(snapshot, MODEL, 4)
+    check_compatible(snapshot, MODEL, None)
+    with pytest.raises(SnapshotMismatch):
+        check_compatible(snapshot, "text-embedding-3-large", 4)
+    with pytest.raises(SnapshotMismatch):
+        check_compatible(snapshot, MODEL, 1536)
+
+
+def test_copy_rows_are_exact():
+    snapshot = _snapshot(rows=2)
+    rows = list(copy_rows(snapshot))
+    assert [r[0] for r in rows] == ["elaboration:AC9M5N00", "elaboration:AC9M5N01"]
+    assert json.loads(rows[0][2]) == {"doc_type": "elaboration", "year": 5}
+    vector = np.array(json.loads(rows[1][4]), dtype=np.float32)
+    assert np.array_equal(vector, snapshot.embeddings[1])
+    assert rows[1][5] == "h1"
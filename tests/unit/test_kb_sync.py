@@ -0,0 +1,66 @@
+"""Tests for the incremental knowledge base sync."""
+
+import threading
+import time
+
+import pytest
+
+from backend.knowledge.kb_sync import SourceChunk, chunk_hash, embed_batches, plan_sync
+
+MODEL, DIMS = "text-embedding-3-small", 1536
+
+A = SourceChunk("elaboration:AC9M5N06", "AC9M5N06", "Equivalent fractions", {"doc_type": "elaboration"})
+B = SourceChunk("pedagogy:differentiation:1", "differentiation", "Enabling prompts")
+C = SourceChunk("pedagogy:explicit_instruction:1", "explicit_instruction", "I do, we do, you do")
+
+
+def test_plan_embeds_only_new_and_changed_chunks():
+    existing = {
+        A.id: chunk_hash(A, MODEL, DIMS),
+        B.id: chunk_hash(SourceChunk(B.id, B.name, "old text"), MODEL, DIMS),
+        "pedagogy:removed:1": "x",
+    }
+    plan = plan_sync([A, B, C], existing, MODEL, DIMS)
+    assert plan.new == [C]
+    assert plan.changed == [B]
+    assert plan.unchanged == 1
+    assert plan.deleted == ["pedagogy:removed:1"]
+    assert plan.to_embed == [C, B]
+
+
+def test_hash_covers_the_embedder():
+    assert chunk_hash(A, MODEL, DIMS) == chunk_hash(A, MODEL, DIMS)
+    assert chunk_hash(A, MODEL, 512) != chunk_hash(A, MODEL, DIMS)
+    assert chunk_hash(A, "text-embedding-3-large", DIMS) != chunk_hash(A, MODEL, DIMS)
+    existing = {A.id: chunk_hash(A, MODEL, DIMS)}
+    assert plan_sync([A], existing, "text-embedding-3-large", DIMS).changed == [A]
+
+
+def test_embed_batches_keep_order_and_bound_concurrency():
+    in_flight, peak, lock = [0], [0], threading.Lock()
+
+    def embed(batch):
+        with lock:
+            in_flight[0] += 1
+            peak[0] = max(peak[0], in_flight[0])
+        time.sleep(0.01)
+        with lock:
+            in_flight[0] -= 1
+        return [[float(len(text))] for text in batch]
+
+    texts = ["x" * i for i in range(1, 24)]
+    embeddings, calls = embed_batches(texts, embed, batch_size=5, concurrency=2)
+    assert embeddings == [[float(i)] for i in range(1, 24)]
+    assert calls == 5
+    assert peak[0] <= 2
+    assert embed_batches([], embed, 5, 2) == ([], 0)
+
+
+def test_embed_batches_reject_short_responses():
+    with pytest.raises(RuntimeError):
+        embed_batches(["a", "b"], lambda batch: [[0.0]], batch_size=2, concurrency=1)
+
+
+def test_hash_covers_metadata():
+    retagged = SourceChunk(B.id, B.name, B.content, {"doc_type": "pedagogy", "teaching_focus": None})
+    assert chunk_hash(retagged, MODEL, DIMS) != chunk_hash(B, MODEL, DIMS)
@@ -0,0 +1,83 @@
+"""Tests for shared agents, pooled clients and the metrics registry."""
+
+from types import SimpleNamespace
+
+from backend.services import llm_pool, token_budget
+from backend.services.metrics import Metrics, metrics, percentile
+from backend.services.token_budget import count_tokens
+from backend.workflow.agents import (
+    get_cag_matcher,
+    get_input_analyzer,
+    get_resource_generator,
+    prompt_overhead_tokens,
+    reset_agents,
+)
+
+
+class _Stream:
+    """Stand-in for an httpcore network stream (weak-referenceable)."""
+
+
+def test_agents_are_shared_across_calls():
+    reset_agents()
+    assert get_input_analyzer() is get_input_analyzer()
+    assert get_cag_matcher() is get_cag_matcher()
+    assert get_resource_generator() is not get_cag_matcher()
+
+
+def test_agents_share_pooled_clients(monkeypatch):
+    monkeypatch.setattr(llm_pool.settings, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(llm_pool, "_clients", {})
+    reset_agents()
+    analyzer = get_input_analyzer()
+    generator = get_resource_generator()
+    assert analyzer.model.get_client() is generator.model.get_client()
+    assert analyzer.model.get_async_client() is llm_pool.get_async_openai_client()
+    assert generator.model.get_async_client()._client is llm_pool.get_async_http_client()
+
+
+def test_prompt_overhead_covers_the_system_message(monkeypatch):
+    monkeypatch.setattr(token_budget, "_scale", 1.0)
+    reset_agents()
+    generator = get_resource_generator()
+    overhead = prompt_overhead_tokens(generator)
+    instructions = count_tokens("\n".join(generator.instructions))
+    # The instructions, the markdown note and the framing of two messages
+    assert overhead > instructions + 8
+    assert overhead < instructions + 60
+    assert prompt_overhead_tokens(get_cag_matcher()) < overhead
+
+
+def test_connection_reuse_is_counted():
+    metrics.reset()
+    stream = _Stream()
+    response = SimpleNamespace(extensions={"network_stream": stream})
+    llm_pool._record_connection(response)
+    llm_pool._record_connection(response)
+    llm_pool._record_connection(SimpleNamespace(extensions={"network_stream": _Stream()}))
+
+    stats = llm_pool.pool_stats()
+    assert stats["requests"] == 3
+    assert stats["connections_opened"] == 2
+    assert stats["connections_reused"] == 1
+    assert abs(stats["reuse_rate"] - 1 / 3) < 1e-9
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) in (50, 51)
+    assert percentile(values, 99) == 99
+    assert percentile([], 50) is None
+
+
+def test_metrics_snapshot():
+    m = Metrics(window=3)
+    m.incr("calls")
+    m.incr("calls", 2)
+    for v in (10, 20, 30, 40):
+        m.observe("latency", v)
+    snap = m.snapshot()
+    assert snap["counters"]["calls"] == 3
+    # Window keeps only the last three samples
+    assert snap["latency_ms"]["latency"]["count"] == 3
+    assert snap["latency_ms"]["latency"]["p50"] == 30
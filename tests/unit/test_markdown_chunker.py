@@ -0,0 +1,81 @@
+"""Tests for the heading-aware markdown chunker."""
+
+from backend.knowledge.markdown_chunker import chunk_markdown
+from backend.services.token_budget import count_tokens
+
+DOC = """# Differentiation
+
+## Scaffolding Strategies
+Teachers adjust support in two directions:
+
+### Enabling Prompts
+- Simplify the numbers
+- Provide a visual model
+  or manipulative
+
+- Break the problem into smaller steps
+
+### Extending Prompts
+- "Can you write a rule that always works?"
+
+## Comparison
+
+| Option | Complexity |
+|--------|------------|
+| A      | Lower      |
+| B      | Higher     |
+
+```
+# not a heading
+```
+"""
+
+
+def test_sections_carry_their_heading_path():
+    chunks = chunk_markdown(DOC, max_tokens=200)
+    assert [c.heading_path for c in chunks] == [
+        ("Differentiation", "Scaffolding Strategies", "Enabling Prompts"),
+        ("Differentiation", "Scaffolding Strategies", "Extending Prompts"),
+        ("Differentiation", "Comparison"),
+    ]
+    assert chunks[0].content.startswith("Differentiation > Scaffolding Strategies > Enabling Prompts\n\n")
+    assert chunks[0].section == "Enabling Prompts"
+
+
+def test_short_lead_in_joins_the_first_subsection():
+    first, second, _ = chunk_markdown(DOC, max_tokens=200)
+    assert "Teachers adjust support in two directions:" in first.content
+    assert "two directions" not in second.content
+
+
+def test_lists_tables_and_code_stay_whole():
+    enabling, _, comparison = chunk_markdown(DOC, max_tokens=200)
+    assert "- Provide a visual model\n  or manipulative\n\n- Break the problem" in enabling.content
+    assert "| B      | Higher     |" in comparison.content
+    assert "```\n# not a heading\n```" in comparison.content
+    # A table longer than the window is still one chunk
+    chunks = chunk_markdown(DOC, max_tokens=30)
+    assert sum("|--------|" in c.content for c in chunks) == 1
+    assert any("| A      | Lower      |\n| B" in c.content for c in chunks)
+
+
+def test_long_sections_are_windowed_with_overlap():
+    sentences = [f"Sentence number {i} talks about fractions and decimals." for i in range(40)]
+    doc = "# Guide\n\n## Practice\n" + " ".join(sentences[:20]) + "\n\n" + " ".join(sentences[20:])
+    chunks = chunk_markdown(doc, max_tokens=80, overlap_tokens=20)
+    assert len(chunks) > 3
+    assert all(count_tokens(c.content) <= 80 for c in chunks)
+    assert all(c.heading_path == ("Guide", "Practice") for c in chunks)
+    for before, after in zip(chunks, chunks[1:]):
+        body = after.content.split("\n\n", 1)[1]
+        first_sentence = body.split(". ")[0]
+        assert first_sentence in before.content
+    text = " ".join(c.content for c in chunks)
+    assert all(s in text for s in sentences)
+
+
+def test_no_overlap_when_disabled():
+    doc = "## Practice\n\n" + "\n\n".join(f"Paragraph {i} about area and perimeter." for i in range(30))
+    chunks = chunk_markdown(doc, max_tokens=40)
+    bodies = [c.content.split("\n\n", 1)[1] for c in chunks]
+    assert sum(b.count("Paragraph") for b in bodies) == 30
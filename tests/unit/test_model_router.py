@@ -0,0 +1,64 @@
+"""Tests for the per-step model routing table."""
+
+import pytest
+
+from backend.services import model_router
+from backend.services.metrics import metrics
+from backend.services.model_router import HIGH, NORMAL, current_load_level, select_route
+from backend.workflow.agents import get_resource_generator, reset_agents
+
+
+@pytest.fixture(autouse=True)
+def _clean_metrics():
+    metrics.reset()
+    yield
+    metrics.reset()
+
+
+def test_default_generator_route_uses_generation_model():
+    route = select_route("resource_generator", resource_type="worked_example_study", load_level=NORMAL)
+    assert route.model == model_router.settings.OPENAI_MODEL_GENERATION
+    assert route.max_tokens == 4000
+
+
+def test_exit_ticket_routes_to_fast_model():
+    route = select_route("resource_generator", resource_type="exit_ticket", load_level=NORMAL)
+    assert route.model == model_router.settings.OPENAI_MODEL_FAST
+
+
+def test_high_load_degrades_generator():
+    route = select_route("resource_generator", resource_type="task_set", load_level=HIGH)
+    assert route.model == model_router.settings.OPENAI_MODEL_FAST
+    assert route.load_level == HIGH
+
+
+def test_most_specific_rule_wins(monkeypatch):
+    monkeypatch.setattr(model_router.settings, "MODEL_ROUTING_TABLE", [
+        {"step": "resource_generator", "model": "generation"},
+        {"step": "resource_generator", "year_band": "early_years", "model": "gpt-4.1-mini", "max_tokens": 900},
+    ])
+    assert select_route("resource_generator", year_band="early_years").model == "gpt-4.1-mini"
+    assert select_route("resource_generator", year_band="secondary").model == (
+        model_router.settings.OPENAI_MODEL_GENERATION
+    )
+
+
+def test_queue_depth_raises_load_level(monkeypatch):
+    monkeypatch.setattr(model_router.settings, "MODEL_ROUTING_QUEUE_THRESHOLD", 2)
+    assert current_load_level() == NORMAL
+    metrics.incr("generations.in_flight", 2)
+    assert current_load_level() == HIGH
+
+
+def test_observed_latency_raises_load_level(monkeypatch):
+    monkeypatch.setattr(model_router.settings, "MODEL_ROUTING_LATENCY_THRESHOLD_MS", 1000)
+    for _ in range(10):
+        metrics.observe("llm_latency.resource_generator", 5000)
+    assert current_load_level() == HIGH
+
+
+def test_generator_factory_uses_routed_model():
+    reset_agents()
+    agent = get_resource_generator(resource_type="exit_ticket")
+    assert agent.model.id == model_router.settings.OPENAI_MODEL_FAST
+    assert agent.model.max_tokens == 1500
@@ -0,0 +1,129 @@
+"""Tests for the memory-mapped NumPy vector backend."""
+
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from pgvector.sqlalchemy import Vector
+from sqlalchemy import JSON, Column, MetaData, String, Table, Text
+
+from backend.knowledge import numpy_store
+from backend.knowledge.numpy_store import NumpyVectorStore, current_snapshot, export_snapshot, snapshot_version
+from backend.knowledge.pedagogy_search import Scope
+
+TABLE = Table(
+    "pedagogy_vectors",
+    MetaData(),
+    Column("id", String, primary_key=True),
+    Column("name", String),
+    Column("meta_data", JSON),
+    Column("content", Text),
+    Column("embedding", Vector(3)),
+)
+
+CHUNKS = [
+    ("a", "AC9M5N06", {"doc_type": "elaboration", "descriptor_code": "AC9M5N06", "year": 5, "strand": "number"},
+     "Equivalent fractions with a common denominator", [1.0, 0.0, 0.0]),
+    ("b", "AC9M9A01", {"doc_type": "elaboration", "descriptor_code": "AC9M9A01", "year": 9, "strand": "algebra"},
+     "Expand binomial products", [0.9, 0.1, 0.0]),
+    ("c", "explicit_instruction", {"doc_type": "pedagogy", "teaching_focus": "explicit_instruction"},
+     "Worked examples and guided practice", [0.0, 1.0, 0.0]),
+    ("d", "mathematical_proficiencies", {"doc_type": "pedagogy", "teaching_focus": None},
+     "Fluency, reasoning and problem solving", [0.0, 0.0, 2.0]),
+]
+
+
+def _vector_db(chunks=CHUNKS):
+    rows = [
+        SimpleNamespace(id=i, name=n, meta_data=m, content=c, embedding=np.array(e, dtype=np.float32))
+        for i, n, m, c, e in chunks
+    ]
+
+    @contextmanager
+    def connect():
+        yield SimpleNamespace(execute=lambda stmt: SimpleNamespace(fetchall=lambda: rows))
+
+    return SimpleNamespace(
+        table=TABLE,
+        db_engine=SimpleNamespace(connect=connect),
+        embedder=SimpleNamespace(id="text-embedding-3-small"),
+    )
+
+
+@pytest.fixture
+def store(tmp_path):
+    name = export_snapshot(_vector_db(), "4:v1", tmp_path)
+    return NumpyVectorStore(tmp_path / name)
+
+
+def test_export_is_normalised_and_current(tmp_path, store):
+    assert current_snapshot(tmp_path) == store.name
+    assert snapshot_version(tmp_path) == "4:v1"
+    assert isinstance(store.embeddings, np.memmap)
+    assert np.allclose(np.linalg.norm(store.embeddings, axis=1), 1.0)
+
+
+def test_vector_search_ranks_by_cosine(store):
+    docs = store.search([1.0, 0.05, 0.0], [], limit=2, mode="vector")
+    assert [d.name for d in docs] == ["AC9M5N06", "AC9M9A01"]
+    assert docs[0].meta_data["similarity_score"] > docs[1].meta_data["similarity_score"]
+
+
+def test_scope_matches_the_sql_rules(store):
+    scope = Scope(codes=("AC9M5N06",), years=(4, 5, 6), strands=("number",), teaching_focus="fluency_practice")
+    assert store.mask(scope).tolist() == [True, False, False, True]
+    assert store.mask(Scope()).all()
+
+
+def test_keyword_and_hybrid_modes(store):
+    docs = store.search(None, ["denominators"], limit=3, mode="keyword")
+    assert [d.name for d in docs] == ["AC9M5N06"]
+    docs = store.search([0.0, 0.0, 1.0], ["fractions"], limit=2, mode="hybrid")
+    assert {d.name for d in docs} == {"AC9M5N06", "mathematical_proficiencies"}
+
+
+def test_new_snapshot_is_picked_up_and_old_ones_pruned(tmp_path, monkeypatch):
+    monkeypatch.setattr(numpy_store.settings, "RAG_NUMPY_SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(numpy_store, "SNAPSHOT_CHECK_S", 0.0)
+    numpy_store.reset_store()
+    try:
+        export_snapshot(_vector_db(), "4:v1")
+        assert len(numpy_store.get_store()) == 4
+        export_snapshot(_vector_db(CHUNKS[:2]), "2:v2")
+        latest = export_snapshot(_vector_db(CHUNKS[:1]), "1:v3")
+        assert numpy_store.get_store().name == latest
+        assert len(numpy_store.get_store()) == 1
+        assert len([p for p in tmp_path.iterdir() if p.is_dir()]) == numpy_store.KEEP_SNAPSHOTS
+    finally:
+        numpy_store.reset_store()
+
+
+def test_missing_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(numpy_store.settings, "RAG_NUMPY_SNAPSHOT_DIR", str(tmp_path / "none"))
+    numpy_store.reset_store()
+    with pytest.raises(FileNotFoundError):
+        numpy_store.get_store()
+
+
+def test_every_teaching_focus_reaches_its_guides(tmp_path):
+    from backend.knowledge.chunk_metadata import pedagogy_metadata
+    from backend.services.rag_prefetch import build_rag_scope
+    from backend.workflow.steps.teaching_router import TEACHING_FOCUS_NOTES
+    from scripts.seed_knowledge import DATA_DIR
+
+    guides = sorted(p.stem for p in (DATA_DIR / "pedagogy").glob("*.md"))
+    chunks = [(g, g, pedagogy_metadata(g), g, [1.0, 0.0, 0.0]) for g in guides]
+    store = NumpyVectorStore(tmp_path / export_snapshot(_vector_db(chunks), "5:v1", tmp_path))
+    general = {"differentiation", "mathematical_proficiencies"}
+    expected = {
+        "explicit_instruction": general | {"explicit_instruction"},
+        "deep_learning_inquiry": general | {"inquiry_based_learning"},
+        "fluency_practice": general,
+        "assessment_feedback": general | {"assessment_strategies"},
+        "planning": set(guides),
+    }
+    assert set(expected) == set(TEACHING_FOCUS_NOTES)
+    for focus, reachable in expected.items():
+        scope = build_rag_scope({"topic": "fractions", "year_level": "Year 5"}, [], focus)
+        assert {g for g, passes in zip(guides, store.mask(scope)) if passes} == reachable, focus
@@ -0,0 +1,111 @@
+"""Tests for the shared pedagogy knowledge base."""
+
+import threading
+
+from backend.db.session import engine
+from backend.knowledge import pedagogy_kb
+from backend.services import llm_pool
+
+
+def _pooled(monkeypatch):
+    monkeypatch.setattr(llm_pool.settings, "OPENAI_API_KEY", "sk-test")
+    monkeypatch.setattr(llm_pool, "_clients", {})
+    pedagogy_kb.reset_knowledge_base()
+
+
+def test_vector_db_uses_the_app_engine_and_pooled_client(monkeypatch):
+    _pooled(monkeypatch)
+    vector_db = pedagogy_kb.build_vector_db(engine)
+    assert vector_db.db_engine is engine
+    assert vector_db.embedder.openai_client is llm_pool.get_openai_client()
+
+
+def test_concurrent_first_use_builds_one_instance(monkeypatch):
+    _pooled(monkeypatch)
+    built = []
+    monkeypatch.setattr(pedagogy_kb, "build_knowledge_base", lambda e: built.append(e) or object())
+    barrier = threading.Barrier(8)
+    seen = []
+
+    def use():
+        barrier.wait()
+        seen.append(pedagogy_kb.get_knowledge_base())
+
+    threads = [threading.Thread(target=use) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert built == [engine]
+    assert all(kb is seen[0] for kb in seen)
+    pedagogy_kb.reset_knowledge_base()
+
+
+def test_repeated_queries_skip_the_embedding_call(monkeypatch, db_session):
+    from agno.knowledge.embedder.openai import OpenAIEmbedder
+    from sqlalchemy.orm import sessionmaker
+
+    from backend.services.rag_cache import EmbeddingCache
+
+    calls = []
+    monkeypatch.setattr(OpenAIEmbedder, "get_embedding", lambda self, text: calls.append(text) or [0.1, 0.2])
+    cache = EmbeddingCache(size=4, session_factory=sessionmaker(bind=db_session.get_bind()))
+    embedder = pedagogy_kb.CachedOpenAIEmbedder(id="text-embedding-3-small", cache=cache)
+    assert embedder.get_embedding("fractions") == embedder.get_embedding("fractions")
+    assert calls == ["fractions"]
+
+
+def test_batched_embeddings_call_once_for_the_misses(monkeypatch, db_session):
+    from types import SimpleNamespace
+
+    from agno.knowledge.embedder.openai import OpenAIEmbedder
+    from sqlalchemy.orm import sessionmaker
+
+    from backend.services.rag_cache import EmbeddingCache
+
+    calls = []
+
+    def response(self, text):
+        calls.append(text)
+        data = [SimpleNamespace(index=i, embedding=[float(len(t))]) for i, t in enumerate(text)]
+        return SimpleNamespace(data=data[::-1])
+
+    monkeypatch.setattr(OpenAIEmbedder, "response", response)
+    cache = EmbeddingCache(size=8, session_factory=sessionmaker(bind=db_session.get_bind()))
+    embedder = pedagogy_kb.CachedOpenAIEmbedder(id="text-embedding-3-small", cache=cache)
+    cache.put("area", embedder.id, embedder.dimensions, [9.0])
+    assert embedder.get_embeddings(["fractions", "area", "volume", "fractions"]) == [[9.0], [9.0], [6.0], [9.0]]
+    assert calls == [["fractions", "volume"]]
+    assert embedder.get_embeddings(["volume", "area"]) == [[6.0], [9.0]]
+    assert len(calls) == 1
+
+
+def test_query_embedder_caches_in_process_only(monkeypatch):
+    from agno.knowledge.embedder.openai import OpenAIEmbedder
+
+    from backend.services.rag_cache import EmbeddingCache
+
+    _pooled(monkeypatch)
+    cache = EmbeddingCache(size=4, session_factory=None)
+    monkeypatch.setattr(pedagogy_kb, "memory_embedding_cache", cache)
+    calls = []
+    monkeypatch.setattr(OpenAIEmbedder, "get_embedding", lambda self, text: calls.append(text) or [0.3])
+    embedder = pedagogy_kb.get_query_embedder()
+    assert embedder.cache is cache and embedder.openai_client is llm_pool.get_openai_client()
+    assert embedder.get_embedding("area") == embedder.get_embedding("area") == [0.3]
+    assert calls == ["area"]
+    pedagogy_kb.reset_knowledge_base()
+
+
+def test_chunk_metadata():
+    from backend.knowledge.chunk_metadata import elaboration_metadata, pedagogy_metadata
+
+    assert elaboration_metadata("AC9M5N06", "MATMATY5", " Number ") == {
+        "doc_type": "elaboration",
+        "descriptor_code": "AC9M5N06",
+        "year": 5,
+        "strand": "number",
+    }
+    assert elaboration_metadata("LEGACY-1", "Foundation Year", None)["year"] == 0
+    assert pedagogy_metadata("inquiry_based_learning") == {"doc_type": "pedagogy", "teaching_focus": "deep_learning_inquiry"}
+    assert pedagogy_metadata("mathematical_proficiencies")["teaching_focus"] is None
@@ -0,0 +1,158 @@
+"""Tests for pedagogy search mode selection and keyword queries."""
+
+from types import SimpleNamespace
+
+import pytest
+from agno.exceptions import EmbeddingError
+from agno.knowledge.document import Document
+
+from backend.knowledge import pedagogy_search
+from backend.knowledge.pedagogy_search import Scope, keyword_terms
+from backend.services.metrics import metrics
+
+
+class _Embedder:
+    def __init__(self, embedding):
+        self.embedding = embedding
+        self.calls = 0
+
+    def get_embedding(self, text):
+        self.calls += 1
+        return self.embedding
+
+
+@pytest.fixture
+def searches(monkeypatch):
+    calls = []
+    vector_db = SimpleNamespace(embedder=_Embedder([0.1, 0.2]))
+    monkeypatch.setattr(pedagogy_search, "get_knowledge_base", lambda: SimpleNamespace(vector_db=vector_db))
+    for name in ("vector_search", "keyword_search", "hybrid_search"):
+        monkeypatch.setattr(pedagogy_search, name, lambda *a, _n=name, **kw: calls.append(_n) or [_n])
+    return SimpleNamespace(calls=calls, embedder=vector_db.embedder)
+
+
+def test_keyword_terms_or_content_words():
+    assert keyword_terms("Adding the fractions with unlike denominators, adding") == (
+        "adding | fractions | unlike | denominators"
+    )
+    assert keyword_terms("to be or is") == ""
+
+
+def test_keyword_terms_drop_tsquery_syntax():
+    assert keyword_terms("two-digit & <-> (area) | 'perimeter':*") == "two | digit | area | perimeter"
+
+
+def test_scope_clause():
+    clause, params = Scope(codes=("AC9M5N06",), years=(4, 5, 6), strands=("number",), teaching_focus="planning").clause()
+    assert "descriptor_code = ANY(:scope_codes) OR (year_ordinal = ANY(:scope_years) AND strand = ANY(:scope_strands))" in clause
+    assert "teaching_focus IS NULL OR teaching_focus = :scope_focus" in clause
+    assert clause.startswith("(doc_type IS NULL")
+    assert params["scope_codes"] == ["AC9M5N06"] and params["scope_years"] == [4, 5, 6]
+    assert params["scope_focus"] == "planning"
+
+
+def test_empty_scope_filters_nothing_by_type():
+    clause, params = Scope().clause()
+    assert "doc_type = :scope_elaboration AND (TRUE)" in clause
+    assert "doc_type = :scope_pedagogy AND TRUE" in clause
+    assert set(params) == {"scope_elaboration", "scope_pedagogy"}
+
+
+def test_modes_dispatch(searches, monkeypatch):
+    monkeypatch.setattr(pedagogy_search.settings, "RAG_SEARCH_MODE", "hybrid")
+    assert pedagogy_search.search("equivalent fractions") == ["hybrid_search"]
+    assert pedagogy_search.search("equivalent fractions", mode="vector") == ["vector_search"]
+    assert pedagogy_search.search("equivalent fractions", mode="keyword") == ["keyword_search"]
+    # Keyword search needs no embedding
+    assert searches.embedder.calls == 2
+
+
+def test_hybrid_without_content_words_is_vector_only(searches):
+    assert pedagogy_search.search("the and of", mode="hybrid") == ["vector_search"]
+    assert pedagogy_search.search("the and of", mode="keyword") == []
+
+
+def test_missing_embedding_falls_back_to_keywords(searches):
+    searches.embedder.embedding = []
+    assert pedagogy_search.search("number line", mode="hybrid") == ["keyword_search"]
+
+
+class _OfflineEmbedder:
+    def get_embedding(self, text):
+        raise EmbeddingError("Connection error.", model_id="text-embedding-3-small")
+
+    def get_embeddings(self, texts):
+        raise EmbeddingError("Connection error.", model_id="text-embedding-3-small")
+
+
+def test_unreachable_embedder_falls_back_to_keywords(monkeypatch, searches):
+    vector_db = SimpleNamespace(embedder=_OfflineEmbedder())
+    monkeypatch.setattr(pedagogy_search, "get_knowledge_base", lambda: SimpleNamespace(vector_db=vector_db))
+    before = metrics.count("rag.embedding_fallbacks")
+    assert pedagogy_search.search("number line", mode="hybrid") == ["keyword_search"]
+
+    monkeypatch.setattr(
+        pedagogy_search, "keyword_search", lambda db, terms, limit, scope=None: [Document(id=terms, content=terms)]
+    )
+    docs = pedagogy_search.multi_search(["fractions", "decimals"], mode="vector")
+    assert sorted(d.id for d in docs) == ["decimals", "fractions"]
+    assert searches.calls == ["keyword_search"]
+    # One fallback per request, not per query
+    assert metrics.count("rag.embedding_fallbacks") == before + 2
+
+
+def test_empty_scoped_search_is_repeated_unscoped(monkeypatch, searches):
+    scopes = []
+    monkeypatch.setattr(
+        pedagogy_search, "vector_search", lambda *a, scope=None, **kw: scopes.append(scope) or ([] if scope else ["doc"])
+    )
+    assert pedagogy_search.search("area", mode="vector", scope=Scope(codes=("AC9M5M01",))) == ["doc"]
+    assert scopes == [Scope(codes=("AC9M5M01",)), None]
+
+
+def test_numpy_backend(searches, monkeypatch):
+    calls = []
+    store = SimpleNamespace(search=lambda *a, **kw: calls.append((a, kw)) or ["numpy"])
+    monkeypatch.setattr(pedagogy_search.settings, "RAG_VECTOR_BACKEND", "numpy")
+    monkeypatch.setattr(pedagogy_search.numpy_store, "get_store", lambda: store)
+    monkeypatch.setattr(pedagogy_search, "get_query_embedder", lambda: searches.embedder)
+    assert pedagogy_search.search("equivalent fractions", mode="hybrid") == ["numpy"]
+    assert calls == [(([0.1, 0.2], ["equivalent", "fractions"], 5, "hybrid"), {"scope": None})]
+    assert searches.calls == []
+
+
+def test_unknown_mode(searches):
+    with pytest.raises(ValueError):
+        pedagogy_search.search("fractions", mode="bm25")
+
+
+def test_fuse_merges_and_deduplicates():
+    a, b, c, d = (Document(id=i, content=i) for i in "abcd")
+    assert [doc.id for doc in pedagogy_search.fuse([[a, b, c], [b, d], [d, b]], limit=3)] == ["b", "d", "a"]
+    assert pedagogy_search.fuse([], limit=5) == []
+
+
+def test_multi_search_embeds_once_and_fuses(monkeypatch, searches):
+    batches, searched = [], []
+    searches.embedder.get_embeddings = lambda texts: batches.append(texts) or [[float(i)] for i in range(len(texts))]
+
+    def search(query, limit, mode, scope=None, embedding=None):
+        searched.append((query, embedding, scope))
+        return [Document(id=query, content=query), Document(id="shared", content="shared")]
+
+    monkeypatch.setattr(pedagogy_search, "search", search)
+    scope = Scope(teaching_focus="planning")
+    docs = pedagogy_search.multi_search(["fractions", "decimals"], limit=2, mode="hybrid", scope=scope)
+    assert batches == [["fractions", "decimals"]]
+    assert sorted(searched) == [("decimals", [1.0], scope), ("fractions", [0.0], scope)]
+    assert docs[0].id == "shared" and len(docs) == 2
+    assert searches.embedder.calls == 0
+
+
+def test_multi_search_keyword_mode_needs_no_embeddings(monkeypatch, searches):
+    searched = []
+    monkeypatch.setattr(
+        pedagogy_search, "search", lambda q, limit, mode, scope=None, embedding=None: searched.append(embedding) or []
+    )
+    assert pedagogy_search.multi_search(["fractions", "decimals"], mode="keyword") == []
+    assert searched == [None, None]
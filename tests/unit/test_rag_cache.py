@@ -0,0 +1,58 @@
+"""Tests for the query-embedding and search-result caches."""
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from backend.db.models import RagQueryEmbedding
+from backend.services.metrics import metrics
+from backend.services.rag_cache import EmbeddingCache, ResultCache, rag_cache_report
+
+VECTOR = [0.25, -0.5, 1.0]
+
+
+@pytest.fixture
+def cache(db_session):
+    metrics.reset()
+    factory = sessionmaker(bind=db_session.get_bind())
+    yield EmbeddingCache(size=2, session_factory=factory)
+    metrics.reset()
+
+
+def test_embedding_round_trip_through_memory_and_table(cache, db_session):
+    assert cache.get("fractions query", "m", 3) is None
+    cache.put("fractions query", "m", 3, VECTOR)
+    assert cache.get("fractions query", "m", 3) == VECTOR
+
+    cache.clear_memory()
+    assert cache.get("fractions query", "m", 3) == VECTOR
+    assert db_session.query(RagQueryEmbedding).count() == 1
+    report = rag_cache_report()["embeddings"]
+    assert (report["memory_hits"], report["db_hits"], report["lookups"]) == (1, 1, 3)
+
+
+def test_model_and_dimensions_are_part_of_the_key(cache):
+    cache.put("fractions query", "m", 3, VECTOR)
+    assert cache.get("fractions query", "other", 3) is None
+    assert cache.get("fractions query", "m", 256) is None
+
+
+def test_memory_is_bounded(cache):
+    for i in range(3):
+        cache.put(f"query {i}", "m", 3, VECTOR)
+    assert len(cache._memory) == 2
+
+
+def test_results_expire_and_follow_the_knowledge_base_version(monkeypatch):
+    metrics.reset()
+    clock = [100.0]
+    monkeypatch.setattr("backend.services.rag_cache.time.monotonic", lambda: clock[0])
+    results = ResultCache(size=8, ttl_s=60)
+    results.put("v1", "q", 5, "vector", ["doc"])
+    assert results.get("v1", "q", 5, "vector") == ["doc"]
+    assert results.get("v2", "q", 5, "vector") is None
+    assert results.get("v1", "q", 3, "vector") is None
+    assert results.get("v1", "q", 5, "hybrid") is None
+    clock[0] += 61
+    assert results.get("v1", "q", 5, "vector") is None
+    assert rag_cache_report()["results"]["hit_rate"] == 0.2
+    metrics.reset()
@@ -0,0 +1,113 @@
+"""Tests for the early RAG search started by the curriculum matcher."""
+
+from backend.services import rag_prefetch
+from backend.knowledge.pedagogy_search import Scope
+from backend.services.rag_prefetch import build_rag_queries, build_rag_query, build_rag_scope, prefetch, take
+
+PARSED = {"topic": "fractions", "strand": "Number", "year_level": "Year 5"}
+MATCHES = [{"text": f"descriptor {i}"} for i in range(5)]
+
+
+def test_query_uses_top_matches_only():
+    query = build_rag_query(PARSED, MATCHES, "explicit_instruction")
+    assert "descriptor 2" in query and "descriptor 3" not in query
+    assert "explicit_instruction" in query
+
+
+def test_single_query_unless_multi_query(monkeypatch):
+    monkeypatch.setattr(rag_prefetch.settings, "RAG_MULTI_QUERY", False)
+    assert build_rag_queries(PARSED, MATCHES, "planning") == (build_rag_query(PARSED, MATCHES, "planning"),)
+
+
+def test_multi_query_per_descriptor_and_teaching_path(monkeypatch):
+    monkeypatch.setattr(rag_prefetch.settings, "RAG_MULTI_QUERY", True)
+    assert build_rag_queries(PARSED, MATCHES, "planning") == (
+        "fractions descriptor 0 Year 5",
+        "fractions descriptor 1 Year 5",
+        "fractions descriptor 2 Year 5",
+        "fractions Number planning Year 5",
+    )
+    # Without matches there is nothing to split
+    assert build_rag_queries(PARSED, [], "planning") == (build_rag_query(PARSED, [], "planning"),)
+
+
+def test_multi_query_prefetch_is_matched_on_all_queries(monkeypatch):
+    monkeypatch.setattr(rag_prefetch.settings, "RAG_MULTI_QUERY", True)
+    monkeypatch.setattr(rag_prefetch, "search_pedagogy", lambda q, max_results=5, mode=None, scope=None: ["doc"])
+    prefetch("gen-4", build_rag_queries(PARSED, MATCHES, "planning"))
+    assert take("gen-4", build_rag_queries(PARSED, MATCHES[:2], "planning")) is None
+    prefetch("gen-5", build_rag_queries(PARSED, MATCHES, "planning"))
+    assert take("gen-5", build_rag_queries(PARSED, MATCHES, "planning")) == ["doc"]
+
+
+def test_prefetched_results_are_used_once(monkeypatch):
+    calls = []
+    monkeypatch.setattr(rag_prefetch, "search_pedagogy", lambda q, max_results=5, mode=None, scope=None: calls.append(q) or ["doc"])
+    query = build_rag_query(PARSED, MATCHES, "planning")
+    prefetch("gen-1", query)
+    assert take("gen-1", query) == ["doc"]
+    assert take("gen-1", query) is None
+    assert calls == [query]
+
+
+def test_stale_prefetch_is_discarded(monkeypatch):
+    monkeypatch.setattr(rag_prefetch, "search_pedagogy", lambda q, max_results=5, mode=None, scope=None: ["doc"])
+    prefetch("gen-2", build_rag_query(PARSED, MATCHES, "planning"))
+    assert take("gen-2", build_rag_query(PARSED, MATCHES[1:], "planning")) is None
+
+
+def test_scope_covers_matches_nearby_years_and_focus():
+    matches = [
+        {"code": "AC9M5N06", "strand": "Number", "text": "fractions"},
+        {"code": "AC9M4A01", "strand": "Algebra", "text": "patterns"},
+        {"code": "AC9M5M01", "strand": "Measurement", "text": "units"},
+        {"code": "AC9M9N01", "strand": "Number", "text": "not in the query"},
+    ]
+    scope = build_rag_scope(PARSED, matches, "explicit_instruction")
+    assert scope == Scope(
+        codes=("AC9M5N06", "AC9M4A01", "AC9M5M01"),
+        years=(3, 4, 5, 6),
+        strands=("algebra", "measurement", "number"),
+        teaching_focus="explicit_instruction",
+    )
+
+
+def test_scope_can_be_disabled(monkeypatch):
+    monkeypatch.setattr(rag_prefetch.settings, "RAG_SCOPE_ENABLED", False)
+    assert build_rag_scope(PARSED, MATCHES, "planning") is None
+
+
+def test_prefetch_for_another_scope_is_discarded(monkeypatch):
+    monkeypatch.setattr(rag_prefetch, "search_pedagogy", lambda q, max_results=5, mode=None, scope=None: ["doc"])
+    query = build_rag_query(PARSED, MATCHES, "planning")
+    prefetch("gen-3", query, scope=Scope(teaching_focus="planning"))
+    assert take("gen-3", query, scope=Scope(teaching_focus="fluency_practice")) is None
+
+
+def test_numpy_backend_searches_without_the_database(tmp_path, monkeypatch):
+    from types import SimpleNamespace
+
+    from backend.knowledge import numpy_store, pedagogy_search
+    from backend.services.rag_cache import result_cache
+    from tests.unit.test_numpy_store import _vector_db
+
+    def unreachable():
+        raise ConnectionError("database unreachable")
+
+    monkeypatch.setattr(rag_prefetch.settings, "RAG_VECTOR_BACKEND", "numpy")
+    monkeypatch.setattr(rag_prefetch.settings, "RAG_NUMPY_SNAPSHOT_DIR", str(tmp_path))
+    monkeypatch.setattr(rag_prefetch, "get_knowledge_base", unreachable)
+    monkeypatch.setattr(pedagogy_search, "get_knowledge_base", unreachable)
+    embedder = SimpleNamespace(get_embedding=lambda text: [1.0, 0.0, 0.0])
+    monkeypatch.setattr(pedagogy_search, "get_query_embedder", lambda: embedder)
+    numpy_store.reset_store()
+    result_cache.clear()
+    try:
+        name = numpy_store.export_snapshot(_vector_db(), "4:v1")
+        assert [d.id for d in rag_prefetch.search_pedagogy("denominator", mode="keyword")] == ["a"]
+        assert rag_prefetch.search_pedagogy("fractions", max_results=1, mode="hybrid")[0].id == "a"
+        # Cached results are keyed by the snapshot they came from
+        assert result_cache.get(f"snapshot:{name}:4:v1", "denominator", 5, "keyword", None)
+    finally:
+        numpy_store.reset_store()
+        result_cache.clear()
@@ -0,0 +1,134 @@
+"""Tests for the LLM TPM/RPM governor."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from backend.services import rate_governor
+from backend.services.rate_governor import BATCH, INTERACTIVE, ModelLimits, RateGovernor
+
+
+class _RateLimited(Exception):
+    status_code = 429
+
+
+def test_rpm_limit_blocks_until_window_frees():
+    gov = RateGovernor({"m": ModelLimits(tpm=0, rpm=2)})
+    assert gov._try_reserve("m", 10, INTERACTIVE)[0] is not None
+    assert gov._try_reserve("m", 10, INTERACTIVE)[0] is not None
+    entry, retry_in = gov._try_reserve("m", 10, INTERACTIVE)
+    assert entry is None
+    assert 0 < retry_in <= rate_governor.WINDOW_S
+
+
+def test_tpm_limit_and_oversized_first_call():
+    gov = RateGovernor({"m": ModelLimits(tpm=1000, rpm=0)})
+    # A call larger than the budget still goes through on an empty window
+    assert gov._try_reserve("m", 5000, INTERACTIVE)[0] is not None
+    assert gov._try_reserve("m", 10, INTERACTIVE)[0] is None
+
+
+def test_batch_lane_uses_share_and_yields_to_interactive():
+    gov = RateGovernor({"m": ModelLimits(tpm=0, rpm=4)}, batch_share=0.5)
+    assert gov._try_reserve("m", 1, BATCH)[0] is not None
+    assert gov._try_reserve("m", 1, BATCH)[0] is not None
+    assert gov._try_reserve("m", 1, BATCH)[0] is None
+    assert gov._try_reserve("m", 1, INTERACTIVE)[0] is not None
+
+    gov._interactive_waiting = 1
+    assert gov._try_reserve("other", 1, BATCH)[0] is None
+
+
+async def test_settle_replaces_estimate():
+    gov = RateGovernor({"m": ModelLimits(tpm=1000, rpm=0)})
+    reservation = await gov.acquire("m", 900)
+    await gov.settle(reservation, 100)
+    assert gov.usage()["m"]["tokens_last_minute"] == 100
+
+
+async def test_run_retries_rate_limited_calls(monkeypatch):
+    monkeypatch.setattr(rate_governor.settings, "LLM_GOVERNOR_RETRY_BASE_S", 0.001)
+    gov = RateGovernor({"m": ModelLimits()})
+    attempts = []
+
+    async def call():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise _RateLimited()
+        return SimpleNamespace(metrics=SimpleNamespace(total_tokens=42))
+
+    result, waited = await gov.run("m", 10, call)
+    assert result.metrics.total_tokens == 42
+    assert len(attempts) == 3
+    assert waited >= 0
+
+
+async def test_run_does_not_retry_other_errors():
+    gov = RateGovernor({"m": ModelLimits()})
+
+    async def call():
+        raise ValueError("bad request")
+
+    with pytest.raises(ValueError):
+        await gov.run("m", 10, call)
+
+
+def _agent_with_stubbed_client(monkeypatch, failures: int):
+    """A real agent on the pooled model whose OpenAI client returns 429 ``failures`` times."""
+    import httpx
+    import openai
+    from agno.agent import Agent
+    from openai.types.chat import ChatCompletion
+
+    from backend.workflow import agents
+
+    calls = []
+
+    async def create(**kwargs):
+        calls.append(kwargs.get("stream", False))
+        if len(calls) <= failures:
+            request = httpx.Request("POST", "https://api.openai.com/v1/chat/completions")
+            response = httpx.Response(429, json={"error": {"message": "Rate limit reached"}}, request=request)
+            raise openai.RateLimitError("Rate limit reached", response=response, body=None)
+        return ChatCompletion.model_validate({
+            "id": "c1", "object": "chat.completion", "created": 0, "model": "gpt-4o-mini",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "ok"}}],
+            "usage": {"prompt_tokens": 5, "completion_tokens": 1, "total_tokens": 6},
+        })
+
+    client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    monkeypatch.setattr(agents, "get_async_openai_client", lambda: client)
+    return Agent(model=agents.PooledOpenAIChat(id="gpt-4o-mini"), telemetry=False), calls
+
+
+async def test_run_retries_agent_runs_that_were_rate_limited(monkeypatch):
+    monkeypatch.setattr(rate_governor.settings, "LLM_GOVERNOR_RETRY_BASE_S", 0.001)
+    agent, calls = _agent_with_stubbed_client(monkeypatch, failures=2)
+    gov = RateGovernor({"gpt-4o-mini": ModelLimits()})
+    result, _ = await gov.run("gpt-4o-mini", 10, lambda: agent.arun("hello"))
+    assert result.content == "ok"
+    assert len(calls) == 3
+
+
+async def test_exhausted_retries_raise_a_rate_limit_error(monkeypatch):
+    monkeypatch.setattr(rate_governor.settings, "LLM_GOVERNOR_RETRY_BASE_S", 0.001)
+    monkeypatch.setattr(rate_governor.settings, "LLM_GOVERNOR_MAX_RETRIES", 1)
+    agent, calls = _agent_with_stubbed_client(monkeypatch, failures=10)
+    gov = RateGovernor({"gpt-4o-mini": ModelLimits()})
+    with pytest.raises(rate_governor.AgentRunError) as info:
+        await gov.run("gpt-4o-mini", 10, lambda: agent.arun("hello"))
+    assert rate_governor.is_rate_limit_error(info.value)
+    assert len(calls) == 2
+
+
+async def test_streamed_run_errors_are_retried(monkeypatch):
+    from backend.workflow.steps.curriculum_matcher import _stream_matches
+
+    monkeypatch.setattr(rate_governor.settings, "LLM_GOVERNOR_RETRY_BASE_S", 0.001)
+    agent, calls = _agent_with_stubbed_client(monkeypatch, failures=10)
+    monkeypatch.setattr(rate_governor.settings, "LLM_GOVERNOR_MAX_RETRIES", 2)
+    gov = RateGovernor({"gpt-4o-mini": ModelLimits()})
+    with pytest.raises(rate_governor.AgentRunError) as info:
+        await gov.run("gpt-4o-mini", 10, lambda: _stream_matches(agent, "hello", {}, lambda m: None))
+    assert info.value.status_code == 429
+    assert calls == [True, True, True]
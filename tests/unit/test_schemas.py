@@ -40,6 +40,13 @@ def test_generate_request_validation_empty_topic():
         GenerateRequest(topic="")
 
 
+def test_generate_request_rag_mode():
+    assert GenerateRequest(topic="fractions").rag_mode is None
+    assert GenerateRequest(topic="fractions", rag_mode="keyword").rag_mode == "keyword"
+    with pytest.raises(ValidationError):
+        GenerateRequest(topic="fractions", rag_mode="bm25")
+
+
 def test_parsed_input():
     pi = ParsedInput(
         topic="fractions",
@@ -10,7 +10,7 @@ from backend.db.models import (
     TeachingFocus,
     YearLevel,
 )
-from backend.services.template_service import resolve_template, select_template
+from backend.services.template_service import render_template, resolve_template, select_template
 
 
 def _seed_fixtures(db):
@@ -128,3 +128,14 @@ def test_resolve_template_missing_descriptor(db_session):
         additional_context="",
     )
     assert "N/A" in resolved
+
+
+def test_render_template_keeps_static_prefix():
+    body = "You are writing a {resource_type_name} for {year_level}.\nFollow the structure below."
+    first = render_template(body, {"resource_type_name": "Exit Ticket", "year_level": "Year 5"}, "Use retrieval.")
+    second = render_template(body, {"resource_type_name": "Task Set", "year_level": "Year 8"}, "Use retrieval.")
+    prefix = first.split("## Request Details")[0]
+    assert prefix == second.split("## Request Details")[0]
+    assert "<year_level>" in prefix and "Year 5" not in prefix
+    assert prefix.index("Follow the structure") < prefix.index("Use retrieval.")
+    assert first.rstrip().endswith("Year 5")
@@ -0,0 +1,73 @@
+"""Tests for token counting and prompt budgets."""
+
+from backend.services import token_budget
+from backend.services.token_budget import (
+    DROPPED_TEXT,
+    TokenBudget,
+    calibrate,
+    count_tokens,
+    trim_to_tokens,
+)
+
+
+def test_count_tokens_is_roughly_word_shaped():
+    assert count_tokens("") == 0
+    assert count_tokens("add fractions") == 2
+    # Long words and numbers split into several tokens
+    assert count_tokens("multiplicative") > 1
+    assert count_tokens("123456789") == 3
+    text = "Students solve problems involving addition and subtraction of fractions. " * 20
+    assert 200 <= count_tokens(text) <= 320
+
+
+def test_calibrate_moves_scale_towards_observed(monkeypatch):
+    monkeypatch.setattr(token_budget, "_scale", 1.0)
+    text = "word " * 200
+    calibrate(text, actual_tokens=400)
+    assert token_budget.estimator_scale() > 1.0
+    # Tiny prompts are ignored
+    before = token_budget.estimator_scale()
+    calibrate("hi", actual_tokens=50)
+    assert token_budget.estimator_scale() == before
+
+
+def test_trim_keeps_whole_lines():
+    text = "\n".join(f"- elaboration number {i} about fractions" for i in range(20))
+    trimmed = trim_to_tokens(text, 30, "lines")
+    assert count_tokens(trimmed) <= 30
+    assert all(line.startswith("- elaboration") for line in trimmed.split("\n"))
+
+
+def test_budget_trims_low_priority_first():
+    template = "Teach {content_descriptor}\n{elaborations}\n{rag_context}"
+    variables = {
+        "content_descriptor": "solve problems involving fractions",
+        "elaborations": "\n".join(f"- using fraction walls example {i}" for i in range(40)),
+        "rag_context": "\n\n".join(f"Pedagogy paragraph {i} " + "detail " * 40 for i in range(10)),
+    }
+    budget = TokenBudget(limit=300)
+    fitted = budget.fit(template, variables)
+
+    assert fitted["content_descriptor"] == variables["content_descriptor"]
+    total = sum(count_tokens(v) for v in fitted.values())
+    assert total <= 300
+    actions = {entry["variable"]: entry["action"] for entry in budget.report}
+    assert actions["content_descriptor"] == "kept"
+    assert actions["rag_context"] in ("trimmed", "dropped")
+
+
+def test_budget_drops_when_nothing_fits():
+    template = "{content_descriptor} {rag_context}"
+    variables = {"content_descriptor": "fractions " * 50, "rag_context": "context " * 500}
+    budget = TokenBudget(limit=50)
+    fitted = budget.fit(template, variables)
+    assert fitted["rag_context"] == DROPPED_TEXT
+    assert budget.summary()["limit"] == 50
+
+
+def test_small_prompts_are_untouched():
+    template = "Generate {resource_type_name} for {year_level}"
+    variables = {"resource_type_name": "Exit Ticket", "year_level": "Year 5"}
+    budget = TokenBudget(limit=6000)
+    assert budget.fit(template, variables) == variables
+    assert all(entry["action"] == "kept" for entry in budget.report)
@@ -0,0 +1,84 @@
+"""Tests for the pedagogy ANN index management."""
+
+from backend.knowledge import vector_index
+from backend.knowledge.vector_index import (
+    BIT,
+    HALFVEC,
+    HNSW,
+    IVFFLAT,
+    IndexSpec,
+    apply_search_params,
+    index_distance,
+    index_spec,
+    ivfflat_lists,
+    rescore_candidates,
+)
+
+HNSW_DEF = (
+    "CREATE INDEX pedagogy_vectors_hnsw_index ON ai.pedagogy_vectors "
+    "USING hnsw (embedding vector_cosine_ops) WITH (m='16', ef_construction='64')"
+)
+
+
+class _Conn:
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, statement, params=None):
+        self.statements.append(str(statement))
+
+
+def test_create_sql_and_name():
+    spec = IndexSpec(HNSW, m=24, ef_construction=100)
+    assert spec.name == "pedagogy_vectors_hnsw_index"
+    assert spec.create_sql().endswith("USING hnsw (embedding vector_cosine_ops) WITH (m = 24, ef_construction = 100)")
+    assert "ON bench.vectors" in IndexSpec(IVFFLAT, lists=7).create_sql("bench.vectors", name="b")
+
+
+def test_existing_index_matches_only_the_same_build_parameters():
+    assert IndexSpec(HNSW, m=16, ef_construction=64).matches(HNSW_DEF)
+    assert not IndexSpec(HNSW, m=32, ef_construction=64).matches(HNSW_DEF)
+    assert not IndexSpec(IVFFLAT, lists=100).matches(HNSW_DEF)
+
+
+def test_quantised_storage_indexes_an_expression():
+    half = IndexSpec(HNSW, storage=HALFVEC, dimensions=1536)
+    assert half.name == "pedagogy_vectors_hnsw_halfvec_index"
+    assert "USING hnsw ((embedding::halfvec(1536)) halfvec_cosine_ops)" in half.create_sql()
+    binary = IndexSpec(IVFFLAT, lists=10, storage=BIT, dimensions=1536)
+    assert "USING ivfflat ((binary_quantize(embedding)::bit(1536)) bit_hamming_ops)" in binary.create_sql()
+    # Same build parameters, different storage: rebuilt
+    assert not IndexSpec(HNSW, storage=HALFVEC).matches(HNSW_DEF)
+
+
+def test_quantised_searches_order_by_the_indexed_expression_and_rescore(monkeypatch):
+    assert index_distance("vector", 1536) == "embedding <=> :embedding"
+    assert index_distance(HALFVEC, 1536).startswith("embedding::halfvec(1536) <=> ")
+    assert index_distance(BIT, 8).startswith("binary_quantize(embedding)::bit(8) <~> ")
+    monkeypatch.setattr(vector_index.settings, "VECTOR_RESCORE_CANDIDATES", 40)
+    assert rescore_candidates("vector", 5) == 5
+    assert rescore_candidates(BIT, 5) == 40
+    assert rescore_candidates(HALFVEC, 60) == 60
+
+
+def test_ivfflat_lists_follow_the_row_count():
+    assert ivfflat_lists(0) == 1
+    assert ivfflat_lists(50_000) == 50
+    assert ivfflat_lists(4_000_000) == 2000
+
+
+def test_index_spec_from_settings(monkeypatch):
+    monkeypatch.setattr(vector_index.settings, "VECTOR_INDEX_TYPE", "ivfflat")
+    monkeypatch.setattr(vector_index.settings, "VECTOR_IVFFLAT_LISTS", 0)
+    assert index_spec(20_000) == IndexSpec(IVFFLAT, lists=20)
+    monkeypatch.setattr(vector_index.settings, "VECTOR_STORAGE", HALFVEC)
+    assert index_spec(20_000).storage == HALFVEC
+    monkeypatch.setattr(vector_index.settings, "VECTOR_INDEX_TYPE", "none")
+    assert index_spec(20_000) is None
+
+
+def test_search_params_are_transaction_local(monkeypatch):
+    monkeypatch.setattr(vector_index.settings, "VECTOR_IVFFLAT_PROBES", 10)
+    conn = _Conn()
+    apply_search_params(conn, ef_search=100)
+    assert conn.statements == ["SET LOCAL hnsw.ef_search = 100", "SET LOCAL ivfflat.probes = 10"]